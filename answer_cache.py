@@ -0,0 +1,309 @@
+"""
+回答缓存
+职责：面试官重复或换个说法再问同一个问题时，直接返回之前的回答，不再请求 LLM
+
+- 精确命中：问题归一化后（去标点、空格、语气词）完全相同
+- 近似命中：字符 2-gram 的 MinHash + LSH 找候选，再用精确 Jaccard 相似度确认
+- 依赖上下文的追问（「为什么？」「具体说说」这类很短或带指代的问题）只在上一个问题相同时命中
+- LRU 淘汰，JSON 文件持久化（下次启动还能用），写入有间隔，关闭时补写
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+import numpy as np
+
+from config import (
+    ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_CONTEXT_MAX_CHARS, ANSWER_CACHE_SAVE_INTERVAL
+)
+
+# 去掉不影响问题含义的语气词和客套话
+_FILLER_PATTERN = re.compile(r"那个|这个|嗯+|呃+|啊|吧|呢|嘛|请问|请你|请|麻烦")
+_PUNCT_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+# 指代上文的说法：含这些词的问题离开上一个问题就没有确定含义
+_REFERENCE_PATTERN = re.compile(
+    r"它|刚才|刚刚|上面|前面|之前|这里|那里|这样|那样|这种|那种|这些|那些|为什么|具体|详细|展开|"
+    r"举个例子|举例|还有|继续|然后|换句话|^那|[这那]个的"
+)
+
+
+def normalize_question(text: str) -> str:
+    """归一化问题：全角转半角、小写、去标点空格和语气词"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCT_PATTERN.sub("", text)
+    return _FILLER_PATTERN.sub("", text)
+
+
+def depends_on_context(question: str, max_chars: int = ANSWER_CACHE_CONTEXT_MAX_CHARS) -> bool:
+    """问题是否依赖上文：归一化后很短，或含指代上文的说法"""
+    if len(normalize_question(question)) <= max_chars:
+        return True
+    text = unicodedata.normalize("NFKC", question).lower()
+    return _REFERENCE_PATTERN.search(text) is not None
+
+
+def context_fingerprint(previous_question: Optional[str]) -> str:
+    """上一个问题的指纹（没有上一个问题时为 "start"）"""
+    if not previous_question:
+        return "start"
+    return f"{zlib.crc32(normalize_question(previous_question).encode('utf-8')):08x}"
+
+
+def shingles(normalized: str, n: int = 2) -> set:
+    """字符 n-gram 集合（太短的问题退化为整句）"""
+    if len(normalized) <= n:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + n] for i in range(len(normalized) - n + 1)}
+
+
+class MinHasher:
+    """
+    MinHash 签名：num_perm 个随机哈希函数下各 n-gram 哈希值的最小值
+    
+    两个集合签名相同位置相等的比例 ≈ Jaccard 相似度
+    """
+    
+    PRIME = (1 << 61) - 1
+    
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, self.PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, self.PRIME, num_perm, dtype=np.uint64)
+    
+    def signature(self, grams: set) -> np.ndarray:
+        if not grams:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        base = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint64)
+        # (a * x + b) mod p，x < 2^32、a < 2^61 会溢出 uint64，但溢出后仍是确定的哈希，不影响 MinHash
+        hashed = (np.outer(base, self._a) + self._b) % self.PRIME
+        return hashed.min(axis=0)
+
+
+@dataclass
+class CacheEntry:
+    """一条缓存的问答"""
+    question: str
+    answer: str
+    generation_seconds: float  # 当初生成这条回答花了多久（命中时算作节省的时间）
+    created: float = field(default_factory=time.time)
+    hits: int = 0
+    context: str = ""  # 依赖上文的问题：上一个问题的指纹（见 context_fingerprint），否则为空
+
+
+class AnswerCache:
+    """
+    问题 → 回答 缓存（线程安全）
+    
+    用法：
+        cache = AnswerCache()
+        hit = cache.lookup(question, previous)
+        if hit:
+            for chunk in cache.stream(hit): ...
+        else:
+            ... 请求 LLM ...
+            cache.store(question, answer, elapsed, previous)
+        cache.close()  # 退出时写入还没保存的条目
+    
+    previous 是上一个问题：依赖上文的问题按 (问题, 上一个问题) 缓存，独立的问题忽略它
+    """
+    
+    LSH_BANDS = 16  # 签名切成 16 段，每段 4 个值；任意一段完全相同即成为候选
+    STREAM_CHUNK_CHARS = 24  # 缓存回答按多少字一段吐出
+    
+    def __init__(
+        self,
+        path: Optional[str] = ANSWER_CACHE_PATH,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        similarity: float = ANSWER_CACHE_SIMILARITY,
+        save_interval: float = ANSWER_CACHE_SAVE_INTERVAL
+    ):
+        """
+        Args:
+            path: 持久化文件（None 表示只在内存中）
+            max_entries: 最多缓存多少条（超出按 LRU 淘汰）
+            similarity: 近似命中所需的最低 Jaccard 相似度（0~1）
+            save_interval: 两次写盘的最短间隔（秒），期间的新条目在下次写入或 close 时保存
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.save_interval = save_interval
+        
+        self._hasher = MinHasher(num_perm=self.LSH_BANDS * 4)
+        self._rows = self._hasher.num_perm // self.LSH_BANDS
+        self._entries = OrderedDict()  # 缓存键（见 _key）-> CacheEntry（按最近使用排序）
+        self._grams = {}  # 缓存键 -> 归一化问题的 n-gram 集合
+        self._band_keys = {}  # 缓存键 -> 它所在的 LSH 桶
+        self._buckets = {}  # (段号, 段签名) -> set[缓存键]
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "saved_seconds": 0.0}
+        self._dirty = False  # 有还没写盘的修改
+        self._last_save = 0.0
+        
+        self._load()
+    
+    # ============ 查询 ============
+    
+    @staticmethod
+    def _context(question: str, previous: Optional[str]) -> str:
+        return context_fingerprint(previous) if depends_on_context(question) else ""
+    
+    @staticmethod
+    def _key(normalized: str, context: str) -> str:
+        return f"{normalized}@{context}" if context else normalized
+    
+    def lookup(self, question: str, previous: Optional[str] = None) -> Optional[CacheEntry]:
+        """查找相同或相似问题的缓存回答，未命中返回 None（previous：上一个问题）"""
+        normalized = normalize_question(question)
+        context = self._context(question, previous)
+        with self._lock:
+            self._stats["lookups"] += 1
+            if not normalized:
+                return None
+            
+            key = self._key(normalized, context)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._stats["exact_hits"] += 1
+            else:
+                key = self._find_similar(normalized, context)
+                if key is None:
+                    return None
+                entry = self._entries[key]
+                self._stats["similar_hits"] += 1
+            
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self._stats["saved_seconds"] += entry.generation_seconds
+            return entry
+    
+    def _find_similar(self, normalized: str, context: str) -> Optional[str]:
+        grams = shingles(normalized)
+        candidates = set()
+        for band_key in self._bands(self._hasher.signature(grams)):
+            candidates |= self._buckets.get(band_key, set())
+        
+        best, best_score = None, self.similarity
+        for candidate in candidates:
+            if self._entries[candidate].context != context:
+                continue  # 上文不同（或一个依赖上文、一个不依赖），不算同一个问题
+            other = self._grams[candidate]
+            score = len(grams & other) / len(grams | other)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+    
+    def stream(self, entry: CacheEntry) -> Iterator[str]:
+        """把缓存的回答按段吐出（接口与 LLM 流式输出一致）"""
+        answer = entry.answer
+        for start in range(0, len(answer), self.STREAM_CHUNK_CHARS):
+            yield answer[start:start + self.STREAM_CHUNK_CHARS]
+    
+    # ============ 写入 ============
+    
+    def store(self, question: str, answer: str, generation_seconds: float, previous: Optional[str] = None):
+        """缓存一条问答（同一问题再次写入会覆盖；previous：上一个问题）"""
+        if not normalize_question(question) or not answer:
+            return
+        with self._lock:
+            self._insert(CacheEntry(question, answer, generation_seconds,
+                                    context=self._context(question, previous)))
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            self._dirty = True
+            due = time.time() - self._last_save >= self.save_interval
+        if due:
+            self.save()
+    
+    def _insert(self, entry: CacheEntry):
+        normalized = normalize_question(entry.question)
+        key = self._key(normalized, entry.context)
+        if key in self._entries:
+            self._remove(key)
+        grams = shingles(normalized)
+        band_keys = self._bands(self._hasher.signature(grams))
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, set()).add(key)
+        self._entries[key] = entry
+        self._grams[key] = grams
+        self._band_keys[key] = band_keys
+    
+    def _remove(self, key: str):
+        for band_key in self._band_keys.pop(key):
+            bucket = self._buckets[band_key]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band_key]
+        del self._entries[key]
+        del self._grams[key]
+    
+    def _bands(self, signature: np.ndarray) -> list:
+        rows = self._rows
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.LSH_BANDS)]
+    
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+        self.save()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    # ============ 持久化 ============
+    
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                records = json.load(f)
+            for record in records[-self.max_entries:]:
+                self._insert(CacheEntry(**record))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️  回答缓存读取失败，忽略旧缓存: {e}")
+    
+    def save(self):
+        """写入磁盘（先写临时文件再替换，中途退出不会损坏旧文件）"""
+        if not self.path:
+            return
+        with self._lock:
+            records = [vars(entry) for entry in self._entries.values()]
+            self._dirty = False
+            self._last_save = time.time()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            with self._lock:
+                self._dirty = True  # 下次再试
+            print(f"⚠️  回答缓存保存失败: {e}")
+    
+    def close(self):
+        """写入还没保存的条目（退出时调用）"""
+        with self._lock:
+            dirty = self._dirty
+        if dirty:
+            self.save()
+    
+    # ============ 统计 ============
+    
+    def stats(self) -> dict:
+        """查询次数、命中次数、命中率、累计节省的 LLM 时间（秒）"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        hits = stats["exact_hits"] + stats["similar_hits"]
+        stats["hit_rate"] = hits / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
@@ -1,20 +1,73 @@
 """
-腾讯云 ASR 后端
-使用腾讯云实时语音识别 API
+ASR 后端
+识别器只依赖 ASRBackend 接口：recognize(audio_data) 和 close()，
+具体用哪个后端由 config.ASR_BACKEND 决定（见 ASR_BACKENDS 注册表）
+
+- tencent：腾讯云一句话识别 / 实时识别（需要网络）
+- local：本地 CPU 模型（FunASR Paraformer，无网络延迟）
+- fake：确定性假后端（测试、基准测试用，可注入延迟和故障）
+
+一句话识别后端由 create_asr_backend 包上 ResilientASR（超时、重试、对冲、熔断，见 asr_resilience.py），
+所以后端本身识别失败时直接抛异常，不要吞掉
 """
 
+import base64
+import random
+import re
+import ssl
+import threading
+import time
 import numpy as np
-from typing import Optional
+from typing import Callable, Optional, Protocol, runtime_checkable
+
+from config import (
+    ASR_BACKEND, ASR_MODE, ASR_WORKERS, ASR_SEGMENT_WORKERS, ASR_FALLBACK_BACKEND, ASR_TIMEOUT, ASR_MAX_IN_FLIGHT, RATE,
+    TENCENT_SECRET_ID, TENCENT_SECRET_KEY, TENCENT_APP_ID,
+    TENCENT_ENGINE_MODEL_TYPE, TENCENT_REGION, TENCENT_STREAMING_URL,
+    TENCENT_ASR_ENDPOINT, TENCENT_ASR_CA_FILE, TENCENT_HEARTBEAT_INTERVAL,
+    LOCAL_ASR_MODEL, LOCAL_ASR_PUNC_MODEL, LOCAL_ASR_DEVICE
+)
+from asr_resilience import ResilientASR
+from audio_processor import AudioProcessor
+from streaming_asr import TencentStreamingASR
+from tencent_api import TencentCloudClient
+
+
+@runtime_checkable
+class ASRBackend(Protocol):
+    """
+    ASR 后端接口
+    
+    输入：16kHz 单声道 float32 音频（[-1, 1]），即 AudioChunk.audio_data；
+         pcm 为同一段音频的 int16 PCM（AudioChunk.pcm，可能为 None），需要 PCM 的后端优先用它
+    输出：识别文本，没有识别出内容时返回 None；识别失败时抛异常（由 ResilientASR 重试 / 熔断）
+    
+    支持流式识别的后端额外提供 open_session(on_result)（见 streaming_asr.py）
+    """
+    
+    def recognize(self, audio_data: np.ndarray, pcm: Optional[np.ndarray] = None) -> Optional[str]:
+        ...
+    
+    def close(self):
+        ...
+
+
+def supports_streaming(backend) -> bool:
+    """后端是否支持边说边识别（捕获线程据此决定是否直接推帧）"""
+    return callable(getattr(backend, "open_session", None))
 
 
 class TencentASR:
     """
     腾讯云 ASR 后端
-    使用腾讯云实时语音识别 API
+    使用腾讯云一句话识别 API（长连接池 + 预热 + 心跳，每句话只花一次请求的时间）
     """
     
     def __init__(self, secret_id: str, secret_key: str, app_id: str,
-                 engine_model_type: str = "16k_zh", region: str = "ap-shanghai"):
+                 engine_model_type: str = "16k_zh", region: str = "ap-shanghai",
+                 endpoint: str = TENCENT_ASR_ENDPOINT, ca_file: Optional[str] = TENCENT_ASR_CA_FILE,
+                 pool_size: int = max(ASR_WORKERS, ASR_SEGMENT_WORKERS), heartbeat_interval: float = TENCENT_HEARTBEAT_INTERVAL,
+                 timeout: float = ASR_TIMEOUT):
         """
         初始化腾讯云 ASR
         
@@ -24,6 +77,11 @@ class TencentASR:
             app_id: 腾讯云 AppId
             engine_model_type: 引擎模型类型
             region: 地域
+            endpoint: API 地址（可指向本地 HTTPS 替身服务器）
+            ca_file: 额外信任的 CA 证书（替身服务器的自签名证书）
+            pool_size: 连接池大小（等于最大并发请求数即可）
+            heartbeat_interval: 连接保活间隔（秒，0 表示不保活）
+            timeout: 套接字超时（秒）：容错层判定超时后，卡住的请求最迟这么久也会结束，释放请求线程
         """
         print("初始化腾讯云 ASR...")
         
@@ -46,95 +104,239 @@ class TencentASR:
                 "获取地址: https://console.cloud.tencent.com/asr"
             )
         
-        # 条件导入：只在使用腾讯云时才导入 SDK（关键！）
-        try:
-            from tencentcloud.common import credential
-            from tencentcloud.common.profile.client_profile import ClientProfile
-            from tencentcloud.common.profile.http_profile import HttpProfile
-            from tencentcloud.asr.v20190614 import asr_client
-        except ImportError:
-            raise ImportError(
-                "请先安装腾讯云 SDK:\n"
-                "pip install tencentcloud-sdk-python"
-            )
-        
-        # 创建认证对象
-        cred = credential.Credential(secret_id, secret_key)
-        
-        # 配置 HTTP 选项
-        httpProfile = HttpProfile()
-        httpProfile.endpoint = "asr.tencentcloudapi.com"
-        
-        clientProfile = ClientProfile()
-        clientProfile.httpProfile = httpProfile
-        
-        # 创建客户端
-        self.client = asr_client.AsrClient(cred, region, clientProfile)
+        context = ssl.create_default_context(cafile=ca_file) if ca_file else None
+        self.client = TencentCloudClient(
+            secret_id, secret_key, service="asr", version="2019-06-14", region=region,
+            endpoint=endpoint, pool_size=pool_size, timeout=timeout, context=context
+        )
         self.engine_model_type = engine_model_type
         self.app_id = app_id
         
+        # 预热连接：第一句话不再付 DNS + TLS 握手的时间
+        self.client.prewarm()
+        self.client.start_heartbeat(heartbeat_interval)
+        
         print(f"  地域: {region}")
         print(f"  模型: {engine_model_type}")
         print("✓ 腾讯云 ASR 初始化完成")
     
-    def recognize(self, audio_data: np.ndarray) -> Optional[str]:
+    def recognize(self, audio_data: np.ndarray, pcm: Optional[np.ndarray] = None) -> Optional[str]:
         """
         调用腾讯云 API 识别
         
-        使用一句话识别（适合短音频）
+        使用一句话识别（适合短音频）。直接发送 16kHz 16bit 裸 PCM：
+        有捕获线程给的 int16 PCM 就原样 Base64 编码（不转浮点、不拼 WAV），
+        Base64 结果作为原始字节拼进 JSON 请求体，不再经过 str / json.dumps 复制
+        
+        Raises:
+            TencentCloudError: 接口返回错误（错误码见 e.code）
+            OSError / http.client.HTTPException: 网络错误
+        """
+        if pcm is None:
+            pcm = AudioProcessor.to_pcm16(audio_data)
+        
+        # Base64 编码（直接读 PCM 数组的内存）
+        pcm_bytes = memoryview(np.ascontiguousarray(pcm, dtype=np.int16)).cast('B')
+        audio_base64 = base64.b64encode(pcm_bytes)
+        
+        # 请求参数
+        params = {
+            "ProjectId": 0,
+            "SubServiceType": 2,  # 一句话识别
+            "EngSerViceType": self.engine_model_type,
+            "SourceType": 1,  # 语音数据来源：1 表示请求体中的音频数据，0 表示音频 URL
+            "VoiceFormat": "pcm",
+            "UsrAudioKey": "session_" + str(int(np.random.random() * 1000000)),
+            "DataLen": pcm_bytes.nbytes,
+        }
+        
+        # 发送请求（复用连接池中的热连接）
+        resp = self.client.call("SentenceRecognition", params, raw_fields={"Data": audio_base64})
+        
+        # 解析结果
+        result = resp.get("Result")
+        if result:
+            return result.strip()
+        
+        return None
+    
+    def close(self):
+        """
+        释放资源（停止心跳，关闭空闲连接），可重复调用
+        
+        不清空 self.client：ResilientASR 关闭时不等待超时后仍在后台运行的请求，
+        它们照常返回，用过的连接直接关闭、不再回到池里
+        """
+        self.client.close()
+
+
+class LocalASR:
+    """
+    本地离线 ASR（FunASR Paraformer，CPU 即可运行）
+    
+    省掉每句话一次的网络往返；模型首次使用时自动下载，之后完全离线。
+    推理不是线程安全的，多个识别 worker 共用一个模型时串行执行
+    """
+    
+    _CJK_SPACE = re.compile(r"(?<=[\u4e00-\u9fff])\s+(?=[\u4e00-\u9fff])")
+    
+    def __init__(self, model: str = LOCAL_ASR_MODEL, punc_model: Optional[str] = LOCAL_ASR_PUNC_MODEL,
+                 device: str = LOCAL_ASR_DEVICE):
+        """
+        初始化本地 ASR
+        
+        Args:
+            model: FunASR 模型名（如 paraformer-zh）
+            punc_model: 标点恢复模型（None 表示不加标点）
+            device: 推理设备（cpu / cuda:0 / mps）
         """
+        print("初始化本地 ASR...")
+        
+        # 条件导入：只在使用本地模型时才导入 FunASR
         try:
-            from tencentcloud.asr.v20190614 import models
-            import base64
-            import io
-            import wave
-            
-            # 将 float32 音频转为 16bit PCM WAV
-            audio_int16 = (audio_data * 32768).astype(np.int16)
-            
-            # 写入 WAV 格式的内存缓冲区
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)  # 单声道
-                wav_file.setsampwidth(2)  # 16bit
-                wav_file.setframerate(16000)  # 16kHz
-                wav_file.writeframes(audio_int16.tobytes())
-            
-            # 获取 WAV 数据并 Base64 编码
-            wav_data = wav_buffer.getvalue()
-            audio_base64 = base64.b64encode(wav_data).decode('utf-8')
-            
-            # 构造请求
-            req = models.SentenceRecognitionRequest()
-            
-            # 设置参数
-            params = {
-                "ProjectId": 0,
-                "SubServiceType": 2,  # 一句话识别
-                "EngSerViceType": self.engine_model_type,
-                "SourceType": 1,  # 语音数据来源，1 表示音频 URL，0 表示音频数据（此处实际用 Data 字段）
-                "VoiceFormat": "wav",
-                "UsrAudioKey": "session_" + str(int(np.random.random() * 1000000)),
-                "Data": audio_base64,  # Base64 编码的音频数据
-            }
-            req.from_json_string(str(params).replace("'", '"'))
-            
-            # 发送请求
-            resp = self.client.SentenceRecognition(req)
-            
-            # 解析结果
-            result = resp.Result
-            if result:
-                return result.strip()
-            
-            return None
+            from funasr import AutoModel
+        except ImportError:
+            raise ImportError(
+                "请先安装 FunASR:\n"
+                "pip install funasr torch torchaudio"
+            )
         
-        except Exception as e:
-            print(f"❌ 腾讯云识别失败: {e}")
-            # 不打印完整堆栈，避免刷屏
-            return None
+        options = {"model": model, "device": device, "disable_update": True}
+        if punc_model:
+            options["punc_model"] = punc_model
+        self.model = AutoModel(**options)
+        self._lock = threading.Lock()
+        
+        # 预热：第一次推理要初始化计算图，放在启动时而不是第一句话上
+        self.model.generate(input=np.zeros(RATE // 2, dtype=np.float32))
+        
+        print(f"  模型: {model}（{device}）")
+        print("✓ 本地 ASR 初始化完成")
+    
+    def recognize(self, audio_data: np.ndarray, pcm: Optional[np.ndarray] = None) -> Optional[str]:
+        """本地推理识别（模型直接吃 float32，不需要 PCM）"""
+        with self._lock:
+            results = self.model.generate(input=np.ascontiguousarray(audio_data, dtype=np.float32))
+        
+        text = "".join(item.get("text", "") for item in results or [])
+        text = self._CJK_SPACE.sub("", text).strip()
+        return text or None
     
     def close(self):
         """释放资源"""
-        self.client = None
+        self.model = None
+
+
+class FakeASR:
+    """
+    确定性假 ASR（测试、基准测试用）
+    
+    默认返回音频采样点数（便于校验结果和输入一一对应、顺序正确）；
+    可以用 transcripts 指定按调用顺序返回的文本，用 delay / per_second 模拟识别耗时，
+    用 failure_rate / slow_rate 注入故障和长尾延迟，available = False 模拟服务整体不可用
+    """
+    
+    def __init__(self, transcripts: Optional[list] = None, delay: float = 0.0, per_second: float = 0.0,
+                 failure_rate: float = 0.0, slow_rate: float = 0.0, slow_delay: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            transcripts: 依次返回的文本（用完后回到默认行为）
+            delay: 每次识别的固定耗时（秒）
+            per_second: 每秒音频额外的耗时（秒）
+            failure_rate: 抛 ConnectionError 的概率
+            slow_rate: 额外等待 slow_delay 秒的概率（长尾延迟）
+            slow_delay: 长尾请求的额外耗时（秒）
+            seed: 随机种子（None 表示不固定）
+        """
+        self.transcripts = list(transcripts or [])
+        self.delay = delay
+        self.per_second = per_second
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.available = True
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def recognize(self, audio_data: np.ndarray, pcm: Optional[np.ndarray] = None) -> Optional[str]:
+        with self._lock:
+            self.calls += 1
+            fail = not self.available or self._rng.random() < self.failure_rate
+            slow = self._rng.random() < self.slow_rate
+            # 开始时就取定文本：并发识别时按调用顺序而不是完成顺序对应
+            text = self.transcripts.pop(0) if self.transcripts and not fail else str(len(audio_data))
+        
+        sleep = self.delay + self.per_second * len(audio_data) / RATE + (self.slow_delay if slow else 0.0)
+        if sleep > 0:
+            time.sleep(sleep)
+        
+        if fail:
+            with self._lock:
+                self.failures += 1
+            raise ConnectionError("FakeASR 注入的故障")
+        return text
+    
+    def close(self):
+        pass
+
+
+def _create_tencent(mode: str) -> ASRBackend:
+    if mode == "streaming":
+        return TencentStreamingASR(
+            secret_id=TENCENT_SECRET_ID,
+            secret_key=TENCENT_SECRET_KEY,
+            app_id=TENCENT_APP_ID,
+            engine_model_type=TENCENT_ENGINE_MODEL_TYPE,
+            url=TENCENT_STREAMING_URL
+        )
+    return TencentASR(
+        secret_id=TENCENT_SECRET_ID,
+        secret_key=TENCENT_SECRET_KEY,
+        app_id=TENCENT_APP_ID,
+        engine_model_type=TENCENT_ENGINE_MODEL_TYPE,
+        region=TENCENT_REGION
+    )
 
+
+# 后端注册表：config.ASR_BACKEND -> 工厂函数（参数为 config.ASR_MODE）
+ASR_BACKENDS: dict[str, Callable[[str], ASRBackend]] = {
+    'tencent': _create_tencent,
+    'local': lambda mode: LocalASR(),
+    'fake': lambda mode: FakeASR(),
+}
+
+
+def create_asr_backend(name: str = ASR_BACKEND, mode: str = ASR_MODE, resilient: bool = True,
+                       fallback: Optional[str] = ASR_FALLBACK_BACKEND,
+                       max_in_flight: int = ASR_MAX_IN_FLIGHT) -> ASRBackend:
+    """
+    按名称创建 ASR 后端
+    
+    Args:
+        name: 后端名称（见 ASR_BACKENDS）
+        mode: 识别模式（sentence / streaming），后端不支持流式时退回一句话识别
+        resilient: 一句话识别是否包上 ResilientASR（流式会话不经过 recognize，不包装）
+        fallback: 熔断期间使用的备用后端名称（None 表示不启用）
+        max_in_flight: ResilientASR 同时在途的主后端请求上限（请求线程数）
+    """
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"未知的 ASR 后端: {name}（支持: {', '.join(ASR_BACKENDS)}）")
+    
+    backend = ASR_BACKENDS[name](mode)
+    if supports_streaming(backend):
+        return backend
+    if mode == "streaming":
+        print(f"⚠️  ASR 后端 {name} 不支持流式识别，使用一句话识别")
+    if not resilient:
+        return backend
+    
+    fallback_backend = None
+    if fallback and fallback != name:
+        try:
+            fallback_backend = create_asr_backend(fallback, "sentence", resilient=False)
+        except Exception as e:
+            print(f"⚠️  备用 ASR 后端 {fallback} 初始化失败，熔断期间将放弃识别: {e}")
+    return ResilientASR(backend, fallback=fallback_backend, max_workers=max_in_flight)
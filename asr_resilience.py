@@ -0,0 +1,320 @@
+"""
+ASR 容错层
+包在任意 ASRBackend 外面（本身也是 ASRBackend），识别器无需改动：
+
+- 超时：单次请求超过 timeout 秒视为失败（慢请求留在后台自行结束，后端的套接字超时兜底）
+- 饱和：请求线程全被卡住的请求占满时不再排队，直接按失败处理（计入熔断，转备用后端）
+- 重试：可重试的错误（网络、限流、服务端错误）按带抖动的指数退避重试，总耗时不超过 deadline
+- 对冲：请求耗时超过近期 p95 仍未返回，再发一个相同请求，谁先返回用谁
+- 熔断：连续失败 breaker_threshold 次后熔断 breaker_cooldown 秒，期间直接走备用后端；
+  冷却后放一个探测请求，成功则恢复
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+
+import numpy as np
+
+from config import (
+    ASR_TIMEOUT, ASR_DEADLINE, ASR_RETRIES, ASR_RETRY_BACKOFF,
+    ASR_HEDGE_QUANTILE, ASR_HEDGE_MIN_SAMPLES,
+    ASR_BREAKER_THRESHOLD, ASR_BREAKER_COOLDOWN, ASR_MAX_IN_FLIGHT
+)
+from tracing import percentile
+
+
+class ASRTimeoutError(TimeoutError):
+    """识别请求超时"""
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断中且没有备用后端：本句直接放弃，不计入连续错误"""
+
+
+class ASRSaturatedError(RuntimeError):
+    """请求线程已全部被未返回的请求占用（主后端卡住）：不排队等待，按失败处理"""
+
+
+# 重试也不会成功的错误（腾讯云错误码前缀：鉴权、参数、权限）
+NON_RETRYABLE_CODES = (
+    "AuthFailure", "InvalidParameter", "MissingParameter",
+    "UnauthorizedOperation", "UnsupportedOperation", "UnknownParameter",
+)
+
+
+def is_retryable(error: Exception) -> bool:
+    """网络错误、超时、限流和服务端错误可以重试；配置类错误不重试"""
+    if isinstance(error, (ValueError, TypeError, ImportError, ASRSaturatedError)):
+        return False
+    code = getattr(error, "code", "")
+    return not (isinstance(code, str) and code.startswith(NON_RETRYABLE_CODES))
+
+
+class CircuitBreaker:
+    """
+    熔断器（线程安全）
+    
+    closed：正常放行；连续失败 threshold 次 → open
+    open：拒绝 cooldown 秒 → half_open
+    half_open：只放行一个探测请求，成功 → closed，失败 → open
+    """
+    
+    def __init__(self, threshold: int = ASR_BREAKER_THRESHOLD, cooldown: float = ASR_BREAKER_COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0  # 累计熔断次数
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """这次请求能否发给主后端"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class ResilientASR:
+    """
+    带超时 / 重试 / 对冲 / 熔断的 ASR 后端
+    
+    用法：
+        backend = ResilientASR(TencentASR(...), fallback=LocalASR())
+        text = backend.recognize(audio_data, pcm=pcm)
+    """
+    
+    LATENCY_WINDOW = 200  # 对冲阈值按最近多少次成功请求的耗时计算
+    
+    def __init__(
+        self,
+        primary,
+        fallback=None,
+        timeout: float = ASR_TIMEOUT,
+        deadline: float = ASR_DEADLINE,
+        retries: int = ASR_RETRIES,
+        backoff: float = ASR_RETRY_BACKOFF,
+        hedge_quantile: float = ASR_HEDGE_QUANTILE,
+        hedge_min_samples: int = ASR_HEDGE_MIN_SAMPLES,
+        breaker: Optional[CircuitBreaker] = None,
+        max_workers: int = ASR_MAX_IN_FLIGHT
+    ):
+        """
+        Args:
+            primary: 主后端
+            fallback: 熔断时使用的备用后端（None 表示熔断期间直接放弃）
+            timeout: 单次请求超时（秒）
+            deadline: 一句话的总耗时上限（秒），超出后不再重试
+            retries: 最多重试次数
+            backoff: 退避基数（秒），第 n 次重试前随机等待 [0, backoff * 2^n]
+            hedge_quantile: 对冲阈值分位数（0 表示不对冲）
+            hedge_min_samples: 积累多少次耗时后才开始对冲
+            breaker: 熔断器（默认按 config 创建）
+            max_workers: 请求线程数（并发识别 × 对冲）。超时的请求也会占着线程直到返回，
+                         全部占满时新请求直接失败（ASRSaturatedError），不在线程池里排队
+        """
+        self.primary = primary
+        self.fallback = fallback
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = max(1, hedge_min_samples)
+        self.breaker = breaker or CircuitBreaker()
+        
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ASRCall")
+        self._in_flight = 0  # 已提交、还没返回的主后端请求（含超时后仍在后台运行的）
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ("calls", "retries", "hedges", "hedge_wins", "timeouts", "failures", "fallbacks", "rejected",
+             "saturated"), 0
+        )
+    
+    def recognize(self, audio_data: np.ndarray, pcm: Optional[np.ndarray] = None) -> Optional[str]:
+        """
+        识别（先主后端，熔断或主后端最终失败时走备用后端）
+        
+        Raises:
+            CircuitOpenError: 熔断中且没有备用后端
+            主后端的最后一个异常: 重试用尽且没有备用后端
+        """
+        self._count("calls")
+        
+        if self.breaker.allow():
+            try:
+                text = self._call_with_retries(audio_data, pcm)
+            except Exception as e:
+                self._count("failures")
+                self.breaker.record_failure()
+                if self.fallback is None:
+                    raise
+                print(f"⚠️  主 ASR 失败（{e}），使用备用后端")
+            else:
+                self.breaker.record_success()
+                return text
+        elif self.fallback is None:
+            self._count("rejected")
+            raise CircuitOpenError(f"ASR 熔断中（{self.breaker.cooldown:.0f}秒后重试）")
+        
+        self._count("fallbacks")
+        return self.fallback.recognize(audio_data, pcm=pcm)
+    
+    def _call_with_retries(self, audio_data: np.ndarray, pcm: Optional[np.ndarray]) -> Optional[str]:
+        """带抖动的指数退避重试（full jitter），总耗时不超过 deadline"""
+        give_up_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            timeout = min(self.timeout, give_up_at - time.monotonic())
+            try:
+                return self._hedged_call(audio_data, pcm, timeout)
+            except Exception as e:
+                pause = random.uniform(0, self.backoff * 2 ** attempt)
+                if attempt >= self.retries or not is_retryable(e) \
+                        or time.monotonic() + pause >= give_up_at:
+                    raise
+            attempt += 1
+            self._count("retries")
+            time.sleep(pause)
+    
+    def _hedged_call(self, audio_data: np.ndarray, pcm: Optional[np.ndarray], timeout: float) -> Optional[str]:
+        """
+        发一个请求；超过对冲阈值还没返回就再发一个，取先成功的结果
+        
+        两个请求都失败时抛出最后一个异常，timeout 内都没返回则抛 ASRTimeoutError
+        """
+        start = time.monotonic()
+        first = self._submit(audio_data, pcm)
+        if first is None:
+            self._count("saturated")
+            raise ASRSaturatedError(f"ASR 请求线程已满（{self.max_workers} 个请求未返回）")
+        futures = [first]
+        
+        hedge_after = self.hedge_delay()
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                hedge = self._submit(audio_data, pcm)  # 没有空闲线程就不对冲
+                if hedge is not None:
+                    self._count("hedges")
+                    futures.append(hedge)
+        
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    text, elapsed = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                
+                with self._lock:
+                    self._latencies.append(elapsed)
+                if future is not futures[0]:
+                    self._count("hedge_wins")
+                for other in pending:
+                    other.cancel()
+                return text
+        
+        if not pending and error is not None:
+            raise error
+        self._count("timeouts")
+        raise ASRTimeoutError(f"识别超时（{timeout:.1f}秒）")
+    
+    def _submit(self, audio_data: np.ndarray, pcm: Optional[np.ndarray]):
+        """有空闲请求线程才提交（返回 Future），否则返回 None"""
+        with self._lock:
+            if self._in_flight >= self.max_workers:
+                return None
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._timed_call, audio_data, pcm)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release_cancelled)
+        return future
+    
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+    
+    def _release_cancelled(self, future):
+        """还没开始就被取消的请求不会执行 _timed_call，在这里释放名额"""
+        if future.cancelled():
+            self._release()
+    
+    def _timed_call(self, audio_data: np.ndarray, pcm: Optional[np.ndarray]) -> tuple[Optional[str], float]:
+        start = time.monotonic()
+        try:
+            text = self.primary.recognize(audio_data, pcm=pcm)
+        finally:
+            self._release()
+        return text, time.monotonic() - start
+    
+    def hedge_delay(self) -> Optional[float]:
+        """对冲阈值：最近成功请求耗时的 hedge_quantile 分位数（样本不足或关闭对冲时为 None）"""
+        if not self.hedge_quantile:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            values = sorted(self._latencies)
+        return percentile(values, self.hedge_quantile)
+    
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+    
+    def stats(self) -> dict:
+        """计数器 + 熔断状态 + 主后端耗时分位数"""
+        with self._lock:
+            stats = dict(self._counters, in_flight=self._in_flight)
+            values = sorted(self._latencies)
+        stats["breaker"] = self.breaker.state
+        stats["breaker_opened"] = self.breaker.opened
+        if values:
+            stats["p50"] = percentile(values, 0.50)
+            stats["p95"] = percentile(values, 0.95)
+        return stats
+    
+    def close(self):
+        """释放资源（不等待超时后仍在后台运行的请求）"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.primary.close()
+        if self.fallback is not None:
+            self.fallback.close()
@@ -0,0 +1,350 @@
+"""
+asyncio 运行时 - 用一个事件循环线程代替「每级一个线程」
+职责：捕获帧、VAD、识别调度和 LLM 流都是同一个事件循环里的任务，
+之间用有界异步队列连接；停止时直接取消任务，不需要轮询停止事件
+
+与线程运行时（config.PIPELINE_RUNTIME = "threads"）的对应关系：
+- 声卡捕获：回调模式，PortAudio 回调经 call_soon_threadsafe 唤醒一个 DSP 任务（代替 CaptureDSPWorker 线程）
+- 文件捕获源：每个来源一个任务，阻塞的 read 放进线程池（代替每设备一个生产者线程）
+- 捕获子进程（config.CAPTURE_PROCESS）：桥接线程收到的语音经 call_soon_threadsafe 入队，事件循环里不跑捕获任务
+- 识别调度：SpeechRecognizer.run_async 的 worker 协程从 AsyncPriorityQueue 取数据（代替调度线程 + 切段线程池）
+- LLM 流：stream() 把阻塞的 HTTP 流桥接成异步迭代器，最多预读 maxsize 块（背压）
+
+ASR / LLM 客户端都是同步的（requests / websocket-client），阻塞调用统一放进一个有界线程池，
+等待它们的是协程而不是线程；其余部分全部由事件驱动
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, Optional
+
+from config import ASR_SEGMENT_WORKERS, SCHEDULER_MAX_WAIT, LLM_STREAM_BUFFER, CAPTURE_PROCESS
+from audio_device import FileDeviceInfo
+from audio_scheduler import PriorityLanes
+from audio_capture import AudioCaptureThread
+from capture_process import CaptureProcessBridge
+
+_DONE = object()  # 流结束标记
+
+
+class StopEvent(threading.Event):
+    """
+    停止事件：线程和事件循环都能等待
+    
+    set() 除了唤醒等待的线程，还通过 call_soon_threadsafe 唤醒 attach() 过的事件循环，
+    所以信号处理、GUI 线程、识别出错都能立即停止 asyncio 运行时
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._waiters = []  # (loop, asyncio.Event)
+        self._waiters_lock = threading.Lock()
+    
+    def attach(self) -> asyncio.Event:
+        """在事件循环里调用，返回 set() 时会置位的 asyncio.Event"""
+        event = asyncio.Event()
+        with self._waiters_lock:
+            self._waiters.append((asyncio.get_running_loop(), event))
+        if self.is_set():
+            event.set()
+        return event
+    
+    def set(self):
+        super().set()
+        with self._waiters_lock:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+
+class AsyncPriorityQueue(asyncio.Queue):
+    """
+    PriorityAudioQueue 的 asyncio 版本：出队策略同样由 PriorityLanes 决定
+    
+    只能在事件循环线程里使用；put_nowait 不会抛 QueueFull，满了按优先级挤掉一条
+    （捕获不能等），被挤掉的计入 stats() 的 dropped
+    """
+    
+    def __init__(self, maxsize: int = 0, priorities: Optional[dict] = None, max_wait: float = SCHEDULER_MAX_WAIT):
+        self._priorities = priorities
+        self._max_wait = max_wait
+        super().__init__(maxsize)
+    
+    # asyncio.Queue 的存储钩子：_queue 换成 PriorityLanes（支持 len()，qsize / empty / full 照常工作）
+    def _init(self, maxsize):
+        self._queue = PriorityLanes(self._priorities, self._max_wait)
+    
+    def _put(self, item):
+        self._queue.push(item)
+    
+    def _get(self):
+        return self._queue.pop()
+    
+    def put_nowait(self, item):
+        if self.full():
+            if not self._queue.evict_for(item):
+                return
+            self.task_done()  # 被挤掉的那条不会再被取出
+        super().put_nowait(item)
+    
+    @property
+    def unfinished_tasks(self) -> int:
+        """已入队但还没 task_done 的条数（与 queue.Queue 同名，replay.py 据此判断是否处理完）"""
+        return self._unfinished_tasks
+    
+    def stats(self) -> dict:
+        return self._queue.stats()
+
+
+class _LoopWaker:
+    """给 start_callback_stream 的唤醒对象：PortAudio 回调线程里调用 set()"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.event = asyncio.Event()
+    
+    def set(self):
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass  # 事件循环已关闭，流马上也会关闭
+
+
+class _LoopQueue:
+    """给捕获子进程桥接线程的识别队列：put_nowait 经 call_soon_threadsafe 在事件循环线程里入队"""
+    
+    def __init__(self, audio_queue: AsyncPriorityQueue):
+        self.audio_queue = audio_queue
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # run() 启动桥接线程前设置
+    
+    def put_nowait(self, chunk):
+        try:
+            self.loop.call_soon_threadsafe(self.audio_queue.put_nowait, chunk)
+        except RuntimeError:
+            pass  # 事件循环已关闭，正在停止，这句丢弃
+
+
+async def iterate_in_thread(iterator: Iterable, executor=None, maxsize: int = LLM_STREAM_BUFFER) -> AsyncIterator:
+    """
+    把阻塞的迭代器（LLM 的 HTTP 流）桥接成异步迭代器
+    
+    生产线程最多领先消费方 maxsize 块，消费方慢了它就停在信号量上（背压）；
+    消费方提前退出（取消、break）时生产线程在下一块处停止并关闭迭代器
+    """
+    loop = asyncio.get_running_loop()
+    items: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(maxsize)
+    cancelled = threading.Event()
+    
+    def send(item) -> bool:
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+            return True
+        except RuntimeError:
+            cancelled.set()  # 事件循环已关闭
+            return False
+    
+    def produce():
+        iterator_ = iter(iterator)
+        try:
+            for item in iterator_:
+                slots.acquire()
+                if cancelled.is_set() or not send(item):
+                    return
+            send(_DONE)
+        except Exception as e:
+            send(e)
+        finally:
+            close = getattr(iterator_, "close", None)
+            if close is not None and cancelled.is_set():
+                close()
+    
+    loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item = await items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            slots.release()
+            yield item
+    finally:
+        cancelled.set()
+        slots.release()  # 生产线程可能正等着空位
+
+
+class AsyncPipeline:
+    """
+    asyncio 运行时：在一个事件循环里运行所有设备的捕获、识别调度和 LLM 流
+    
+    audio_queue 必须是 AsyncPriorityQueue，recognizer 是用它创建的 SpeechRecognizer（不启动线程）。
+    process 为 True 时捕获在子进程里运行（见 capture_process.py），流式识别时不支持，改为在事件循环里捕获。
+    stop_event 在任何线程置位后，run() 取消所有任务、关闭设备后返回；
+    正在执行的阻塞请求不等待（线程池 shutdown(wait=False)），结果直接丢弃
+    """
+    
+    def __init__(self, audio_queue: AsyncPriorityQueue, recognizer, devices: dict, stop_event: StopEvent,
+                 streamer=None, ring_buffers: Optional[dict] = None, process: bool = CAPTURE_PROCESS):
+        self.audio_queue = audio_queue
+        self.recognizer = recognizer
+        self.stop_event = stop_event
+        if process and streamer is not None:
+            print("⚠️  流式识别需要逐帧推送给识别器，捕获改为在本进程内运行")
+            process = False
+        
+        self.bridge: Optional[CaptureProcessBridge] = None
+        self._local_captures = []  # 在事件循环里运行的捕获（子进程模式下为空）
+        if process:
+            self.bridge = CaptureProcessBridge(_LoopQueue(audio_queue), devices, stop_event)
+            self.captures = list(self.bridge.captures.values())
+        else:
+            self._local_captures = [
+                AudioCaptureThread(audio_queue, device_info, source_type, stop_event, streamer,
+                                   (ring_buffers or {}).get(source_type))
+                for source_type, device_info in devices.items() if device_info is not None
+            ]
+            self.captures = list(self._local_captures)
+        # 识别 worker 各一个请求 + 长语音切段并发 + 一个 LLM 流 + 每个文件捕获源的 read
+        files = sum(isinstance(capture.device_info, FileDeviceInfo) for capture in self._local_captures)
+        self.executor = ThreadPoolExecutor(
+            max_workers=recognizer.num_workers + ASR_SEGMENT_WORKERS + 1 + files,
+            thread_name_prefix="AsyncIO"
+        )
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready = threading.Event()
+        self._tasks = set()  # submit() 提交、尚未结束的任务
+    
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        stopped = self.stop_event.attach()
+        self._ready.set()
+        
+        sound_cards = [c for c in self._local_captures if not isinstance(c.device_info, FileDeviceInfo)]
+        tasks = [
+            asyncio.ensure_future(self._read_file(capture))
+            for capture in self._local_captures if isinstance(capture.device_info, FileDeviceInfo)
+        ]
+        if sound_cards:
+            tasks.append(asyncio.ensure_future(self._drain(sound_cards)))
+        if not self.captures:
+            print("❌ 没有可用的捕获设备")
+        tasks.append(asyncio.ensure_future(self.recognizer.run_async(self.executor)))
+        
+        bridge_thread = None
+        if self.bridge is not None and self.captures:
+            self.bridge.audio_queue.loop = self.loop
+            bridge_thread = await asyncio.to_thread(self.bridge.start)  # spawn 子进程要几百毫秒，不卡事件循环
+        
+        try:
+            await stopped.wait()
+        finally:
+            tasks += self._tasks
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if bridge_thread is not None:
+                # 桥接线程看到 stop_event 后通知子进程退出并释放共享内存（不占用已关闭的线程池）
+                await asyncio.to_thread(bridge_thread.join)
+            print("✓ [asyncio] 事件循环已退出")
+    
+    def run_until_stopped(self):
+        """在当前线程运行事件循环，直到 stop_event 置位（GUI 的 ASRWorker 在 QThread 里调用）"""
+        asyncio.run(self.run())
+    
+    async def _drain(self, captures: list):
+        """声卡：回调模式打开，PortAudio 回调唤醒本任务处理积压的帧（相当于 CaptureDSPWorker）"""
+        waker = _LoopWaker(self.loop)
+        started = []
+        try:
+            for capture in captures:
+                try:
+                    capture.start_callback_stream(waker)
+                    started.append(capture)
+                except Exception as e:
+                    print(f"❌ [{capture.label}] 打开设备失败: {e}")
+            
+            while started:
+                # 先清再处理：处理期间到达的帧会再次置位，不会漏掉
+                await waker.event.wait()
+                waker.event.clear()
+                for capture in started:
+                    try:
+                        capture.drain()
+                    except Exception as e:
+                        print(f"⚠️  [{capture.label}] 处理音频失败: {e}")
+        finally:
+            for capture in started:
+                capture.close_stream()
+    
+    async def _read_file(self, capture: AudioCaptureThread):
+        """文件捕获源：按原速节拍的 read 放进线程池（停止时不等它返回），逐帧处理在事件循环里"""
+        stream = None
+        try:
+            stream = capture.open_read_stream("asyncio")
+            while True:
+                data = await self.loop.run_in_executor(self.executor, stream.read, capture.chunk_size)
+                capture.process_frame(data, time.perf_counter())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ [{capture.label}] 读取音频失败: {e}")
+        finally:
+            if stream is not None:
+                stream.close()
+            print(f"✓ [{capture.label}] 捕获已停止")
+    
+    def submit(self, coro):
+        """
+        从其他线程（键盘回调）把协程交给事件循环
+        
+        Returns:
+            concurrent.futures.Future；停止时任务被取消，result() 抛 CancelledError
+        """
+        if not self._ready.wait(timeout=5):
+            raise RuntimeError("事件循环未启动")
+        return asyncio.run_coroutine_threadsafe(self._tracked(coro), self.loop)
+    
+    async def _tracked(self, coro):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await coro
+        finally:
+            self._tasks.discard(task)
+    
+    def stream(self, iterator: Iterable) -> AsyncIterator:
+        """在事件循环里消费阻塞的流（LLM 回答），HTTP 读取在线程池里进行"""
+        return iterate_in_thread(iterator, self.executor)
+
+
+def start_async_pipeline(
+    audio_queue: AsyncPriorityQueue,
+    recognizer,
+    devices: dict,
+    stop_event: StopEvent,
+    streamer=None
+) -> tuple[threading.Thread, AsyncPipeline]:
+    """
+    在独立线程里启动 asyncio 运行时
+    
+    Args:
+        audio_queue: AsyncPriorityQueue
+        recognizer: 用 audio_queue 创建的 SpeechRecognizer（不调用 start_recognizer_thread）
+        devices: 来源 -> DeviceInfo（值为 None 的来源跳过）
+        stop_event: StopEvent（置位后事件循环立即收尾）
+        streamer: 流式识别器（可选）
+    
+    Returns:
+        (thread, pipeline) 线程对象和运行时（submit / stream 提交 LLM 任务）
+    """
+    pipeline = AsyncPipeline(audio_queue, recognizer, devices, stop_event, streamer)
+    thread = threading.Thread(target=pipeline.run_until_stopped, daemon=False, name="AsyncPipeline")
+    thread.start()
+    return thread, pipeline
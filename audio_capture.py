@@ -8,25 +8,36 @@ import numpy as np
 import time
 import queue
 import threading
-from typing import Literal
+from typing import Literal, Optional
 
 from config import (
     FORMAT, RATE, CHUNK_DURATION, MAX_BUFFER_DURATION,
-    SILENCE_DURATION, SILENCE_THRESHOLD, DEBUG_MODE
+    SILENCE_DURATION, DEBUG_MODE, INT16_MAX, VAD_MODE,
+    RING_BUFFER_DURATION, CAPTURE_MODE, CAPTURE_RING_DURATION, CAPTURE_PROCESS
 )
-from audio_device import DeviceInfo
-from audio_processor import AudioProcessor, AudioChunk
+from audio_device import DeviceInfo, FileDeviceInfo
+from audio_processor import AudioProcessor, AudioChunk, AudioRingBuffer, FrameRing, PolyphaseResampler, RingGuard
+from vad import create_vad
+from tracing import tracer
 
 
 class AudioCaptureThread:
     """
-    音频捕获线程 - 基于 VAD (Voice Activity Detection) 的智能捕获
+    音频捕获线程 - 基于 VAD (Voice Activity Detection) 的智能捕获（检测器见 vad.py）
     
     工作原理：
-    1. 持续读取音频块
-    2. 检测到声音 → 开始缓冲
+    1. 持续读取音频块，逐帧转单声道、重采样
+    2. 检测到声音 → 归一化后写入环形缓冲区
     3. 检测到静音持续 SILENCE_DURATION 秒 → 处理并发送
     4. 缓冲超过 MAX_BUFFER_DURATION 秒 → 强制处理
+    
+    流式模式（传入 streamer）：
+    语音开始即建立识别会话，每帧重采样后直接推送，语音结束只发结束信号，
+    不再整段入队
+    
+    两种驱动方式，逐帧处理（process_frame）完全相同：
+    - 阻塞模式：run() 在独立线程里循环 stream.read
+    - 回调模式：PortAudio 回调把帧放进 FrameRing，由 CaptureDSPWorker 统一 drain
     """
     
     # 共享 PyAudio 对象（避免 macOS 多线程 bug）
@@ -38,17 +49,57 @@ class AudioCaptureThread:
         audio_queue: queue.Queue,
         device_info: DeviceInfo,
         source_type: Literal['speaker', 'microphone'],
-        stop_event: threading.Event
+        stop_event: threading.Event,
+        streamer=None,
+        ring_buffers: Optional[tuple] = None
     ):
+        """
+        Args:
+            audio_queue: 识别队列（PriorityAudioQueue / AsyncPriorityQueue：put_nowait 永不抛 queue.Full）
+            ring_buffers: (float32 环形缓冲区, int16 PCM 环形缓冲区)，None 表示自己分配
+                          （捕获子进程传入建在共享内存上的缓冲区）
+        """
         self.audio_queue = audio_queue
         self.device_info = device_info
         self.source_type = source_type
         self.stop_event = stop_event
+        self.streamer = streamer  # 流式识别器（提供 begin_stream/feed_stream/end_stream）
         
         # 计算参数
         self.chunk_size = int(device_info.sample_rate * CHUNK_DURATION)
         self.silence_chunks_needed = int(SILENCE_DURATION / CHUNK_DURATION)
         
+        # 逐帧重采样器（滤波器组按采样率组合缓存，创建很便宜）
+        self.resampler = None
+        if device_info.sample_rate != RATE:
+            self.resampler = PolyphaseResampler(device_info.sample_rate, RATE)
+        
+        # 语音活动检测器（按 config.VAD_MODE 创建，输入设备采样率的帧）
+        self.vad = create_vad(device_info.sample_rate)
+        
+        # 预分配环形缓冲区：已处理好的 16kHz 音频，语音结束时零拷贝取出
+        # float32 给 VAD / 本地模型用，int16 PCM 直接发给云端（两个缓冲区同步写入，位置始终一致）
+        if ring_buffers is not None:
+            self.ring_buffer, self.pcm_ring = ring_buffers
+        else:
+            self.ring_buffer = AudioRingBuffer(int(RING_BUFFER_DURATION * RATE))
+            self.pcm_ring = AudioRingBuffer(int(RING_BUFFER_DURATION * RATE), dtype=np.int16)
+        
+        # 语音状态机（process_frame 逐帧推进）
+        self.buffer_duration = 0
+        self.silence_chunks_count = 0
+        self.is_speaking = False
+        self.trace_id = None
+        
+        # 回调模式（start_callback_stream 后才有）
+        self.stream = None
+        self.frame_ring = None
+        self._wake = None
+        
+        # 统计
+        self.frames = 0
+        self.input_overflows = 0  # PortAudio 报告的输入溢出次数（仅回调模式可见）
+        
         # 显示标签
         self.label = "🔊 扬声器" if source_type == 'speaker' else "🎙️  麦克风"
     
@@ -60,79 +111,26 @@ class AudioCaptureThread:
                 cls._shared_pyaudio = pyaudio.PyAudio()
             return cls._shared_pyaudio
     
-    def run(self):
-        """线程主循环"""
-        print(f"\n{self.label} 生产者线程启动:")
+    def _print_banner(self, mode: str):
+        print(f"\n{self.label} 捕获启动（{mode}）:")
         print(f"  设备: {self.device_info.name}")
         print(f"  采样率: {self.device_info.sample_rate} Hz")
         print(f"  通道数: {self.device_info.channels}")
-        print(f"  静音检测: {SILENCE_DURATION}秒静音后处理")
-        
-        p = self._get_shared_pyaudio()
+        print(f"  静音检测: {VAD_MODE} VAD，{SILENCE_DURATION}秒静音后处理")
+    
+    def run(self):
+        """阻塞模式线程主循环：stream.read 一帧、处理一帧"""
+        self._print_banner("阻塞读取")
         
+        stream = None
         try:
-            stream = p.open(
-                format=FORMAT,
-                channels=self.device_info.channels,
-                rate=self.device_info.sample_rate,
-                input=True,
-                input_device_index=self.device_info.index,
-                frames_per_buffer=self.chunk_size
-            )
-            
-            # VAD 状态
-            audio_buffer = []
-            buffer_duration = 0
-            silence_chunks_count = 0
-            is_speaking = False
+            stream = self._open_stream()
             
             while not self.stop_event.is_set():
                 try:
                     # 读取音频
                     data = stream.read(self.chunk_size, exception_on_overflow=False)
-                    audio_data = np.frombuffer(data, dtype=np.int16)
-                    
-                    # 转单声道
-                    audio_data = AudioProcessor.to_mono(audio_data, self.device_info.channels)
-                    
-                    # 归一化
-                    audio_float = AudioProcessor.normalize(audio_data)
-                    
-                    # 静音检测
-                    is_silent = AudioProcessor.is_silent(audio_float, SILENCE_THRESHOLD)
-                    
-                    if not is_silent:
-                        # 有声音
-                        if not is_speaking:
-                            is_speaking = True
-                        silence_chunks_count = 0
-                        audio_buffer.append(audio_data)
-                        buffer_duration += len(audio_data) / self.device_info.sample_rate
-                    else:
-                        # 静音
-                        if is_speaking:
-                            silence_chunks_count += 1
-                            audio_buffer.append(audio_data)
-                            buffer_duration += len(audio_data) / self.device_info.sample_rate
-                    
-                    # 检查是否需要处理
-                    should_process = False
-                    if is_speaking and silence_chunks_count >= self.silence_chunks_needed:
-                        should_process = True
-                    elif is_speaking and buffer_duration >= MAX_BUFFER_DURATION:
-                        should_process = True
-                    
-                    if should_process and len(audio_buffer) > 0:
-                        if DEBUG_MODE:
-                            print(f"[{self.label}] 检测到完整语音片段，时长: {buffer_duration:.2f}秒，开始处理...")
-                        
-                        self._process_buffer(audio_buffer, buffer_duration)
-                        
-                        # 重置状态
-                        audio_buffer = []
-                        buffer_duration = 0
-                        silence_chunks_count = 0
-                        is_speaking = False
+                    self.process_frame(data, time.perf_counter())
                 
                 except Exception as e:
                     if not self.stop_event.is_set():
@@ -152,85 +150,299 @@ class AudioCaptureThread:
             # 不 terminate 共享的 PyAudio 对象（其他线程可能还在使用）
             print(f"✓ [{self.label}] 生产者线程已退出")
     
-    def _process_buffer(self, audio_buffer: list, buffer_duration: float):
-        """
-        处理缓冲的音频数据
-        
-        流程：
-        1. 拼接所有音频块
-        2. 重采样到 16kHz
-        3. 归一化
-        4. 创建 AudioChunk
-        5. 放入队列
+    def process_frame(self, data, frame_time: float):
         """
-        process_start = time.time()
+        处理一帧原始音频（int16 交织字节）：转单声道、VAD、重采样，并推进语音状态机
         
-        # 拼接
-        full_audio = np.concatenate(audio_buffer)
+        阻塞模式在捕获线程里调用，回调模式在 DSP 线程里调用
         
-        # 重采样
-        if self.device_info.sample_rate != RATE:
-            full_audio = AudioProcessor.resample(
-                full_audio,
-                self.device_info.sample_rate,
-                RATE
-            )
+        Args:
+            data: 原始字节（bytes 或 uint8 数组视图，调用返回后不再引用）
+            frame_time: 这一帧到达的时刻（perf_counter）
+        """
+        self.frames += 1
+        audio_data = np.frombuffer(data, dtype=np.int16)
+        
+        # 转单声道
+        audio_data = AudioProcessor.to_mono(audio_data, self.device_info.channels)
         
         # 归一化
-        audio_float32 = AudioProcessor.normalize(full_audio)
+        audio_float = AudioProcessor.normalize(audio_data)
+        
+        # 语音活动检测
+        is_silent = not self.vad.is_speech(audio_float)
+        
+        # 逐帧重采样（一直运行，滤波器历史始终是真实音频，语音开头无瞬态）
+        frame_16k = self._resample_frame(audio_data)
+        
+        if not is_silent:
+            # 有声音
+            if not self.is_speaking:
+                self.is_speaking = True
+                self.trace_id = tracer.begin(self.source_type, at=frame_time)
+                if self.streamer:
+                    self.streamer.begin_stream(self.source_type, self.trace_id)
+            self.silence_chunks_count = 0
+        elif self.is_speaking:
+            # 说话中的静音
+            self.silence_chunks_count += 1
+        
+        if self.is_speaking:
+            self._consume_frame(frame_16k)
+            self.buffer_duration += len(audio_data) / self.device_info.sample_rate
+        
+        # 检查是否需要处理
+        should_process = False
+        if self.is_speaking and self.silence_chunks_count >= self.silence_chunks_needed:
+            should_process = True
+        elif self.is_speaking and self.buffer_duration >= MAX_BUFFER_DURATION:
+            should_process = True
+        
+        if should_process:
+            tracer.mark(self.trace_id, "speech_end", at=frame_time)
+            if DEBUG_MODE:
+                print(f"[{self.label}] 检测到完整语音片段，时长: {self.buffer_duration:.2f}秒，开始处理...")
+            
+            if self.streamer:
+                self.streamer.end_stream(self.source_type)
+            else:
+                self._process_buffer(self.buffer_duration, self.trace_id)
+            
+            # 重置状态
+            self.buffer_duration = 0
+            self.silence_chunks_count = 0
+            self.is_speaking = False
+    
+    def open_read_stream(self, mode: str):
+        """打开阻塞读取的流但不起线程（asyncio 运行时在线程池里 read，在事件循环里 process_frame）"""
+        self._print_banner(mode)
+        return self._open_stream()
+    
+    # ============ 回调模式（由 CaptureDSPWorker 驱动） ============
+    
+    def start_callback_stream(self, wake: threading.Event):
+        """
+        以回调模式打开设备：PortAudio 音频线程每凑满一帧调用 _on_audio，
+        只把字节拷进 frame_ring 并唤醒 DSP 线程，处理全部在 drain 里做
+        """
+        self._print_banner("回调")
+        self._wake = wake
+        frame_bytes = self.chunk_size * self.device_info.channels * 2
+        self.frame_ring = FrameRing(max(2, round(CAPTURE_RING_DURATION / CHUNK_DURATION)), frame_bytes)
+        self.stream = self._open_stream(stream_callback=self._on_audio)
+        self.stream.start_stream()
+    
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PortAudio 回调（音频线程）：不做计算、不拿锁，尽快返回"""
+        if status & pyaudio.paInputOverflow:
+            self.input_overflows += 1  # 驱动层已经丢了数据（回调来得太晚）
+        self.frame_ring.push(in_data, time.perf_counter())
+        self._wake.set()
+        return None, pyaudio.paContinue
+    
+    def drain(self) -> int:
+        """DSP 线程：处理环形缓冲区里积压的全部帧，返回处理的帧数"""
+        count = 0
+        while True:
+            frame = self.frame_ring.peek()
+            if frame is None:
+                return count
+            try:
+                self.process_frame(*frame)
+            finally:
+                self.frame_ring.advance()
+            count += 1
+    
+    def close_stream(self):
+        """关闭回调模式的流"""
+        try:
+            self.stream.stop_stream()
+            self.stream.close()
+        except Exception:
+            pass
+        print(f"✓ [{self.label}] 捕获已停止")
+    
+    def stats(self) -> dict:
+        """
+        捕获统计
+        
+        Returns:
+            {"mode", "frames", "dropped", "input_overflows", "max_backlog"}；
+            阻塞模式下 PortAudio 静默丢帧，后三项无法统计，为 None
+        """
+        ring = self.frame_ring
+        return {
+            "mode": "callback" if ring is not None else "blocking",
+            "frames": self.frames,
+            "dropped": ring.dropped if ring is not None else None,
+            "input_overflows": self.input_overflows if ring is not None else None,
+            "max_backlog": ring.max_backlog if ring is not None else None,
+        }
+    
+    def _open_stream(self, stream_callback=None):
+        """打开输入流：文件捕获源（离线回放）直接读 WAV，否则用共享的 PyAudio 打开设备"""
+        if isinstance(self.device_info, FileDeviceInfo):
+            return self.device_info.open_stream()
+        
+        p = self._get_shared_pyaudio()
+        return p.open(
+            format=FORMAT,
+            channels=self.device_info.channels,
+            rate=self.device_info.sample_rate,
+            input=True,
+            input_device_index=self.device_info.index,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=stream_callback
+        )
+    
+    def _resample_frame(self, audio_data: np.ndarray) -> np.ndarray:
+        """单帧重采样到 16kHz，返回 float32（int16 量纲）"""
+        if self.resampler:
+            return self.resampler.process(audio_data)
+        return audio_data.astype(np.float32)
+    
+    def _consume_frame(self, frame_16k: np.ndarray):
+        """
+        说话期间的一帧：流式模式直接推送，否则写入 PCM 和归一化两个环形缓冲区
+        """
+        pcm = AudioProcessor.to_pcm16(frame_16k, scale=1.0)
+        if self.streamer:
+            self.streamer.feed_stream(self.source_type, pcm.tobytes())
+            return
+        
+        self.pcm_ring.write(pcm)
+        frame_16k *= 1.0 / INT16_MAX  # 原地归一化，frame_16k 是本帧新分配的数组
+        self.ring_buffer.write(frame_16k)
+    
+    def _process_buffer(self, buffer_duration: float, trace_id: Optional[str] = None):
+        """
+        语音结束：把环形缓冲区里已处理好的音频交给识别线程
+        
+        转单声道、重采样、归一化都已在读取每帧时完成，
+        这里只取一个零拷贝视图，不做任何计算；视图在队列里积压太久会被覆盖，
+        识别线程用 guard 检查
+        """
+        guard = RingGuard((self.ring_buffer, self.pcm_ring), self.ring_buffer.position)
+        audio_float32 = self.ring_buffer.take()
+        pcm = self.pcm_ring.take()
         
         # 创建 AudioChunk
         chunk = AudioChunk(
             source=self.source_type,
             audio_data=audio_float32,
             timestamp=time.time(),
-            duration=buffer_duration
+            duration=buffer_duration,
+            pcm=pcm,
+            trace_id=trace_id,
+            guard=guard
         )
-        
-        process_elapsed = time.time() - process_start
+        tracer.annotate(trace_id, duration=round(buffer_duration, 2))
         
         if DEBUG_MODE:
-            print(f"[{self.label}] 音频处理完成，耗时: {process_elapsed:.3f}秒，放入队列...")
+            print(f"[{self.label}] 音频就绪（{len(audio_float32)} 采样），放入队列...")
         
-        # 放入队列（队列满则丢弃最旧的）
+        # 放入队列（永不阻塞：满了由 PriorityAudioQueue 按优先级挤掉一条并计入 stats() 的 dropped）
+        tracer.mark(trace_id, "enqueued")
+        self.audio_queue.put_nowait(chunk)
+        if DEBUG_MODE:
+            print(f"[{self.label}] 已放入队列，队列大小: {self.audio_queue.qsize()}")
+
+
+class CaptureDSPWorker:
+    """
+    回调模式的 DSP 线程：一个线程处理所有设备
+    
+    各设备的 PortAudio 回调只把原始帧拷进自己的 FrameRing 并唤醒本线程；
+    本线程轮流 drain 每个设备（转单声道、VAD、重采样、入队都在这里），
+    Python 侧的卡顿（GC、识别回调、GIL 争用）只会让帧在环形缓冲区里积压，
+    不会让声卡丢数据；积压超过容量时丢帧并计数，可以从 stats() 看到
+    """
+    
+    def __init__(self, captures: list, stop_event: threading.Event):
+        self.captures = captures
+        self.stop_event = stop_event
+        self.wake = threading.Event()
+    
+    def run(self):
+        started = []
         try:
-            self.audio_queue.put_nowait(chunk)
-            if DEBUG_MODE:
-                print(f"[{self.label}] 已放入队列，队列大小: {self.audio_queue.qsize()}")
-        except queue.Full:
-            if DEBUG_MODE:
-                print(f"[{self.label}] 队列已满，丢弃最旧数据")
-            try:
-                self.audio_queue.get_nowait()
-                self.audio_queue.put_nowait(chunk)
-            except queue.Empty:
-                pass
+            for capture in self.captures:
+                try:
+                    capture.start_callback_stream(self.wake)
+                    started.append(capture)
+                except Exception as e:
+                    print(f"❌ [{capture.label}] 打开设备失败: {e}")
+            
+            while started and not self.stop_event.is_set():
+                # 回调每帧都会唤醒；超时兜底，防止错过唤醒
+                self.wake.wait(timeout=CHUNK_DURATION)
+                self.wake.clear()
+                for capture in started:
+                    try:
+                        capture.drain()
+                    except Exception as e:
+                        print(f"⚠️  [{capture.label}] 处理音频失败: {e}")
+        finally:
+            for capture in started:
+                capture.close_stream()
+            print("✓ [DSP] 捕获处理线程已退出")
 
 
-def start_capture_thread(
+def start_capture_threads(
     audio_queue: queue.Queue,
-    device_info: DeviceInfo,
-    source_type: Literal['speaker', 'microphone'],
-    stop_event: threading.Event
-) -> threading.Thread:
+    devices: dict,
+    stop_event: threading.Event,
+    streamer=None,
+    mode: str = CAPTURE_MODE,
+    process: bool = CAPTURE_PROCESS,
+    ring_buffers: Optional[dict] = None
+) -> tuple[list[threading.Thread], list[AudioCaptureThread]]:
     """
-    启动音频捕获线程的工厂函数
+    按捕获模式启动所有设备的捕获
+    
+    "blocking"：每个设备一个线程阻塞读取
+    "callback"：所有声卡设备共用一个 DSP 线程（文件捕获源没有声卡回调，仍按阻塞方式读取）
+    
+    Args:
+        devices: 来源 -> DeviceInfo（值为 None 的来源跳过）
+        streamer: 流式识别器（可选）
+        mode: 捕获模式（见 config.CAPTURE_MODE）
+        process: 是否在子进程里捕获和预处理（见 capture_process.py，流式识别时不支持）
+        ring_buffers: 来源 -> (float32, int16) 环形缓冲区（可选，默认每个捕获自己分配）
     
     Returns:
-        已启动的线程对象
+        (已启动的线程列表, 各设备的捕获对象，可调用 stats() 查看丢帧)
     """
-    if device_info is None:
-        print(f"❌ [{source_type}] 没有可用的捕获设备")
-        return None
+    if mode not in ("blocking", "callback"):
+        raise ValueError(f"未知的捕获模式: {mode}（支持: blocking, callback）")
+    
+    if process and streamer is not None:
+        print("⚠️  流式识别需要逐帧推送给识别器，捕获改为在本进程内运行")
+    elif process:
+        from capture_process import start_capture_process
+        return start_capture_process(audio_queue, devices, stop_event, mode)
     
-    capture = AudioCaptureThread(audio_queue, device_info, source_type, stop_event)
+    threads, captures, callback_captures = [], [], []
+    for source_type, device_info in devices.items():
+        if device_info is None:
+            continue
+        capture = AudioCaptureThread(audio_queue, device_info, source_type, stop_event, streamer,
+                                     (ring_buffers or {}).get(source_type))
+        captures.append(capture)
+        if mode == "callback" and not isinstance(device_info, FileDeviceInfo):
+            callback_captures.append(capture)
+            continue
+        thread = threading.Thread(target=capture.run, daemon=False, name=f"{source_type.capitalize()}Producer")
+        thread.start()
+        threads.append(thread)
     
-    thread = threading.Thread(
-        target=capture.run,
-        daemon=False,
-        name=f"{source_type.capitalize()}Producer"
-    )
-    thread.start()
+    if callback_captures:
+        worker = CaptureDSPWorker(callback_captures, stop_event)
+        thread = threading.Thread(target=worker.run, daemon=False, name="CaptureDSP")
+        thread.start()
+        threads.append(thread)
     
-    return thread
+    if not captures:
+        print("❌ 没有可用的捕获设备")
+    return threads, captures
 
@@ -3,8 +3,11 @@
 职责：检测虚拟音频设备和麦克风，选择最佳设备
 """
 
+import threading
+import time
+import wave
 import pyaudio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, List, Tuple
 
 
@@ -18,6 +21,84 @@ class DeviceInfo:
     priority: int
 
 
+class FileAudioStream:
+    """
+    WAV 文件音频流 - 接口与 PyAudio 输入流相同（read / stop_stream / close）
+    
+    按 speed 倍速节拍返回数据（1.0 = 实时，和声卡一样阻塞到这一块「录完」；0 = 不等待），
+    文件读完后再给 tail 秒静音让 VAD 收尾，之后一直返回静音并置位 finished
+    """
+    
+    def __init__(self, path: str, speed: float = 1.0, tail: float = 2.0):
+        self._wav = wave.open(path, 'rb')
+        if self._wav.getsampwidth() != 2:
+            raise ValueError(f"只支持 16bit PCM WAV: {path}")
+        self.channels = self._wav.getnchannels()
+        self.sample_rate = self._wav.getframerate()
+        self.speed = speed
+        self.finished = threading.Event()
+        
+        self._tail_frames = int(tail * self.sample_rate)
+        self._position = 0  # 已返回的帧数（含静音）
+        self._started = None
+    
+    def read(self, num_frames: int, exception_on_overflow: bool = False) -> bytes:
+        if self._started is None:
+            self._started = time.perf_counter()
+        
+        data = self._wav.readframes(num_frames) if self._wav else b""
+        missing = num_frames * self.channels * 2 - len(data)
+        if missing > 0:
+            # 文件读完：补静音，补够 tail 秒后标记结束
+            data += bytes(missing)
+            self._tail_frames -= missing // (self.channels * 2)
+            if self._tail_frames <= 0:
+                self.finished.set()
+        self._position += num_frames
+        
+        # 节拍：第 position 帧应在 position / rate / speed 秒时就绪
+        if self.speed > 0:
+            due = self._started + self._position / self.sample_rate / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+    
+    def stop_stream(self):
+        pass
+    
+    def close(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+@dataclass
+class FileDeviceInfo(DeviceInfo):
+    """
+    文件捕获源（离线回放用）：把录好的 WAV 当成一个输入设备
+    
+    AudioCaptureThread 遇到它时用 open_stream() 代替 PyAudio，
+    其余处理（重采样、VAD、入队）完全一样
+    """
+    path: str = ""
+    speed: float = 1.0  # 回放倍速（0 = 不等待，尽快读完）
+    tail: float = 2.0  # 文件结束后补多少秒静音
+    stream: Optional[FileAudioStream] = field(default=None, repr=False)
+    
+    @classmethod
+    def from_wav(cls, path: str, speed: float = 1.0, tail: float = 2.0) -> 'FileDeviceInfo':
+        with wave.open(path, 'rb') as wav:
+            channels, sample_rate = wav.getnchannels(), wav.getframerate()
+        return cls(index=-1, name=f"文件 {path}", channels=channels, sample_rate=sample_rate,
+                   priority=0, path=path, speed=speed, tail=tail)
+    
+    def open_stream(self) -> FileAudioStream:
+        """打开（每个设备一个流，finished 事件供回放脚本判断是否读完）"""
+        self.stream = FileAudioStream(self.path, self.speed, self.tail)
+        return self.stream
+
+
 class AudioDeviceManager:
     """音频设备管理器 - 单一职责"""
     
@@ -88,7 +169,7 @@ class AudioDeviceManager:
                 else:
                     microphone_devices.append(device)
                     print(f"  ❓ 未知输入设备（可能是麦克风）")
-                    
+            
             except Exception as e:
                 print(f"  ⚠️  无法读取设备 {i}: {e}")
         
@@ -5,7 +5,9 @@
 
 import numpy as np
 from dataclasses import dataclass
-from typing import Literal
+from functools import lru_cache
+from math import gcd
+from typing import Literal, Optional
 
 from config import INT16_MAX
 
@@ -17,6 +19,281 @@ class AudioChunk:
     audio_data: np.ndarray  # float32 格式，归一化到 [-1, 1]
     timestamp: float
     duration: float
+    pcm: Optional[np.ndarray] = None  # 同一段音频的 16kHz int16 PCM（有则直接发送，免去格式转换）
+    trace_id: Optional[str] = None  # 延迟追踪 ID（见 tracing.py）
+    guard: Optional["RingGuard"] = None  # 音频是环形缓冲区视图时的有效性检查（None 表示独立数组）
+    
+    def overwritten(self) -> bool:
+        """音频视图是否已被环形缓冲区覆盖（读完音频之后再检查，结果才可信）"""
+        return self.guard is not None and not self.guard.intact()
+
+
+# 每侧过零点数：越大过渡带越陡、抗混叠越好，计算量线性增长
+RESAMPLE_ZERO_CROSSINGS = 10
+RESAMPLE_KAISER_BETA = 5.0
+
+
+@lru_cache(maxsize=None)
+def _design_filter_bank(up: int, down: int) -> np.ndarray:
+    """
+    设计多相滤波器组（每个采样率组合只算一次）
+    
+    原型滤波器：Kaiser 窗 sinc 低通，截止频率 = min(输入, 输出) 奈奎斯特频率
+    多相分解：bank[p, k] = h[p + k * up]，第 p 相负责相位 p 的输出样本
+    
+    Returns:
+        shape (up, taps_per_phase) 的 float32 数组，只读
+    """
+    max_rate = max(up, down)
+    half_len = RESAMPLE_ZERO_CROSSINGS * max_rate
+    n = np.arange(-half_len, half_len + 1)
+    
+    h = np.sinc(n / max_rate) * np.kaiser(len(n), RESAMPLE_KAISER_BETA)
+    h *= up / h.sum()  # 插零上采样损失了 up 倍能量，补回来
+    
+    taps_per_phase = -(-len(h) // up)  # 向上取整
+    h = np.pad(h, (0, taps_per_phase * up - len(h)))
+    
+    bank = h.reshape(taps_per_phase, up).T.astype(np.float32)
+    bank.setflags(write=False)
+    return bank
+
+
+class PolyphaseResampler:
+    """
+    有理数倍多相重采样器（有状态，可逐帧调用）
+    
+    输出 = 先插 up-1 个零 → 低通 → 每 down 个取一个，
+    但只计算真正需要的输出点，每个输出点只做 taps_per_phase 次乘加
+    
+    逐帧调用时保留滤波器需要的历史样本，帧与帧之间无缝衔接，
+    整段音频结束时不再需要任何重采样工作
+    """
+    
+    def __init__(self, original_rate: int, target_rate: int):
+        divisor = gcd(original_rate, target_rate)
+        self.up = target_rate // divisor
+        self.down = original_rate // divisor
+        self.bank = _design_filter_bank(self.up, self.down)
+        self.taps = self.bank.shape[1]
+        
+        # 群延迟（输出样本数）：原型滤波器中心点
+        self.delay = (RESAMPLE_ZERO_CROSSINGS * max(self.up, self.down)) // self.down
+        
+        self._tap_offsets = np.arange(self.taps)
+        self._reversed_taps = np.ascontiguousarray(self.bank[0][::-1])
+        self.reset()
+    
+    def reset(self):
+        """清空历史（新的一段音频）"""
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0  # 已输入样本总数
+        self._produced = 0  # 已输出样本总数
+    
+    def process(self, frame: np.ndarray) -> np.ndarray:
+        """
+        输入一帧，输出这一帧能确定的全部输出样本
+        
+        Args:
+            frame: 原始采样率的单声道音频（int16 或 float）
+        
+        Returns:
+            目标采样率的 float32 音频（量纲与输入相同，不做归一化）
+        """
+        if len(frame) == 0:
+            return np.zeros(0, dtype=np.float32)
+        
+        buffer = np.concatenate((self._history, frame.astype(np.float32, copy=False)))
+        buffer_start = self._consumed - len(self._history)  # buffer[0] 对应的输入序号
+        last_input = self._consumed + len(frame) - 1
+        
+        # 输出 n 依赖输入 x[n*down//up - k]，最后一个可计算的 n：
+        last_output = (last_input * self.up + self.up - 1) // self.down
+        positions = np.arange(self._produced, last_output + 1) * self.down
+        
+        phases = positions % self.up
+        bases = positions // self.up - buffer_start
+        
+        if len(bases) == 0:
+            # 帧太短（不足一个降采样步长），还凑不出输出点：只把它并入历史
+            output = np.zeros(0, dtype=np.float32)
+        elif self.up == 1:
+            # 整数倍降采样：只有一相，滑动窗口视图按步长取行，免去 gather 拷贝
+            windows = np.lib.stride_tricks.sliding_window_view(buffer, self.taps)
+            start = bases[0] - self.taps + 1
+            output = windows[start:start + len(bases) * self.down:self.down] @ self._reversed_taps
+        else:
+            # (输出数, taps) 的输入索引矩阵，一次 gather + 一次按行点积
+            window = buffer[bases[:, None] - self._tap_offsets]
+            output = np.einsum('ij,ij->i', window, self.bank[phases])
+        
+        self._history = buffer[-(self.taps - 1):] if self.taps > 1 else buffer[:0]
+        self._consumed += len(frame)
+        self._produced = last_output + 1
+        
+        return output
+    
+    def flush(self) -> np.ndarray:
+        """补零推出滤波器尾部的样本"""
+        return self.process(np.zeros(self.taps, dtype=np.float32))
+
+
+class AudioRingBuffer:
+    """
+    预分配环形缓冲区 - 每段语音占其中一段连续区域
+    
+    写入端逐帧 write，语音结束时 take 返回这段语音的视图（零拷贝），
+    下一段语音从视图之后继续写。视图在缓冲区绕回一整圈之前保持有效；
+    队列积压超过容量时旧视图会被覆盖，用 RingGuard 检查（见 intact）
+    
+    只允许单个写线程使用；intact 可以在任何线程、任何挂上同一块内存的进程里调用
+    """
+    
+    def __init__(self, capacity: int, dtype=np.float32, buffer=None):
+        """
+        Args:
+            capacity: 容量（采样数）
+            dtype: 采样类型
+            buffer: 外部内存（如 shared_memory 的 buf，至少 nbytes(capacity, dtype) 字节且初始全零；
+                    None 表示自己分配）
+        """
+        if buffer is None:
+            buffer = bytearray(self.nbytes(capacity, dtype))
+        data_bytes = self._data_bytes(capacity, dtype)
+        self._data = np.ndarray(capacity, dtype=dtype, buffer=buffer)
+        # 已写到的绝对位置（只增不减，绕回一圈加 capacity）：放在同一块内存末尾，读端进程也能看到
+        self._written = np.ndarray(1, dtype=np.int64, buffer=buffer, offset=data_bytes)
+        self._base = 0  # 物理位置 0 的绝对位置
+        self._start = 0  # 当前语音起点
+        self._end = 0  # 写入位置
+    
+    @staticmethod
+    def _data_bytes(capacity: int, dtype) -> int:
+        return -(-capacity * np.dtype(dtype).itemsize // 8) * 8  # 按 8 字节对齐，后面放 int64 计数
+    
+    @classmethod
+    def nbytes(cls, capacity: int, dtype=np.float32) -> int:
+        """外部内存需要的字节数（采样 + 已写位置计数）"""
+        return cls._data_bytes(capacity, dtype) + 8
+    
+    def __len__(self) -> int:
+        return self._end - self._start
+    
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+    
+    @property
+    def position(self) -> int:
+        """当前语音起点的绝对位置（take 之前读取，交给 RingGuard）"""
+        return self._base + self._start
+    
+    def write(self, samples: np.ndarray):
+        """追加到当前语音末尾，放不下时把当前语音搬到缓冲区开头"""
+        n = len(samples)
+        if self._end + n > self.capacity:
+            length = len(self)
+            if length + n > self.capacity:
+                raise ValueError(f"单段语音超过环形缓冲区容量（{self.capacity} 采样）")
+            self._base += self.capacity
+            self._written[0] = self._base + length  # 先登记再覆盖：读端复查时一定能看到
+            self._data[:length] = self._data[self._start:self._end]
+            self._start, self._end = 0, length
+        
+        self._written[0] = self._base + self._end + n
+        self._data[self._end:self._end + n] = samples
+        self._end += n
+    
+    def take(self) -> np.ndarray:
+        """取出当前语音（视图），开始新的一段"""
+        view = self._data[self._start:self._end]
+        self._start = self._end
+        return view
+    
+    def discard(self):
+        """丢弃当前语音"""
+        self._end = self._start
+    
+    def intact(self, position: int) -> bool:
+        """从绝对位置 position 开始的视图是否还没被覆盖（写入总是从视图起点开始覆盖）"""
+        return int(self._written[0]) <= position + self.capacity
+
+
+class RingGuard:
+    """
+    环形缓冲区视图的有效性检查（序号校验，同 seqlock 的读端）
+    
+    记下视图起点的绝对位置；写入端每次覆盖之前先推进已写位置，
+    读端读完音频后再检查一次：仍然 intact 说明读到的数据没被改写过
+    """
+    
+    def __init__(self, rings: tuple, position: int):
+        """
+        Args:
+            rings: 同步写入的环形缓冲区（float32 和 int16 PCM，位置始终一致）
+            position: 视图起点的绝对位置（AudioRingBuffer.position）
+        """
+        self.rings = rings
+        self.position = position
+    
+    def intact(self) -> bool:
+        return all(ring.intact(self.position) for ring in self.rings)
+
+
+class FrameRing:
+    """
+    单生产者单消费者的定长帧环形缓冲区（无锁）
+    
+    生产者（PortAudio 回调）把一帧原始字节拷进预分配的槽位，再推进写序号；
+    消费者（DSP 线程）peek 到帧、处理完再 advance 推进读序号。
+    两个序号各自只有一方写，整数赋值在 GIL 下是原子的，所以不需要锁，
+    回调里不会因为等锁而阻塞音频线程
+    
+    满了就丢弃新帧并计数（不覆盖消费者可能正在读的槽位）
+    """
+    
+    def __init__(self, slots: int, frame_bytes: int):
+        self._frames = np.zeros((slots, frame_bytes), dtype=np.uint8)
+        self._lengths = np.zeros(slots, dtype=np.int64)
+        self._times = np.zeros(slots, dtype=np.float64)
+        self._write = 0  # 已写入帧数（只由生产者修改）
+        self._read = 0  # 已消费帧数（只由消费者修改）
+        self.dropped = 0  # 因缓冲区满而丢弃的帧数
+        self.max_backlog = 0  # 最多积压过多少帧
+    
+    def __len__(self) -> int:
+        return self._write - self._read
+    
+    @property
+    def slots(self) -> int:
+        return len(self._frames)
+    
+    def push(self, data: bytes, at: float) -> bool:
+        """生产者：写入一帧（超长部分截断），缓冲区满时丢弃并返回 False"""
+        backlog = self._write - self._read
+        if backlog >= self.slots:
+            self.dropped += 1
+            return False
+        
+        slot = self._write % self.slots
+        n = min(len(data), self._frames.shape[1])
+        self._frames[slot, :n] = np.frombuffer(data, dtype=np.uint8, count=n)
+        self._lengths[slot] = n
+        self._times[slot] = at
+        self._write += 1  # 数据写完才发布
+        self.max_backlog = max(self.max_backlog, backlog + 1)
+        return True
+    
+    def peek(self) -> Optional[tuple[np.ndarray, float]]:
+        """消费者：最旧的一帧（槽位视图 + 到达时刻），没有则返回 None；用完调用 advance"""
+        if self._read == self._write:
+            return None
+        slot = self._read % self.slots
+        return self._frames[slot, :self._lengths[slot]], float(self._times[slot])
+    
+    def advance(self):
+        """消费者：释放 peek 到的帧（之后槽位可能被覆盖）"""
+        self._read += 1
 
 
 class AudioProcessor:
@@ -25,19 +302,27 @@ class AudioProcessor:
     @staticmethod
     def resample(audio_data: np.ndarray, original_rate: int, target_rate: int) -> np.ndarray:
         """
-        线性重采样
+        整段多相重采样（抗混叠，滤波器组按采样率组合缓存）
         
-        注意：这是简单实现，生产环境应使用 librosa 或 scipy
-        但对于语音识别场景足够了
+        整段处理会补偿滤波器群延迟，输出长度与原线性实现一致；
+        逐帧场景请直接使用 PolyphaseResampler
         """
         if original_rate == target_rate:
             return audio_data
         
-        duration = len(audio_data) / original_rate
-        target_length = int(duration * target_rate)
+        target_length = int(len(audio_data) * target_rate / original_rate)
+        
+        # 分块处理：gather 矩阵保持在缓存大小量级，长音频不会被内存带宽拖慢
+        resampler = PolyphaseResampler(original_rate, target_rate)
+        block = original_rate // 10
+        parts = [resampler.process(audio_data[i:i + block]) for i in range(0, len(audio_data), block)]
+        parts.append(resampler.flush())
+        resampled = np.concatenate(parts)
+        resampled = resampled[resampler.delay:resampler.delay + target_length]
         
-        indices = np.linspace(0, len(audio_data) - 1, target_length)
-        resampled = np.interp(indices, np.arange(len(audio_data)), audio_data)
+        if np.issubdtype(audio_data.dtype, np.integer):
+            info = np.iinfo(audio_data.dtype)
+            resampled = np.clip(np.rint(resampled), info.min, info.max)
         
         return resampled.astype(audio_data.dtype)
     
@@ -65,6 +350,18 @@ class AudioProcessor:
         """
         return audio_data.astype(np.float32) / INT16_MAX
     
+    @staticmethod
+    def to_pcm16(audio_data: np.ndarray, scale: float = INT16_MAX) -> np.ndarray:
+        """
+        浮点音频转 int16 PCM（四舍五入 + 限幅，满幅 1.0 不会溢出成 -32768）
+        
+        Args:
+            audio_data: 浮点音频
+            scale: 输入量纲（归一化音频为 INT16_MAX，int16 量纲的浮点音频为 1.0）
+        """
+        scaled = np.rint(audio_data * scale) if scale != 1.0 else np.rint(audio_data)
+        return np.clip(scaled, -INT16_MAX, INT16_MAX - 1).astype(np.int16)
+    
     @staticmethod
     def calculate_volume(audio_data: np.ndarray) -> float:
         """
@@ -80,6 +377,48 @@ class AudioProcessor:
         volume = AudioProcessor.calculate_volume(audio_data)
         return volume < threshold
     
+    @staticmethod
+    def split_at_pauses(audio_data: np.ndarray, rate: int, max_duration: float,
+                        search_window: float, frame_duration: float = 0.02) -> list[tuple[int, int]]:
+        """
+        把长音频切成不超过 max_duration 秒的片段，切点选在能量最低处（停顿、换气）
+        
+        每段在 [max_duration - search_window, max_duration] 范围内找能量最低的一帧，
+        从该帧中间切开，尽量不把一个字切成两半
+        
+        Args:
+            audio_data: 音频
+            rate: 采样率
+            max_duration: 每段最长时长（秒）
+            search_window: 在每段末尾多长的范围内找切点（秒）
+            frame_duration: 能量计算的帧长（秒）
+        
+        Returns:
+            [(起点, 终点)] 采样点下标，首尾相接覆盖整段音频（可直接切片，零拷贝）
+        """
+        total = len(audio_data)
+        max_len = int(max_duration * rate)
+        if total <= max_len:
+            return [(0, total)]
+        
+        # 逐帧能量（一次向量化计算）
+        frame = max(1, int(frame_duration * rate))
+        frames = total // frame
+        energy = np.square(audio_data[:frames * frame].reshape(frames, frame), dtype=np.float32).sum(axis=1)
+        
+        window_frames = max(1, int(search_window * rate) // frame)
+        segments = []
+        start = 0
+        while total - start > max_len:
+            last = (start + max_len) // frame  # 切点最晚落在这一帧
+            first = max(start // frame + 1, last - window_frames)
+            cut_frame = first + int(np.argmin(energy[first:last])) if last > first else last
+            cut = min(cut_frame * frame + frame // 2, start + max_len)
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, total))
+        return segments
+    
     @staticmethod
     def validate_audio(audio_data: np.ndarray) -> bool:
         """
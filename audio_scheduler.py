@@ -0,0 +1,172 @@
+"""
+识别队列调度
+职责：按来源优先级和等待时间决定先识别谁，过载时决定丢弃谁
+
+面试官的问题（speaker）优先于自己说的话（microphone）：
+- 取数据：高优先级先出，同优先级先进先出
+- 防饿死：低优先级等待超过 max_wait 秒后可以插到前面
+- 过载：先丢麦克风（最旧的），面试官的问题最后才丢
+"""
+
+import queue
+import time
+from collections import deque
+
+from config import AUDIO_QUEUE_MAX_SIZE, SOURCE_PRIORITY, SCHEDULER_MAX_WAIT
+from tracing import percentile
+
+
+class PriorityLanes:
+    """
+    按来源优先级分道存放音频，决定先取谁、过载时丢谁，并统计各来源计数和等待时长
+    
+    本身不加锁：线程版 PriorityAudioQueue 在 mutex 内调用，
+    asyncio 版（async_pipeline.AsyncPriorityQueue）只在事件循环线程里调用
+    """
+    
+    WAIT_WINDOW = 200  # 等待时长统计保留最近多少条
+    
+    def __init__(self, priorities: dict = None, max_wait: float = SCHEDULER_MAX_WAIT):
+        """
+        Args:
+            priorities: 来源 -> 优先级（数字越小越优先）
+            max_wait: 低优先级数据最多等待多久后允许插队（秒）
+        """
+        self.priorities = dict(SOURCE_PRIORITY if priorities is None else priorities)
+        self.max_wait = max_wait
+        self._default_priority = max(self.priorities.values(), default=0) + 1
+        self._lanes = {}  # 优先级 -> deque[(入队时刻, item)]
+        self._counters = {}  # source -> {"enqueued", "dequeued", "dropped"}
+        self._waits = {}  # source -> deque[等待秒数]
+    
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+    
+    def push(self, item):
+        self._lanes.setdefault(self.priority_of(item), deque()).append((time.time(), item))
+        self._count(item, "enqueued")
+    
+    def pop(self):
+        now = time.time()
+        lanes = [(priority, lane) for priority, lane in sorted(self._lanes.items()) if lane]
+        
+        # 默认取最高优先级；低优先级等太久的话，取等得最久的那个
+        chosen = lanes[0][1]
+        starving = [lane for _, lane in lanes[1:] if now - lane[0][0] > self.max_wait]
+        if starving:
+            chosen = min(starving, key=lambda lane: lane[0][0])
+        
+        enqueued_at, item = chosen.popleft()
+        self._count(item, "dequeued")
+        self._waits.setdefault(self._source_of(item), deque(maxlen=self.WAIT_WINDOW)).append(now - enqueued_at)
+        return item
+    
+    def evict_for(self, item) -> bool:
+        """
+        队列满时为新数据腾位置，返回是否腾出了位置
+        
+        - 队列里有优先级更低或相同的数据 → 丢掉其中最低优先级里最旧的一项
+        - 队列里全是更高优先级的数据 → 不腾位置，新来的这一项计入丢弃
+        """
+        worst = max((p for p, lane in self._lanes.items() if lane), default=None)
+        if worst is None or worst < self.priority_of(item):
+            self._count(item, "dropped")
+            return False
+        
+        _, victim = self._lanes[worst].popleft()
+        self._count(victim, "dropped")
+        return True
+    
+    def _source_of(self, item) -> str:
+        return getattr(item, "source", "unknown")
+    
+    def priority_of(self, item) -> int:
+        return self.priorities.get(self._source_of(item), self._default_priority)
+    
+    def _count(self, item, name: str):
+        counters = self._counters.setdefault(
+            self._source_of(item), {"enqueued": 0, "dequeued": 0, "dropped": 0}
+        )
+        counters[name] += 1
+    
+    def stats(self) -> dict:
+        """
+        各来源计数和排队等待时长
+        
+        Returns:
+            {source: {"enqueued", "dequeued", "dropped", "queued",
+                      "wait_p50", "wait_p95", "wait_max"}}
+        """
+        queued = {}
+        for lane in self._lanes.values():
+            for _, item in lane:
+                source = self._source_of(item)
+                queued[source] = queued.get(source, 0) + 1
+        
+        result = {}
+        for source, counters in self._counters.items():
+            waits = sorted(self._waits.get(source, ()))
+            entry = dict(counters, queued=queued.get(source, 0))
+            if waits:
+                entry["wait_p50"] = percentile(waits, 0.50)
+                entry["wait_p95"] = percentile(waits, 0.95)
+                entry["wait_max"] = waits[-1]
+            result[source] = entry
+        return result
+
+
+class PriorityAudioQueue(queue.Queue):
+    """
+    按来源优先级调度的音频队列（调度和丢弃策略见 PriorityLanes）
+    
+    接口与 queue.Queue 相同（get/put/task_done/qsize），捕获线程和识别线程无需改动。
+    区别是 put 永不阻塞、永不抛 queue.Full：队列满时按优先级丢弃一项
+    （可能是队列中的旧数据，也可能是新来的低优先级数据），并计入丢弃统计
+    """
+    
+    def __init__(self, maxsize: int = AUDIO_QUEUE_MAX_SIZE,
+                 priorities: dict = None, max_wait: float = SCHEDULER_MAX_WAIT):
+        """
+        Args:
+            maxsize: 队列容量（所有来源合计）
+            priorities: 来源 -> 优先级（数字越小越优先）
+            max_wait: 低优先级数据最多等待多久后允许插队（秒）
+        """
+        self._lanes = PriorityLanes(priorities, max_wait)
+        super().__init__(maxsize)
+    
+    # ============ queue.Queue 扩展点（均在 self.mutex 内调用） ============
+    
+    def _init(self, maxsize):
+        pass  # 存储在 __init__ 里建好的 PriorityLanes 中
+    
+    def _qsize(self):
+        return len(self._lanes)
+    
+    def _put(self, item):
+        self._lanes.push(item)
+    
+    def _get(self):
+        return self._lanes.pop()
+    
+    # ============ 过载处理 ============
+    
+    def put(self, item, block=True, timeout=None):
+        """放入数据（永不阻塞，队列满时按优先级丢弃一项）"""
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                if not self._lanes.evict_for(item):
+                    return
+                # 被丢弃的数据永远不会 task_done，这里替它完成
+                self.unfinished_tasks -= 1
+                if self.unfinished_tasks == 0:
+                    self.all_tasks_done.notify_all()
+            
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+    
+    def stats(self) -> dict:
+        """各来源计数和排队等待时长（见 PriorityLanes.stats）"""
+        with self.mutex:
+            return self._lanes.stats()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+一句话识别 HTTP 开销基准测试：冷连接 vs 连接池热连接
+
+在本地起一个 HTTPS 替身服务器（自签名证书，需要 openssl 命令），模拟腾讯云 API：
+- 新连接额外等待 2 个 RTT（TCP + TLS 握手的往返），每个请求等待 1 个 RTT
+- 返回固定识别结果
+
+对比：
+1. 冷连接：每次识别新建连接（DNS + TCP + TLS + 请求）
+2. 热连接：TencentCloudClient 连接池预热后复用连接（只有请求本身）
+
+运行：python benchmarks/bench_asr_http.py [--rtt 0.03] [--requests 20]
+"""
+
+import argparse
+import http.server
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tencent_api import TencentCloudClient  # noqa: E402
+
+
+def make_certificate(directory: str) -> tuple[str, str]:
+    """生成 localhost 自签名证书，返回 (证书, 私钥) 路径"""
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def start_standin(cert: str, key: str, rtt: float) -> http.server.ThreadingHTTPServer:
+    """启动 HTTPS 替身服务器（后台线程），返回 server（server.server_port 为端口）"""
+    
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持 keep-alive
+        
+        def setup(self):
+            time.sleep(2 * rtt)  # 新连接：TCP + TLS 握手的往返
+            super().setup()
+        
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(rtt)
+            body = json.dumps({"Response": {"Result": "你好。", "RequestId": "standin"}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        
+        def log_message(self, *args):
+            pass
+    
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_params() -> dict:
+    """和 TencentASR 一样的请求体：3 秒 16kHz 音频"""
+    import base64
+    audio = (np.random.default_rng(0).normal(0, 0.1, 48000) * 32767).astype(np.int16)
+    data = base64.b64encode(audio.tobytes()).decode()
+    return {"EngSerViceType": "16k_zh", "SourceType": 1, "VoiceFormat": "pcm", "Data": data, "DataLen": len(audio) * 2}
+
+
+def measure(client: TencentCloudClient, params: dict, count: int, interval: float) -> list:
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.call("SentenceRecognition", params)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+def report(name: str, latencies: list, client: TencentCloudClient):
+    ms = np.array(latencies) * 1000
+    stats = client.pool.stats
+    print(f"{name:<14}{ms[0]:>10.1f}{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 95):>10.1f}"
+          f"{stats['created']:>10}{stats['reused']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rtt', type=float, default=0.03, help='模拟的网络往返时延（秒）')
+    parser.add_argument('--requests', type=int, default=20, help='每种方式的请求数')
+    parser.add_argument('--interval', type=float, default=0.05, help='请求间隔（秒）')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = make_certificate(tmp)
+        server = start_standin(cert, key, args.rtt)
+        endpoint = f"https://127.0.0.1:{server.server_port}"
+        context = ssl.create_default_context(cafile=cert)
+        params = make_params()
+        
+        print(f"替身服务器 {endpoint}，模拟 RTT {args.rtt * 1000:.0f}ms，每种方式 {args.requests} 个请求")
+        print(f"{'方式':<12}{'首个(ms)':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'新建连接':>8}{'复用':>8}")
+        print("-" * 62)
+        
+        # 1. 冷连接：连接池容量 0，每次用完就关
+        cold = TencentCloudClient("id", "key", "asr", "2019-06-14", "ap-shanghai",
+                                  endpoint=endpoint, pool_size=0, context=context)
+        report("冷连接", measure(cold, params, args.requests, args.interval), cold)
+        cold.close()
+        
+        # 2. 热连接：预热后复用
+        warm = TencentCloudClient("id", "key", "asr", "2019-06-14", "ap-shanghai",
+                                  endpoint=endpoint, pool_size=2, context=context)
+        warm.prewarm()
+        time.sleep(0.5)  # 启动后到第一句话之间的间隔
+        report("热连接(预热)", measure(warm, params, args.requests, args.interval), warm)
+        warm.close()
+        
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+识别 worker 池基准测试：吞吐量 + 各来源 p95 延迟
+
+用 FakeASR（固定延迟 + 与音频时长成正比的延迟，返回音频长度作为文本）代替腾讯云，
+模拟面试官和麦克风交替说话，比较不同 worker 数下：
+- 吞吐量（句/秒）
+- 各来源「入队 → 回调」p50 / p95 延迟
+- 同一来源回调顺序是否与入队顺序一致
+
+再在过载（队列容量小、单 worker）下对比 FIFO 队列和优先级队列：
+面试官问题的 p95 延迟和各来源丢弃条数
+
+最后检查回调不在重排序锁内执行：麦克风回调很慢（如触发 LLM）时，面试官的结果不被拖住，
+慢回调期间识别完的麦克风结果仍按顺序交付
+
+运行：python benchmarks/bench_asr_pool.py [--delay 0.4] [--per-second 0.1]
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RATE  # noqa: E402
+from audio_processor import AudioChunk  # noqa: E402
+from audio_scheduler import PriorityAudioQueue  # noqa: E402
+from asr_backend import FakeASR  # noqa: E402
+from speech_recognizer import SpeechRecognizer  # noqa: E402
+
+
+def make_workload(count: int, seed: int = 0) -> list:
+    """交替的面试官短问题和麦克风长回答，每条长度唯一（用作 ID）"""
+    rng = np.random.default_rng(seed)
+    workload = []
+    for i in range(count):
+        source = 'speaker' if i % 2 == 0 else 'microphone'
+        seconds = rng.uniform(1, 4) if source == 'speaker' else rng.uniform(5, 10)
+        samples = int(seconds * RATE) + i  # +i 保证长度唯一
+        workload.append((source, samples, seconds))
+    return workload
+
+
+def put_fifo(audio_queue: queue.Queue, chunk: AudioChunk) -> str:
+    """捕获线程原来的入队方式：满了就丢最旧的，返回被丢的来源"""
+    try:
+        audio_queue.put_nowait(chunk)
+        return None
+    except queue.Full:
+        dropped = audio_queue.get_nowait()
+        audio_queue.task_done()
+        audio_queue.put_nowait(chunk)
+        return dropped.source
+
+
+def run(workers: int, asr: FakeASR, workload: list, interval: float,
+        audio_queue: queue.Queue = None) -> dict:
+    audio_queue = audio_queue or queue.Queue(maxsize=len(workload) + 1)
+    dropped = {'speaker': 0, 'microphone': 0}
+    stop_event = threading.Event()
+    results = []
+    done = threading.Event()
+    
+    def on_result(source, text, timestamp):
+        results.append((source, int(text), timestamp))
+        if len(results) + sum(dropped.values()) == len(workload):
+            done.set()
+    
+    # 不切段：文本是整段的采样点数，用作 ID
+    recognizer = SpeechRecognizer(audio_queue, stop_event, asr, on_result, num_workers=workers, segment_duration=0)
+    thread = threading.Thread(target=recognizer.run, daemon=True)
+    thread.start()
+    
+    enqueue_times = {}
+    start = time.time()
+    for source, samples, seconds in workload:
+        audio = np.full(samples, 0.1, dtype=np.float32)
+        now = time.time()
+        enqueue_times[samples] = now
+        chunk = AudioChunk(source=source, audio_data=audio, timestamp=now, duration=seconds)
+        if isinstance(audio_queue, PriorityAudioQueue):
+            audio_queue.put_nowait(chunk)
+        else:
+            victim = put_fifo(audio_queue, chunk)
+            if victim:
+                dropped[victim] += 1
+        time.sleep(interval)
+    
+    if isinstance(audio_queue, PriorityAudioQueue):
+        for source, stats in audio_queue.stats().items():
+            dropped[source] = stats['dropped']
+    if len(results) + sum(dropped.values()) == len(workload):
+        done.set()
+    done.wait(timeout=120)
+    elapsed = time.time() - start
+    stop_event.set()
+    thread.join(timeout=5)
+    
+    latencies = {'speaker': [], 'microphone': []}
+    delivered = {'speaker': [], 'microphone': []}
+    for source, samples, timestamp in results:
+        latencies[source].append(timestamp - enqueue_times[samples])
+        delivered[source].append(samples)
+    
+    expected = {s: [n for src, n, _ in workload if src == s] for s in latencies}
+    return {
+        'throughput': len(results) / elapsed,
+        'ordered': all(delivered[s] == sorted(delivered[s], key=expected[s].index) for s in latencies),
+        'dropped': dropped,
+        'latency': {s: (np.percentile(v, 50), np.percentile(v, 95)) for s, v in latencies.items() if v},
+    }
+
+
+def check_slow_callback(callback_delay: float = 1.0):
+    """4 worker，麦克风 3 句 + 面试官 1 句同时入队，麦克风回调每次 callback_delay 秒"""
+    audio_queue = queue.Queue()
+    stop_event = threading.Event()
+    results = []
+    
+    def on_result(source, text, timestamp):
+        results.append((source, int(text), time.time()))
+        if source == 'microphone':
+            time.sleep(callback_delay)
+    
+    recognizer = SpeechRecognizer(audio_queue, stop_event, FakeASR(delay=0.1), on_result, num_workers=4)
+    thread = threading.Thread(target=recognizer.run, daemon=True)
+    thread.start()
+    
+    start = time.time()
+    for source, samples in (('microphone', 16000), ('microphone', 16001), ('speaker', 16002), ('microphone', 16003)):
+        audio_queue.put(AudioChunk(source=source, audio_data=np.full(samples, 0.1, dtype=np.float32),
+                                   timestamp=start, duration=1.0))
+    deadline = time.time() + 3 * callback_delay + 5
+    while len(results) < 4 and time.time() < deadline:
+        time.sleep(0.05)
+    stop_event.set()
+    thread.join(timeout=5)
+    
+    speaker_latency = next(at for source, _, at in results if source == 'speaker') - start
+    microphone = [samples for source, samples, _ in results if source == 'microphone']
+    assert microphone == [16000, 16001, 16003], microphone
+    assert speaker_latency < callback_delay, f"面试官结果等了麦克风回调 {speaker_latency:.2f}秒"
+    print(f"✓ 麦克风回调 {callback_delay:.1f}秒/次时，面试官结果 {speaker_latency:.2f}秒交付，麦克风结果顺序不变")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=0.4, help='假 ASR 固定延迟（秒）')
+    parser.add_argument('--per-second', type=float, default=0.1, help='每秒音频额外延迟（秒）')
+    parser.add_argument('--count', type=int, default=24, help='语音条数')
+    parser.add_argument('--interval', type=float, default=0.3, help='入队间隔（秒）')
+    args = parser.parse_args()
+    
+    asr = FakeASR(delay=args.delay, per_second=args.per_second)
+    workload = make_workload(args.count)
+    
+    print(f"假 ASR 延迟: {args.delay}s + {args.per_second}s/秒音频，{args.count} 条，入队间隔 {args.interval}s")
+    print(f"{'workers':>8}{'吞吐(句/秒)':>14}{'面试官 p50/p95':>20}{'麦克风 p50/p95':>20}{'顺序':>8}")
+    print("-" * 72)
+    for workers in (1, 2, 4):
+        r = run(workers, asr, workload, args.interval)
+        spk = r['latency'].get('speaker', (0, 0))
+        mic = r['latency'].get('microphone', (0, 0))
+        print(f"{workers:>8}{r['throughput']:>14.2f}"
+              f"{spk[0]:>11.2f}s/{spk[1]:.2f}s{mic[0]:>11.2f}s/{mic[1]:.2f}s"
+              f"{'✓' if r['ordered'] else '✗':>8}")
+    
+    # 过载：单 worker + 小队列，麦克风长回答把队列塞满
+    capacity = 3
+    print(f"\n过载对比（1 worker，队列容量 {capacity}）")
+    print(f"{'队列':>10}{'面试官 p50/p95':>20}{'麦克风 p50/p95':>20}{'丢弃 面试官/麦克风':>20}")
+    print("-" * 72)
+    for name, factory in (('fifo', queue.Queue), ('priority', PriorityAudioQueue)):
+        r = run(1, asr, workload, args.interval, factory(maxsize=capacity))
+        spk = r['latency'].get('speaker', (0, 0))
+        mic = r['latency'].get('microphone', (0, 0))
+        print(f"{name:>10}{spk[0]:>11.2f}s/{spk[1]:.2f}s{mic[0]:>11.2f}s/{mic[1]:.2f}s"
+              f"{r['dropped']['speaker']:>14}/{r['dropped']['microphone']}")
+    
+    print()
+    check_slow_callback()
+
+
+if __name__ == "__main__":
+    main()
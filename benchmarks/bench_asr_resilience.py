@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+ASR 容错层基准测试：裸后端 vs ResilientASR
+
+用 FakeASR 注入故障和长尾延迟代替腾讯云：
+1. 抖动：10% 请求失败、4% 请求额外慢 1 秒 —— 对比成功率和 p50 / p95 / p99 延迟
+   （重试消化失败，对冲消化长尾）
+2. 宕机：主后端中途不可用一段时间 —— 对比抛给识别器的错误数；
+   熔断后走备用后端，主后端恢复后自动切回，宕机期间主后端只收到少量探测请求
+3. 卡死：主后端每个请求都卡住不返回（超时后线程仍被占着）—— 请求线程占满后新请求立即失败、
+   计入熔断并转备用后端，不在线程池里排队等超时；同时在途的主后端请求不超过 max_workers
+
+运行：python benchmarks/bench_asr_resilience.py [--calls 300] [--threads 4]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RATE  # noqa: E402
+from asr_backend import FakeASR  # noqa: E402
+from asr_resilience import CircuitBreaker, ResilientASR  # noqa: E402
+
+AUDIO = np.zeros(RATE, dtype=np.float32)
+
+
+def flaky_backend() -> FakeASR:
+    return FakeASR(delay=0.05, failure_rate=0.1, slow_rate=0.04, slow_delay=1.0, seed=1)
+
+
+def run_calls(backend, calls: int, threads: int, before_call=None) -> tuple[list, int]:
+    """threads 个线程并发调用 calls 次，返回 (成功请求的耗时列表, 抛出的错误数)"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = iter(range(calls))
+    
+    def one_call(_):
+        nonlocal errors
+        with lock:
+            index = next(counter)
+        if before_call:
+            before_call(index)
+        start = time.perf_counter()
+        try:
+            backend.recognize(AUDIO)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+    
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one_call, range(calls)))
+    return latencies, errors
+
+
+def report(name: str, latencies: list, errors: int, calls: int):
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    print(f"{name:<16}{1 - errors / calls:>8.1%}{np.percentile(ms, 50):>10.0f}"
+          f"{np.percentile(ms, 95):>10.0f}{np.percentile(ms, 99):>10.0f}{ms.max():>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=300, help='每个场景的请求数')
+    parser.add_argument('--threads', type=int, default=4, help='并发请求数')
+    args = parser.parse_args()
+    
+    # 1. 抖动：失败 + 长尾
+    print("场景 1：10% 失败 + 4% 慢 1 秒（正常 50ms）")
+    print(f"{'方式':<14}{'成功率':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    print("-" * 64)
+    report("裸后端", *run_calls(flaky_backend(), args.calls, args.threads), args.calls)
+    
+    resilient = ResilientASR(flaky_backend(), timeout=2.0, deadline=3.0, retries=2, backoff=0.02,
+                             hedge_min_samples=20)
+    report("ResilientASR", *run_calls(resilient, args.calls, args.threads), args.calls)
+    stats = resilient.stats()
+    print(f"  重试 {stats['retries']} | 对冲 {stats['hedges']}（胜出 {stats['hedge_wins']}）| "
+          f"对冲阈值 {resilient.hedge_delay() * 1000:.0f}ms | 超时 {stats['timeouts']}")
+    resilient.close()
+    
+    # 2. 宕机：第 1/3 ~ 2/3 的请求期间主后端不可用
+    outage = range(args.calls // 3, 2 * args.calls // 3)
+    
+    def toggle(primary):
+        def before_call(index):
+            primary.available = index not in outage
+            time.sleep(0.01)  # 请求间隔，让熔断冷却期有机会过去
+        return before_call
+    
+    print(f"\n场景 2：第 {outage.start}~{outage.stop} 个请求期间主后端宕机（熔断阈值 5，冷却 0.5 秒）")
+    print(f"{'方式':<14}{'抛出错误':>10}{'主后端调用':>12}{'备用调用':>10}{'熔断次数':>10}")
+    print("-" * 60)
+    
+    primary = FakeASR(delay=0.02)
+    _, errors = run_calls(primary, args.calls, args.threads, toggle(primary))
+    print(f"{'裸后端':<14}{errors:>10}{primary.calls:>12}{0:>10}{0:>10}")
+    
+    primary, fallback = FakeASR(delay=0.02), FakeASR(delay=0.05)
+    resilient = ResilientASR(primary, fallback=fallback, timeout=1.0, retries=1, backoff=0.02,
+                             breaker=CircuitBreaker(threshold=5, cooldown=0.5))
+    with contextlib.redirect_stdout(io.StringIO()):  # 不打印每次切换备用后端的警告
+        _, errors = run_calls(resilient, args.calls, args.threads, toggle(primary))
+    stats = resilient.stats()
+    print(f"{'ResilientASR':<14}{errors:>10}{primary.calls:>12}{fallback.calls:>10}{stats['breaker_opened']:>10}")
+    print(f"  结束时熔断器状态: {stats['breaker']}")
+    resilient.close()
+    
+    # 3. 卡死：主后端每个请求卡 hang 秒（远超超时），请求线程只有 4 个
+    hang, workers = 2.0, 4
+    print(f"\n场景 3：主后端每个请求卡 {hang:.0f} 秒（超时 0.2 秒，请求线程 {workers} 个，熔断冷却 0.5 秒）")
+    primary, fallback = FakeASR(delay=hang), FakeASR(delay=0.02)
+    resilient = ResilientASR(primary, fallback=fallback, timeout=0.2, retries=1, backoff=0.02,
+                             breaker=CircuitBreaker(threshold=5, cooldown=0.5), max_workers=workers)
+    peak = 0
+    
+    def sample(index):
+        nonlocal peak
+        peak = max(peak, resilient.stats()["in_flight"])
+        time.sleep(0.01)
+    
+    calls = min(args.calls, 200)
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies, errors = run_calls(resilient, calls, args.threads, sample)
+    stats = resilient.stats()
+    report_header = f"{'成功率':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}"
+    print(f"{'':<16}{report_header}")
+    report("ResilientASR", latencies, errors, calls)
+    print(f"  线程占满快速失败 {stats['saturated']} 次 | 超时 {stats['timeouts']} | 熔断 {stats['breaker_opened']} 次 | "
+          f"备用 {fallback.calls} 次 | 在途主后端请求峰值 {peak}/{workers}")
+    assert peak <= workers, peak
+    time.sleep(hang + 0.2)
+    assert resilient.stats()["in_flight"] == 0, "卡住的请求返回后名额没有释放"
+    print("  ✓ 在途请求不超过线程数，卡住的请求返回后名额全部释放")
+    resilient.close()
+
+
+if __name__ == "__main__":
+    main()
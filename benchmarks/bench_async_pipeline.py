@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+流水线运行时基准测试：每级一个线程（threads）vs 一个事件循环（asyncio）
+
+用文件捕获源（按原速回放的类语音 WAV）和假 ASR 跑 main.InterviewAssistant 的完整流水线，
+运行一段时间后在随机时刻置位停止事件，统计：
+- 线程数：运行期间进程里的线程总数（不含主线程，含线程池按需创建的线程）
+- 停止延迟：stop_event.set() 到所有流水线线程 join 完成（线程版要等 0.5 秒的轮询超时）
+- CPU：每秒音频消耗的进程 CPU 时间（逐帧 DSP 之外的调度开销）
+- 识别句数：两种运行时应当一致
+
+运行：python benchmarks/bench_async_pipeline.py [--trials 5] [--seconds 6] [--asr-delay 0.3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asr_backend import FakeASR  # noqa: E402
+from audio_device import FileDeviceInfo  # noqa: E402
+from main import InterviewAssistant  # noqa: E402
+from bench_capture_process import silence_stdout  # noqa: E402
+
+
+def write_wav(path: str, seconds: float, rate: int = 16000):
+    """停 1 秒说 2 秒的类语音信号（开头的静音让自适应 VAD 先估计底噪）"""
+    t = np.arange(int(rate * seconds)) / rate
+    signal = ((t % 3.0) >= 1.0) * (0.4 * np.sin(2 * np.pi * 180 * t) + 0.2 * np.sin(2 * np.pi * 900 * t))
+    signal += 0.005 * np.random.default_rng(0).standard_normal(len(t))
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((signal * 16000).astype(np.int16).tobytes())
+
+
+def trial(path: str, runtime: str, seconds: float, asr_delay: float, rng: random.Random) -> dict:
+    results = []
+    assistant = InterviewAssistant(
+        asr_backend=FakeASR(delay=asr_delay),
+        speaker_device=FileDeviceInfo.from_wav(path, speed=1.0),
+        runtime=runtime
+    )
+    with silence_stdout():
+        assistant.initialize_recognizer()
+        assistant.recognizer.on_result_callback = lambda source, text, ts: results.append(text)
+        cpu_start = time.process_time()
+        assistant.start_capture()
+        time.sleep(seconds + rng.uniform(0, 0.5))  # 随机停在轮询周期的不同位置
+        threads = threading.active_count() - 1
+        cpu = time.process_time() - cpu_start
+        
+        start = time.perf_counter()
+        assistant.stop_event.set()
+        for thread in assistant.threads:
+            thread.join()
+        shutdown = time.perf_counter() - start
+    return {"threads": threads, "shutdown": shutdown, "cpu": cpu / seconds, "results": len(results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=5, help='每种运行时跑几次')
+    parser.add_argument('--seconds', type=float, default=6.0, help='每次运行多久后停止（秒）')
+    parser.add_argument('--asr-delay', type=float, default=0.3, help='假 ASR 每句耗时（秒）')
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "speaker.wav")
+        write_wav(path, args.seconds + 5)
+        
+        print(f"每次回放 {args.seconds:.0f} 秒后随机停止，{args.trials} 次，假 ASR 每句 {args.asr_delay:.1f} 秒")
+        print(f"{'运行时':<10}{'线程数':>8}{'停止 p50':>12}{'停止 max':>12}{'CPU/秒':>10}{'识别句数':>10}")
+        print("-" * 62)
+        for runtime in ("threads", "asyncio"):
+            runs = [trial(path, runtime, args.seconds, args.asr_delay, rng) for _ in range(args.trials)]
+            shutdown = np.array([run["shutdown"] for run in runs]) * 1000
+            print(f"{runtime:<10}{max(run['threads'] for run in runs):>8}"
+                  f"{np.percentile(shutdown, 50):>10.1f}ms{shutdown.max():>10.1f}ms"
+                  f"{np.mean([run['cpu'] for run in runs]) * 1000:>8.1f}ms"
+                  f"{np.mean([run['results'] for run in runs]):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
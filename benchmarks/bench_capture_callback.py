@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+回调模式捕获基准测试：处理线程卡顿时丢不丢帧、丢了能不能看到
+
+模拟两个设备（48kHz 立体声 + 44.1kHz 单声道），假的 PortAudio 流按实时节拍
+（可用 --speed 加速）调用 AudioCaptureThread._on_audio；处理侧每隔几秒注入一次
+卡顿（sleep 模拟识别回调、流式推送、队列阻塞等让出 GIL 的等待）。
+
+对比不同的帧缓冲区容量：
+- 0.3 秒：约等于阻塞模式下 PortAudio 自己的输入缓冲，卡顿超过它就丢帧
+  （阻塞模式丢了也没有任何计数，这里用同样容量的 FrameRing 把丢失量算出来）
+- 5 秒（默认 CAPTURE_RING_DURATION）：卡顿期间帧积压在缓冲区，之后一次处理完
+
+并统计单个 DSP 线程处理两个设备的 CPU 占比（每秒音频的处理耗时）
+
+运行：python benchmarks/bench_capture_callback.py [--seconds 20] [--speed 4] [--stall 1.0]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_capture  # noqa: E402
+from audio_capture import AudioCaptureThread, CaptureDSPWorker  # noqa: E402
+from audio_device import DeviceInfo  # noqa: E402
+from audio_scheduler import PriorityAudioQueue  # noqa: E402
+from config import CHUNK_DURATION  # noqa: E402
+
+DEVICES = {
+    'speaker': DeviceInfo(index=0, name="bench-48k-stereo", channels=2, sample_rate=48000, priority=0),
+    'microphone': DeviceInfo(index=1, name="bench-44k-mono", channels=1, sample_rate=44100, priority=0),
+}
+
+
+def make_speech(rate: int, seconds: float, channels: int) -> np.ndarray:
+    """说 2 秒停 1 秒的类语音信号（int16 交织）"""
+    t = np.arange(int(rate * seconds)) / rate
+    signal = ((t % 3.0) < 2.0) * (0.4 * np.sin(2 * np.pi * 180 * t) + 0.2 * np.sin(2 * np.pi * 900 * t))
+    signal += 0.005 * np.random.default_rng(0).standard_normal(len(t))
+    return np.repeat((signal * 16000).astype(np.int16), channels)
+
+
+class PacedCallbackStream:
+    """假的 PortAudio 回调流：独立线程按节拍把一帧帧字节交给回调"""
+    
+    def __init__(self, device: DeviceInfo, seconds: float, speed: float, callback):
+        self.frame = int(device.sample_rate * CHUNK_DURATION) * device.channels
+        self.audio = make_speech(device.sample_rate, seconds, device.channels)
+        self.speed = speed
+        self.callback = callback
+        self.done = threading.Event()
+    
+    def start_stream(self):
+        threading.Thread(target=self._pump, daemon=True).start()
+    
+    def _pump(self):
+        started = time.perf_counter()
+        for index, start in enumerate(range(0, len(self.audio) - self.frame + 1, self.frame)):
+            delay = started + (index + 1) * CHUNK_DURATION / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.callback(self.audio[start:start + self.frame].tobytes(), self.frame, {}, 0)
+        self.done.set()
+    
+    def stop_stream(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+def run(ring_seconds: float, seconds: float, speed: float, stall: float, stall_every: float) -> dict:
+    audio_capture.CAPTURE_RING_DURATION = ring_seconds
+    audio_queue = PriorityAudioQueue(maxsize=100)
+    stop_event = threading.Event()
+    
+    captures, streams = [], []
+    for source, device in DEVICES.items():
+        capture = AudioCaptureThread(audio_queue, device, source, stop_event)
+        
+        def open_stream(stream_callback=None, device=device):
+            stream = PacedCallbackStream(device, seconds, speed, stream_callback)
+            streams.append(stream)
+            return stream
+        
+        capture._open_stream = open_stream
+        captures.append(capture)
+    
+    # 卡顿注入 + 处理耗时统计（只在第一个设备上卡，第二个设备被同一线程拖累）
+    busy = [0.0]
+    stalled_at = [0]
+    
+    def instrument(capture, inject):
+        process_frame = capture.process_frame
+        
+        def wrapped(data, frame_time):
+            if inject and capture.frames and capture.frames % int(stall_every / CHUNK_DURATION) == 0 \
+                    and stalled_at[0] != capture.frames:
+                stalled_at[0] = capture.frames
+                time.sleep(stall / speed)
+            start = time.perf_counter()
+            process_frame(data, frame_time)
+            busy[0] += time.perf_counter() - start
+        capture.process_frame = wrapped
+    
+    for i, capture in enumerate(captures):
+        instrument(capture, inject=i == 0)
+    
+    worker = CaptureDSPWorker(captures, stop_event)
+    thread = threading.Thread(target=worker.run, daemon=True)
+    thread.start()
+    
+    while len(streams) < len(captures) or not all(stream.done.is_set() for stream in streams):
+        time.sleep(0.05)
+    time.sleep(stall / speed + 0.2)  # 等最后一次卡顿后的积压处理完
+    stop_event.set()
+    thread.join()
+    
+    return {
+        "frames": sum(capture.stats()["frames"] for capture in captures),
+        "dropped": sum(capture.stats()["dropped"] for capture in captures),
+        "max_backlog": max(capture.stats()["max_backlog"] for capture in captures),
+        "cpu": busy[0] / (seconds * len(captures)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=20.0, help='每个设备的音频时长（秒）')
+    parser.add_argument('--speed', type=float, default=4.0, help='回放倍速（卡顿时长同比缩放）')
+    parser.add_argument('--stall', type=float, default=1.0, help='每次卡顿时长（音频秒）')
+    parser.add_argument('--stall-every', type=float, default=5.0, help='每隔多少秒音频卡顿一次')
+    args = parser.parse_args()
+    
+    expected = int(args.seconds / CHUNK_DURATION) * len(DEVICES)
+    print(f"两个设备各 {args.seconds:.0f} 秒音频（共 {expected} 帧），"
+          f"每 {args.stall_every:.0f} 秒卡顿 {args.stall:.1f} 秒，{args.speed:.0f} 倍速")
+    print(f"{'帧缓冲区':<12}{'处理帧数':>10}{'丢帧':>8}{'丢失音频':>10}{'最大积压':>10}{'DSP 占用':>10}")
+    print("-" * 62)
+    
+    for ring_seconds, label in ((0.3, "0.3秒(≈阻塞)"), (5.0, "5秒(默认)")):
+        with contextlib.redirect_stdout(io.StringIO()):  # 不打印启动 / 退出信息
+            result = run(ring_seconds, args.seconds, args.speed, args.stall, args.stall_every)
+        print(f"{label:<12}{result['frames']:>10}{result['dropped']:>8}"
+              f"{result['dropped'] * CHUNK_DURATION:>9.1f}秒{result['max_backlog']:>10}{result['cpu']:>10.1%}")
+    
+    print("\n阻塞模式下同样的丢失不会出现在任何统计里（exception_on_overflow=False 静默丢弃）")
+
+
+if __name__ == "__main__":
+    main()
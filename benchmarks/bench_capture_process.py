@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+捕获子进程基准测试：DSP 在本进程 vs 子进程时，主进程其他线程的响应抖动
+
+主进程里跑一个「GUI 线程」：每 5ms 醒来一次做一点事（相当于 Qt 事件循环刷新 token），
+记录每次比预定时刻晚了多少。同时两个文件捕获源（44.1kHz，重采样最贵的组合）尽快读完十分钟的音频，
+让逐帧 VAD + 重采样满负荷运行：
+- 本进程：捕获线程和 GUI 线程抢同一个 GIL，GUI 线程的唤醒被推迟
+- 子进程：DSP 在另一个解释器里，主进程只收共享内存的偏移量
+
+同时统计 DSP 吞吐（每秒墙钟处理多少秒音频）和交付到识别队列的语音段数。
+单核机器上子进程仍和主进程抢 CPU（由操作系统分时），差别要在多核机器上才明显
+
+运行：python benchmarks/bench_capture_process.py [--seconds 3] [--audio 600]
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_capture import start_capture_threads  # noqa: E402
+from audio_device import FileDeviceInfo  # noqa: E402
+from audio_scheduler import PriorityAudioQueue  # noqa: E402
+
+TICK_INTERVAL = 0.005
+
+
+def write_wav(path: str, seconds: float, rate: int = 44100, channels: int = 1):
+    """说 2 秒停 1 秒的类语音信号"""
+    t = np.arange(int(rate * seconds)) / rate
+    signal = ((t % 3.0) < 2.0) * (0.4 * np.sin(2 * np.pi * 180 * t) + 0.2 * np.sin(2 * np.pi * 900 * t))
+    signal += 0.005 * np.random.default_rng(0).standard_normal(len(t))
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.repeat((signal * 16000).astype(np.int16), channels).tobytes())
+
+
+@contextlib.contextmanager
+def silence_stdout():
+    """屏蔽启动 / 退出信息（文件描述符级别，子进程继承后也不输出）"""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+
+
+def gui_ticks(seconds: float) -> np.ndarray:
+    """模拟 GUI 事件循环：每 TICK_INTERVAL 醒来一次，返回每次的迟到毫秒数"""
+    lateness = []
+    due = time.perf_counter() + TICK_INTERVAL
+    end = due + seconds
+    while due < end:
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        lateness.append((time.perf_counter() - due) * 1000)
+        sum(range(200))  # 一点点 Python 工作（拼接 token、更新控件）
+        due += TICK_INTERVAL
+    return np.array(lateness)
+
+
+def scenario(paths: list, process, seconds: float) -> dict:
+    """process: None = 不捕获（基线），False = 本进程，True = 子进程"""
+    audio_queue = PriorityAudioQueue(maxsize=1000)
+    stop_event = threading.Event()
+    threads, captures = [], []
+    if process is not None:
+        devices = {source: FileDeviceInfo.from_wav(path, speed=0) for source, path in zip(('speaker', 'microphone'), paths)}
+        with silence_stdout():
+            threads, captures = start_capture_threads(audio_queue, devices, stop_event, process=process)
+        time.sleep(1.0 if process else 0.1)  # 子进程启动（spawn 需要重新导入模块）
+    
+    lateness = gui_ticks(seconds)
+    
+    with silence_stdout():
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    frames = sum(capture.stats()["frames"] for capture in captures)
+    return {
+        "p50": np.percentile(lateness, 50),
+        "p99": np.percentile(lateness, 99),
+        "max": lateness.max(),
+        "throughput": frames * 0.1 / len(paths) / seconds,
+        "chunks": audio_queue.qsize(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=3.0, help='每个场景测量多久（秒）')
+    parser.add_argument('--audio', type=float, default=600.0, help='每个文件的音频时长（秒，要够 DSP 跑满测量时间）')
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"{name}.wav") for name in ("speaker", "microphone")]
+        for path in paths:
+            write_wav(path, args.audio)
+        
+        print(f"GUI 线程每 {TICK_INTERVAL * 1000:.0f}ms 唤醒一次，两个 44.1kHz 文件源满速捕获 {args.seconds:.0f} 秒"
+              f"（{os.cpu_count()} 核）")
+        print(f"{'DSP 位置':<10}{'迟到 p50':>10}{'迟到 p99':>10}{'迟到 max':>10}{'DSP 吞吐':>12}{'语音段':>8}")
+        print("-" * 62)
+        for process, label in ((None, "无捕获"), (False, "本进程"), (True, "子进程")):
+            result = scenario(paths, process, args.seconds)
+            throughput = f"{result['throughput']:.0f}x 实时" if process is not None else "-"
+            print(f"{label:<10}{result['p50']:>8.2f}ms{result['p99']:>8.2f}ms{result['max']:>8.2f}ms"
+                  f"{throughput:>12}{result['chunks']:>8}")
+
+
+if __name__ == "__main__":
+    main()
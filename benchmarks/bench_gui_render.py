@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+GUI 回答渲染基准测试：逐 token 信号 + 全文搜索 vs 按帧批量追加
+
+生产者线程模拟 LLM 输出几千 token 的回答，GUI 线程跑真实的 Qt 事件循环（offscreen 平台，不需要显示器）：
+- 逐 token：每个 token 一个跨线程信号，槽函数里 toPlainText() 复制全文找「思考中」，
+  再移动光标插入、滚动（旧的 on_ai_chunk），总耗时随回答长度平方增长
+- 按帧批量：token 写入 TokenBuffer，GUI 每 GUI_TOKEN_FLUSH_MS 毫秒用 AnswerView 一次性追加
+
+两种到达速度：
+- 瞬时：缓存命中 / 预取的回答一次性回放，看全部显示出来要多久
+- 实时（--rate token/秒）：正常生成，看 GUI 线程的总占用和单次最长卡顿（卡顿期间界面无响应）
+
+运行：python benchmarks/bench_gui_render.py [--tokens 1000 4000 8000] [--rate 400]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal  # noqa: E402
+from PyQt6.QtGui import QTextCursor  # noqa: E402
+from PyQt6.QtWidgets import QApplication, QTextEdit  # noqa: E402
+
+from config import GUI_TOKEN_FLUSH_MS  # noqa: E402
+from gui import AnswerView, TokenBuffer  # noqa: E402
+
+PLACEHOLDER = "💭 AI 正在思考...\n\n"
+SENTENCE = ["首先", "，", "我", "会", "从", "系统", "的", "整体", "架构", "说起", "：", "前端", "通过",
+            "网关", "访问", "后端", "服务", "，", "缓存", "放在", "中间", "层", "。"]
+
+
+def make_tokens(count: int) -> list:
+    """类似 LLM 输出的中文 token（每 4 句换一段）"""
+    tokens = []
+    while len(tokens) < count:
+        tokens += SENTENCE
+        if len(tokens) % (len(SENTENCE) * 4) < len(SENTENCE):
+            tokens.append("\n\n")
+    return tokens[:count]
+
+
+class Producer(QObject):
+    """模拟 LLMWorker：rate=0 时一次性输出（缓存 / 预取回放）"""
+    
+    chunk_received = pyqtSignal(str, bool)
+    
+    def __init__(self, tokens: list, rate: float, buffer: TokenBuffer = None):
+        super().__init__()
+        self.tokens = tokens
+        self.rate = rate
+        self.buffer = buffer
+    
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+    
+    def run(self):
+        started = time.perf_counter()
+        for i, token in enumerate(self.tokens):
+            if self.rate:
+                delay = started + i / self.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if self.buffer is not None:
+                self.buffer.append(token)
+            else:
+                self.chunk_received.emit(token, False)
+        self.chunk_received.emit("", True)
+
+
+class Meter:
+    """统计 GUI 线程在槽函数里花的时间"""
+    
+    def __init__(self):
+        self.busy = 0.0
+        self.longest = 0.0
+        self.calls = 0
+    
+    def wrap(self, func):
+        def timed(*args):
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+            self.busy += elapsed
+            self.longest = max(self.longest, elapsed)
+            self.calls += 1
+        return timed
+
+
+def render_per_token(app: QApplication, text_edit: QTextEdit, tokens: list, rate: float) -> dict:
+    """旧实现：每个 token 一个信号，槽里搜索全文再插入"""
+    text_edit.clear()
+    text_edit.append(PLACEHOLDER)
+    meter, done = Meter(), threading.Event()
+    
+    def on_chunk(chunk: str, is_done: bool):
+        if is_done:
+            done.set()
+            return
+        current_text = text_edit.toPlainText()
+        if "思考中" in current_text:
+            text_edit.clear()
+        cursor = text_edit.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(chunk)
+        text_edit.setTextCursor(cursor)
+        text_edit.ensureCursorVisible()
+    
+    producer = Producer(tokens, rate)
+    producer.chunk_received.connect(meter.wrap(on_chunk))
+    return run_loop(app, producer, meter, done)
+
+
+def render_batched(app: QApplication, text_edit: QTextEdit, tokens: list, rate: float) -> dict:
+    """新实现：token 进 TokenBuffer，定时器每帧用 AnswerView 追加一次"""
+    view, buffer = AnswerView(text_edit), TokenBuffer()
+    view.show_placeholder(PLACEHOLDER)
+    meter, done = Meter(), threading.Event()
+    
+    timer = QTimer()
+    timer.setInterval(GUI_TOKEN_FLUSH_MS)
+    timer.timeout.connect(meter.wrap(lambda: view.append(buffer.take())))
+    
+    def on_done(chunk: str, is_done: bool):
+        timer.stop()
+        view.append(buffer.take())
+        done.set()
+    
+    producer = Producer(tokens, rate, buffer)
+    producer.chunk_received.connect(meter.wrap(on_done))
+    timer.start()
+    return run_loop(app, producer, meter, done)
+
+
+def run_loop(app: QApplication, producer: Producer, meter: Meter, done: threading.Event) -> dict:
+    started = time.perf_counter()
+    producer.start()
+    while not done.is_set():
+        app.processEvents()
+        time.sleep(0.001)
+    return {"wall": time.perf_counter() - started, "busy": meter.busy, "longest": meter.longest,
+            "calls": meter.calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tokens', type=int, nargs='+', default=[1000, 4000, 8000], help='回答长度（token 数）')
+    parser.add_argument('--rate', type=float, default=400.0, help='实时场景的生成速度（token/秒）')
+    args = parser.parse_args()
+    
+    app = QApplication(sys.argv)
+    text_edit = QTextEdit()
+    text_edit.setReadOnly(True)
+    text_edit.resize(600, 800)
+    text_edit.show()
+    
+    print(f"刷新间隔 {GUI_TOKEN_FLUSH_MS}ms；「总耗时」= 最后一个 token 显示出来的墙钟时间，"
+          f"「GUI 占用」= 槽函数里花的时间")
+    print(f"{'场景':<20}{'实现':<10}{'总耗时':>10}{'GUI 占用':>10}{'最长卡顿':>10}{'刷新次数':>10}")
+    print("-" * 72)
+    for count in args.tokens:
+        tokens = make_tokens(count)
+        for rate, label in ((0, f"{count} token 瞬时"), (args.rate, f"{count} token {args.rate:.0f}/秒")):
+            if rate and count / rate > 60:
+                continue  # 实时场景超过一分钟就不跑了
+            for render, name in ((render_per_token, "逐 token"), (render_batched, "按帧批量")):
+                result = render(app, text_edit, tokens, rate)
+                print(f"{label:<20}{name:<10}{result['wall']:>9.2f}s{result['busy']:>9.2f}s"
+                      f"{result['longest'] * 1000:>8.1f}ms{result['calls']:>10}")
+    text_edit.close()
+
+
+if __name__ == "__main__":
+    main()
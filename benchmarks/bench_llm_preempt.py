@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+LLM 回答打断基准测试：新问题到来时，旧回答跑完再答 vs 立即打断
+
+假 LLM 按 --rate 片段/秒生成一个长回答，--after 秒后面试官问了下一个问题：
+- 跑完再答（旧行为）：键盘回调串行执行，新问题要等旧回答全部输出，旧回答的 token 照常计费
+- 打断（LLMAssistant.ask）：旧回答的流立即关闭，已输出的部分带标记写入历史
+
+统计新问题的首个片段延迟（从提问算起）、旧回答在提问之后还生成了多少片段，以及写入历史的问答条数
+
+运行：python benchmarks/bench_llm_preempt.py [--chunks 400] [--rate 40] [--after 1.0]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import INTERRUPTED_MARK, FakeLLMProvider, LLMAssistant  # noqa: E402
+
+
+class CountingProvider(FakeLLMProvider):
+    """记录每个片段的生成时刻"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.produced = []
+    
+    def chat_stream(self, messages, system_prompt=None, cancel=None):
+        for chunk in super().chat_stream(messages, system_prompt, cancel=cancel):
+            self.produced.append(time.perf_counter())
+            yield chunk
+
+
+def scenario(preempt: bool, chunks: int, rate: float, after: float) -> dict:
+    provider = CountingProvider(ttft=0.3, tokens_per_second=rate, answer="回答" * chunks, chunk_chars=2)
+    assistant = LLMAssistant(provider)
+    
+    first = assistant.ask("第一个问题")
+    reader = threading.Thread(target=lambda: list(first))
+    reader.start()
+    time.sleep(after)
+    
+    asked = time.perf_counter()
+    if not preempt:
+        reader.join()  # 旧行为：等上一个回答输出完
+    second = assistant.ask("第二个问题")
+    first_token = None
+    for _ in second:
+        if first_token is None:
+            first_token = time.perf_counter() - asked
+    reader.join()
+    
+    wasted = sum(1 for at in provider.produced if at > asked) - len(second.text) // 2
+    history = assistant.conversation_history
+    return {
+        "first_token": first_token,
+        "wasted": wasted,
+        "turns": len(history) // 2,
+        "interrupted": sum(message["content"].endswith(INTERRUPTED_MARK) for message in history),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=400, help='每个回答的片段数')
+    parser.add_argument('--rate', type=float, default=40.0, help='生成速度（片段/秒）')
+    parser.add_argument('--after', type=float, default=1.0, help='第一个回答开始后多久问下一个问题（秒）')
+    args = parser.parse_args()
+    
+    print(f"回答 {args.chunks} 个片段，{args.rate:.0f} 片段/秒，{args.after:.1f} 秒后提出新问题")
+    print(f"{'方式':<12}{'新问题首片段':>12}{'旧回答多生成':>14}{'历史问答':>10}")
+    print("-" * 52)
+    for preempt, label in ((False, "跑完再答"), (True, "打断")):
+        result = scenario(preempt, args.chunks, args.rate, args.after)
+        print(f"{label:<12}{result['first_token']:>11.2f}s{result['wasted']:>12} 片段"
+              f"{result['turns']:>7} 轮（{result['interrupted']} 轮被打断）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+LLM 竞速基准测试：只用一个提供商 vs 同时发给两个、用先出字的
+
+在本地起两个流式替身服务器（SSE），分别模拟 OpenAI 兼容接口和 Anthropic Messages 接口：
+- 首 token 耗时服从对数正态分布（中位数 --median 秒），另有 --stall 的概率卡顿 --stall-seconds 秒（长尾）
+- 之后按 --rate 片段/秒输出 --chunks 个片段；客户端断开后停止发送，统计实际发出的片段数
+
+用真实的 SDK（openai、anthropic）请求替身服务器，对比：
+1. 只用 OpenAI 兼容接口
+2. 只用 Anthropic 接口
+3. LLMRaceProvider 竞速：两个同时发，先出字的胜出，另一个立即取消
+
+统计每种方式的首 token 耗时 p50 / p95 / 最大、各提供商胜出次数，以及输掉的请求被取消前多发了多少片段
+
+运行：python benchmarks/bench_llm_race.py [--questions 30] [--median 0.4] [--stall 0.1] [--stall-seconds 2.0]
+（需要 pip install openai "anthropic<1.0"）
+"""
+
+import argparse
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm import AnthropicProvider, LLMAssistant, LLMProvider, LLMRaceProvider  # noqa: E402
+
+
+def openai_events(chunks: int):
+    """(是否为文本片段, SSE 事件)"""
+    for i in range(chunks):
+        yield True, "data: " + json.dumps({
+            "id": "standin", "object": "chat.completion.chunk", "created": 0, "model": "standin",
+            "choices": [{"index": 0, "delta": {"content": f"片段{i} "}, "finish_reason": None}],
+        }) + "\n\n"
+    yield False, "data: [DONE]\n\n"
+
+
+def anthropic_events(chunks: int):
+    """(是否为文本片段, SSE 事件)"""
+    def event(name: str, data: dict) -> str:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+    
+    yield False, event("message_start", {"type": "message_start", "message": {
+        "id": "msg_standin", "type": "message", "role": "assistant", "content": [], "model": "standin",
+        "stop_reason": None, "stop_sequence": None, "usage": {"input_tokens": 1, "output_tokens": 0}}})
+    yield False, event("content_block_start", {"type": "content_block_start", "index": 0,
+                                               "content_block": {"type": "text", "text": ""}})
+    for i in range(chunks):
+        yield True, event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                  "delta": {"type": "text_delta", "text": f"片段{i} "}})
+    yield False, event("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield False, event("message_delta", {"type": "message_delta",
+                                         "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                         "usage": {"output_tokens": chunks}})
+    yield False, event("message_stop", {"type": "message_stop"})
+
+
+def start_standin(kind: str, args, seed: int) -> http.server.ThreadingHTTPServer:
+    """启动流式替身服务器（后台线程），server.sent 记录每个请求实际发出的文本片段数"""
+    rng = np.random.default_rng(seed)
+    lock = threading.Lock()
+    
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with lock:
+                ttft = rng.lognormal(np.log(args.median), 0.3)
+                if rng.random() < args.stall:
+                    ttft += args.stall_seconds
+            
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            time.sleep(ttft)
+            
+            sent = 0
+            events = openai_events(args.chunks) if kind == "openai" else anthropic_events(args.chunks)
+            try:
+                for is_text, event in events:
+                    self.wfile.write(event.encode())
+                    self.wfile.flush()
+                    if is_text:
+                        sent += 1
+                        time.sleep(1.0 / args.rate)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # 客户端取消
+            server.sent.append(sent)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.sent = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(provider, questions: int) -> dict:
+    assistant = LLMAssistant(provider)
+    ttfts = []
+    for i in range(questions):
+        assistant.clear_history()
+        start = time.perf_counter()
+        first = None
+        for _ in assistant.ask(f"第 {i} 个问题"):
+            if first is None:
+                first = time.perf_counter() - start
+        ttfts.append(first)
+        time.sleep(0.05)  # 让被取消的请求在服务端收尾
+    return {"ttft": np.array(ttfts) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=30, help='每种方式提问次数')
+    parser.add_argument('--median', type=float, default=0.4, help='首 token 耗时中位数（秒）')
+    parser.add_argument('--stall', type=float, default=0.1, help='卡顿概率')
+    parser.add_argument('--stall-seconds', type=float, default=2.0, help='卡顿时额外等待（秒）')
+    parser.add_argument('--chunks', type=int, default=30, help='每个回答的片段数')
+    parser.add_argument('--rate', type=float, default=100.0, help='输出速度（片段/秒）')
+    args = parser.parse_args()
+    
+    openai_server = start_standin("openai", args, seed=1)
+    anthropic_server = start_standin("anthropic", args, seed=2)
+    
+    def openai_provider():
+        return LLMProvider("standin", "standin", f"http://127.0.0.1:{openai_server.server_port}/v1")
+    
+    def anthropic_provider():
+        return AnthropicProvider("standin", "standin", f"http://127.0.0.1:{anthropic_server.server_port}")
+    
+    print(f"首 token 中位数 {args.median:.1f}秒，{args.stall:.0%} 概率卡顿 {args.stall_seconds:.1f}秒，"
+          f"每种方式 {args.questions} 次")
+    print(f"{'方式':<12}{'首token p50':>12}{'p95':>10}{'最大':>10}   胜出 / 输家多发片段")
+    print("-" * 72)
+    setups = (
+        ("OpenAI 兼容", openai_provider),
+        ("Anthropic", anthropic_provider),
+        ("竞速", lambda: LLMRaceProvider({"openai": openai_provider(), "anthropic": anthropic_provider()})),
+    )
+    for label, factory in setups:
+        provider = factory()
+        before = (len(openai_server.sent), len(anthropic_server.sent))
+        result = run(provider, args.questions)
+        ttft = result["ttft"]
+        
+        detail = ""
+        if isinstance(provider, LLMRaceProvider):
+            wins = ", ".join(f"{name} {stats['wins']}" for name, stats in provider.stats().items())
+            # 每次竞速两边各一个请求：发满的是获胜者，没发满的是被取消的输家
+            sent = openai_server.sent[before[0]:] + anthropic_server.sent[before[1]:]
+            losers = [count for count in sent if count < args.chunks]
+            detail = f"{wins} / 输家平均 {np.mean(losers) if losers else 0:.1f} 片段"
+        print(f"{label:<12}{np.percentile(ttft, 50):>10.0f}ms{np.percentile(ttft, 95):>8.0f}ms"
+              f"{ttft.max():>8.0f}ms   {detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+长语音切段识别基准测试：整段识别 vs 停顿处切段并发识别
+
+合成「说话 + 换气停顿」的长语音（10 / 20 / 30 / 45 秒），用 FakeASR（固定延迟 +
+与音频时长成正比的延迟，返回音频采样点数）代替腾讯云，比较：
+- 识别耗时：整段 vs 切段并发
+- 切点是否落在停顿里（切点处能量 / 平均能量）
+- 各段采样点数之和是否等于总长（拼接后不丢、不重）
+
+另外检查队列积压超过环形缓冲区容量时：已被覆盖的语音（入队后、识别中）都被丢弃，没被覆盖的照常识别
+
+运行：python benchmarks/bench_long_utterance.py [--delay 0.3] [--per-second 0.15]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RATE, ASR_SEGMENT_DURATION, ASR_SEGMENT_SEARCH_WINDOW  # noqa: E402
+from audio_processor import AudioChunk, AudioProcessor, AudioRingBuffer, RingGuard  # noqa: E402
+from asr_backend import FakeASR  # noqa: E402
+from speech_recognizer import SpeechRecognizer  # noqa: E402
+
+
+def make_speech(seconds: float, seed: int = 0) -> np.ndarray:
+    """0.8~2.5 秒的「说话」（调幅噪声）和 0.15~0.4 秒的停顿交替"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    total = 0
+    while total < seconds * RATE:
+        talk = int(rng.uniform(0.8, 2.5) * RATE)
+        envelope = 0.5 + 0.5 * np.abs(np.sin(np.arange(talk) * 2 * np.pi * 4 / RATE))
+        parts.append(rng.normal(0, 0.2, talk) * envelope)
+        pause = int(rng.uniform(0.15, 0.4) * RATE)
+        parts.append(rng.normal(0, 0.002, pause))
+        total += talk + pause
+    return np.concatenate(parts)[:int(seconds * RATE)].astype(np.float32)
+
+
+def recognize_once(audio: np.ndarray, asr: FakeASR, segment_duration: float) -> tuple[float, str]:
+    """同步识别一条语音，返回 (耗时, 文本)"""
+    results = []
+    recognizer = SpeechRecognizer(
+        queue.Queue(), threading.Event(), asr,
+        on_result_callback=lambda source, text, ts: results.append(text),
+        segment_duration=segment_duration
+    )
+    chunk = AudioChunk('speaker', audio, time.time(), len(audio) / RATE)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # 不打印识别结果
+        recognizer._process_chunk(chunk)
+    return time.perf_counter() - start, results[0] if results else ""
+
+
+def check_ring_overwrite(asr: FakeASR):
+    """环形缓冲区 60 秒，连续写入 3 段 25 秒语音后才识别：第 1 段已被覆盖，识别第 3 段期间再写入覆盖它"""
+    capacity = 60 * RATE
+    rings = (AudioRingBuffer(capacity), AudioRingBuffer(capacity, dtype=np.int16))
+    
+    def utterance(seconds: float) -> AudioChunk:
+        audio = make_speech(seconds)
+        guard = RingGuard(rings, rings[0].position)
+        rings[0].write(audio)
+        rings[1].write(AudioProcessor.to_pcm16(audio))
+        return AudioChunk('speaker', rings[0].take(), time.time(), seconds, pcm=rings[1].take(), guard=guard)
+    
+    chunks = [utterance(25) for _ in range(3)]
+    assert [chunk.overwritten() for chunk in chunks] == [True, False, False]
+    
+    results = []
+    recognizer = SpeechRecognizer(queue.Queue(), threading.Event(), asr,
+                                  on_result_callback=lambda source, text, ts: results.append(text),
+                                  segment_duration=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for chunk in chunks[:2]:
+            recognizer._process_chunk(chunk)
+        worker = threading.Thread(target=recognizer._process_chunk, args=(chunks[2],))
+        worker.start()
+        time.sleep(asr.delay / 2)
+        utterance(40)  # 识别期间新写入 40 秒：绕回覆盖第 3 段
+        worker.join()
+    assert results == [str(25 * RATE)], results
+    print("✓ 积压超过缓冲区容量：被覆盖的语音（入队后 / 识别中）丢弃，其余照常识别")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--delay', type=float, default=0.3, help='FakeASR 每次识别的固定耗时（秒）')
+    parser.add_argument('--per-second', type=float, default=0.15, help='FakeASR 每秒音频的耗时（秒）')
+    args = parser.parse_args()
+    
+    print(f"FakeASR: 固定 {args.delay * 1000:.0f}ms + 每秒音频 {args.per_second * 1000:.0f}ms，"
+          f"段长 {ASR_SEGMENT_DURATION}s")
+    print(f"{'时长':>6}{'段数':>6}{'整段(s)':>10}{'切段(s)':>10}{'加速':>8}{'切点能量比':>12}{'覆盖完整':>10}")
+    print("-" * 66)
+    
+    for seconds in (10, 20, 30, 45):
+        audio = make_speech(seconds, seed=seconds)
+        segments = AudioProcessor.split_at_pauses(audio, RATE, ASR_SEGMENT_DURATION, ASR_SEGMENT_SEARCH_WINDOW)
+        
+        # 切点附近 20ms 能量 / 全段平均能量：远小于 1 说明切在停顿里
+        mean_energy = float(np.mean(np.square(audio)))
+        cut_ratios = [
+            float(np.mean(np.square(audio[max(0, end - 160):end + 160]))) / mean_energy
+            for _, end in segments[:-1]
+        ]
+        
+        whole_time, _ = recognize_once(audio, FakeASR(delay=args.delay, per_second=args.per_second), 0)
+        split_time, text = recognize_once(audio, FakeASR(delay=args.delay, per_second=args.per_second),
+                                          ASR_SEGMENT_DURATION)
+        covered = sum(int(part) for part in text.split()) == len(audio)
+        
+        ratio = f"{max(cut_ratios):.3f}" if cut_ratios else "-"
+        print(f"{seconds:>5}s{len(segments):>6}{whole_time:>10.2f}{split_time:>10.2f}"
+              f"{whole_time / split_time:>7.1f}x{ratio:>12}{'✓' if covered else '✗':>10}")
+    
+    print("\n切点能量比取各切点中的最大值（切点附近能量 / 平均能量）")
+    check_ring_overwrite(FakeASR(delay=args.delay))
+
+
+if __name__ == "__main__":
+    main()
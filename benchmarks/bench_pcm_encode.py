@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+一句话识别请求体编码基准测试：内存分配 + 耗时
+
+旧路径（原 TencentASR.recognize）：
+    float32 → ×32768 转 int16 → 写 WAV 到 BytesIO → getvalue → Base64 → decode 成 str
+    → str(params).replace(...) → encode 成请求体
+新路径：
+    捕获线程给的 int16 PCM 视图 → Base64（直接读数组内存）→ 原始字节拼进 JSON 请求体
+
+用 tracemalloc 统计编码过程的峰值内存（相对音频本身），并计时
+
+运行：python benchmarks/bench_pcm_encode.py
+"""
+
+import base64
+import io
+import os
+import sys
+import timeit
+import tracemalloc
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import RATE  # noqa: E402
+from tencent_api import TencentCloudClient  # noqa: E402
+
+PARAMS = {
+    "ProjectId": 0,
+    "SubServiceType": 2,
+    "EngSerViceType": "16k_zh",
+    "SourceType": 1,
+    "UsrAudioKey": "session_123456",
+}
+
+
+def encode_old(audio_float: np.ndarray) -> bytes:
+    """原实现（原样保留用于对比）"""
+    audio_int16 = (audio_float * 32768).astype(np.int16)
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(audio_int16.tobytes())
+    wav_data = wav_buffer.getvalue()
+    audio_base64 = base64.b64encode(wav_data).decode('utf-8')
+    params = dict(PARAMS, VoiceFormat="wav", Data=audio_base64)
+    return str(params).replace("'", '"').encode('utf-8')
+
+
+def encode_new(pcm: np.ndarray) -> bytes:
+    """新实现（与 TencentASR.recognize + TencentCloudClient.call 相同）"""
+    pcm_bytes = memoryview(np.ascontiguousarray(pcm, dtype=np.int16)).cast('B')
+    audio_base64 = base64.b64encode(pcm_bytes)
+    params = dict(PARAMS, VoiceFormat="pcm", DataLen=pcm_bytes.nbytes)
+    return TencentCloudClient._encode_payload(params, {"Data": audio_base64})
+
+
+def peak_bytes(func, arg) -> int:
+    """func(arg) 执行期间的峰值内存增量（含返回的请求体）"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = func(arg)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    print(f"{'音频':>6}{'PCM 大小':>12}{'旧 峰值':>12}{'新 峰值':>12}{'旧 耗时':>10}{'新 耗时':>10}")
+    print("-" * 64)
+    rng = np.random.default_rng(0)
+    for seconds in (2, 5, 10, 30):
+        pcm = (rng.normal(0, 0.1, seconds * RATE) * 32767).astype(np.int16)
+        audio_float = pcm.astype(np.float32) / 32768.0
+        
+        peak_old = peak_bytes(encode_old, audio_float)
+        peak_new = peak_bytes(encode_new, pcm)
+        t_old = min(timeit.repeat(lambda: encode_old(audio_float), number=5, repeat=5)) / 5
+        t_new = min(timeit.repeat(lambda: encode_new(pcm), number=5, repeat=5)) / 5
+        
+        print(f"{seconds:>5}s{pcm.nbytes / 1e6:>10.2f}MB{peak_old / 1e6:>10.2f}MB{peak_new / 1e6:>10.2f}MB"
+              f"{t_old * 1000:>8.2f}ms{t_new * 1000:>8.2f}ms")
+    
+    print("\n峰值 = 编码过程中同时存在的中间数据 + 最终请求体（以 PCM 大小为单位看复制次数）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+重采样基准测试：旧线性插值 vs 多相重采样
+
+对比三种用法：
+1. 旧实现：整段 np.interp（每次重建索引数组）
+2. 新实现：整段多相重采样（AudioProcessor.resample）
+3. 新实现：逐帧多相重采样（PolyphaseResampler，摊到每 100ms 帧上）
+
+开始前先检查逐帧结果与整段一次处理一致（含短于降采样倍数的帧，如 48kHz → 16kHz 时 1~2 个样本的帧）
+
+运行：python benchmarks/bench_resample.py
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processor import AudioProcessor, PolyphaseResampler  # noqa: E402
+
+TARGET_RATE = 16000
+FRAME_DURATION = 0.1
+
+
+def linear_resample(audio_data: np.ndarray, original_rate: int, target_rate: int) -> np.ndarray:
+    """旧实现（原样保留用于对比）"""
+    duration = len(audio_data) / original_rate
+    target_length = int(duration * target_rate)
+    indices = np.linspace(0, len(audio_data) - 1, target_length)
+    return np.interp(indices, np.arange(len(audio_data)), audio_data).astype(audio_data.dtype)
+
+
+def make_speech_like(rate: int, seconds: float) -> np.ndarray:
+    """生成带谐波和高频成分的测试信号（int16）"""
+    t = np.arange(int(rate * seconds)) / rate
+    signal = (
+        0.5 * np.sin(2 * np.pi * 220 * t)
+        + 0.2 * np.sin(2 * np.pi * 1800 * t)
+        + 0.1 * np.sin(2 * np.pi * 11000 * t)  # 高于 8kHz，线性插值会混叠
+    )
+    return (signal * 16000).astype(np.int16)
+
+
+def best_of(func, repeat: int = 5, number: int = 3) -> float:
+    """多次运行取最好成绩（秒/次）"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def alias_energy(resampled: np.ndarray) -> float:
+    """8kHz 以下的 11kHz 混叠分量能量（越小越好）"""
+    spectrum = np.abs(np.fft.rfft(resampled.astype(np.float64)))
+    freqs = np.fft.rfftfreq(len(resampled), 1 / TARGET_RATE)
+    alias_bin = np.argmin(np.abs(freqs - (TARGET_RATE - 11000)))  # 11k 折叠到 5k
+    return float(spectrum[alias_bin] / spectrum.max())
+
+
+def check_frame_sizes(rate: int):
+    """任意帧长（含 1 个样本、不对齐的帧）逐帧处理的结果必须与整段一次处理相同"""
+    audio = make_speech_like(rate, 0.2)
+    expected = PolyphaseResampler(rate, TARGET_RATE).process(audio)
+    for sizes in ((1,), (2,), (1, 2, 3), (max(1, rate // TARGET_RATE - 1), 7, 480), (4410,)):
+        resampler = PolyphaseResampler(rate, TARGET_RATE)
+        parts, position, i = [], 0, 0
+        while position < len(audio):
+            size = sizes[i % len(sizes)]
+            parts.append(resampler.process(audio[position:position + size]))
+            position += size
+            i += 1
+        result = np.concatenate(parts)
+        assert result.dtype == np.float32, result.dtype
+        assert len(result) == len(expected) and np.allclose(result, expected, atol=1e-2), \
+            f"{rate} Hz 帧长 {sizes}：逐帧结果与整段不一致"
+
+
+def bench(rate: int, seconds: float):
+    audio = make_speech_like(rate, seconds)
+    frame_size = int(rate * FRAME_DURATION)
+    frames = [audio[i:i + frame_size] for i in range(0, len(audio), frame_size)]
+    
+    t_linear = best_of(lambda: linear_resample(audio, rate, TARGET_RATE))
+    t_poly = best_of(lambda: AudioProcessor.resample(audio, rate, TARGET_RATE))
+    
+    def per_frame():
+        resampler = PolyphaseResampler(rate, TARGET_RATE)
+        for frame in frames:
+            resampler.process(frame)
+    
+    t_frames = best_of(per_frame)
+    t_per_frame = t_frames / len(frames)
+    
+    alias_linear = alias_energy(linear_resample(audio, rate, TARGET_RATE))
+    alias_poly = alias_energy(AudioProcessor.resample(audio, rate, TARGET_RATE))
+    
+    print(f"{rate:>6} Hz {seconds:>4.0f}s | "
+          f"线性整段 {t_linear * 1000:7.2f}ms | "
+          f"多相整段 {t_poly * 1000:7.2f}ms | "
+          f"多相逐帧 {t_per_frame * 1000:5.3f}ms/帧（语音结束时 0ms） | "
+          f"混叠 线性 {alias_linear:.3f} / 多相 {alias_poly:.4f}")
+
+
+def main():
+    for rate in (48000, 44100, 8000):
+        check_frame_sizes(rate)
+    print("✓ 逐帧结果与整段一致（含 1 个样本的帧）")
+    
+    print("重采样基准测试（目标 16kHz）")
+    print("-" * 120)
+    for rate in (48000, 44100):
+        for seconds in (1, 10, 30):
+            bench(rate, seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+会话录制基准测试：录一场一小时的面试，识别线程要付出多少代价，事后回顾要占多少内存
+
+写入侧：模拟识别线程按 --speed 倍速交付一小时的句子（每句 3~15 秒，16kHz int16），
+统计 record() 在调用方线程上的耗时分布（p50 / p99 / 最大），对比直接在调用方线程里同步写文件。
+读取侧：打开会话（只加载索引）、搜索关键词、取出一句的音频，统计耗时和 Python 堆内存峰值
+（音频走 np.memmap，不计入堆内存）
+
+运行：python benchmarks/bench_session_recorder.py [--minutes 60] [--speed 60]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processor import AudioChunk  # noqa: E402
+from config import RATE  # noqa: E402
+from session_recorder import SessionArchive, SessionRecorder  # noqa: E402
+from transcript import TranscriptStore  # noqa: E402
+
+QUESTIONS = ["请介绍一下你最近做过的项目", "这个系统的瓶颈在哪里", "缓存一致性怎么保证", "你遇到过最难的 bug 是什么"]
+
+
+def make_utterances(minutes: float, seed: int = 0) -> list:
+    """(来源, 文本, PCM)，面试官和自己交替，总时长约 minutes 分钟"""
+    rng = np.random.default_rng(seed)
+    utterances, total = [], 0.0
+    while total < minutes * 60:
+        seconds = rng.uniform(3, 15)
+        source = "speaker" if len(utterances) % 2 == 0 else "microphone"
+        pcm = (rng.standard_normal(int(seconds * RATE)) * 3000).astype(np.int16)
+        utterances.append((source, f"{QUESTIONS[len(utterances) % len(QUESTIONS)]}（第 {len(utterances)} 句）", pcm))
+        total += seconds
+    return utterances
+
+
+def percentiles(samples: list) -> str:
+    samples = np.array(samples) * 1000
+    return f"p50 {np.percentile(samples, 50):.3f}ms | p99 {np.percentile(samples, 99):.3f}ms | 最大 {samples.max():.2f}ms"
+
+
+def write_async(directory: str, utterances: list, speed: float) -> dict:
+    """SessionRecorder：调用方只复制 + 入队"""
+    stop_event = threading.Event()
+    recorder = SessionRecorder(stop_event, directory)
+    recorder.open()
+    writer = threading.Thread(target=recorder.run)
+    writer.start()
+    
+    transcript, costs = TranscriptStore(), []
+    for source, text, pcm in utterances:
+        chunk = AudioChunk(source=source, audio_data=np.empty(0, np.float32), timestamp=time.time(),
+                           duration=len(pcm) / RATE, pcm=pcm)
+        utterance = transcript.append(source, text)
+        start = time.perf_counter()
+        recorder.record(utterance, chunk)
+        costs.append(time.perf_counter() - start)
+        time.sleep(len(pcm) / RATE / speed)
+    
+    stop_event.set()
+    writer.join()
+    return {"costs": costs, "dropped": recorder.dropped}
+
+
+def write_sync(path: str, utterances: list, speed: float) -> dict:
+    """对照：调用方线程里直接写文件并 fsync（不用后台线程时的代价）"""
+    costs = []
+    with open(path, "wb") as f:
+        for source, text, pcm in utterances:
+            start = time.perf_counter()
+            f.write(pcm.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            costs.append(time.perf_counter() - start)
+            time.sleep(len(pcm) / RATE / speed)
+    return {"costs": costs, "dropped": 0}
+
+
+def review(directory: str) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    archive = SessionArchive(directory)
+    opened = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    hits = archive.search("缓存")
+    searched = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    audio = archive.audio(hits[len(hits) // 2])
+    peak_level = int(np.abs(audio).max())  # 真正读到数据
+    loaded = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    return {"entries": len(archive), "hits": len(hits), "opened": opened, "searched": searched,
+            "loaded": loaded, "peak": peak, "size": size, "level": peak_level}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=60.0, help='模拟面试时长（分钟）')
+    parser.add_argument('--speed', type=float, default=60.0, help='交付倍速（60 = 一小时的面试一分钟跑完）')
+    args = parser.parse_args()
+    
+    utterances = make_utterances(args.minutes)
+    audio_seconds = sum(len(pcm) for _, _, pcm in utterances) / RATE
+    print(f"{len(utterances)} 句，音频 {audio_seconds / 60:.0f} 分钟，{args.speed:.0f} 倍速交付")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        session = os.path.join(directory, "session")
+        result = write_sync(os.path.join(directory, "sync.pcm"), utterances, args.speed)
+        print(f"同步写文件     调用方耗时 {percentiles(result['costs'])}")
+        result = write_async(session, utterances, args.speed)
+        print(f"SessionRecorder 调用方耗时 {percentiles(result['costs'])} | 丢弃 {result['dropped']} 句")
+        
+        result = review(session)
+        print(f"\n回顾：会话 {result['size'] / 1024 ** 2:.0f}MB，{result['entries']} 句")
+        print(f"  打开（加载索引）{result['opened'] * 1000:.1f}ms | 搜索「缓存」{result['searched'] * 1000:.2f}ms"
+              f"（{result['hits']} 句）| 取一句音频 {result['loaded'] * 1000:.2f}ms")
+        print(f"  Python 堆内存峰值 {result['peak'] / 1024:.0f}KiB（音频经内存映射按需读取）")
+
+
+if __name__ == "__main__":
+    main()
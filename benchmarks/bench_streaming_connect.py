@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+流式识别建连基准测试：捕获线程里同步建连 vs 连接线程建连 + 缓存帧
+
+在本地起一个 WebSocket 替身服务器，按腾讯云实时语音识别的协议应答：
+- 握手前等待 --connect-delay 秒（模拟慢网络 / TLS 握手），超过 CONNECT_TIMEOUT 即建连失败
+- 收到 {"type": "end"} 后返回识别结果「收到 N 帧」（N 为这段语音实际收到的二进制帧数），再发 final=1
+
+模拟捕获线程：每段语音 begin_stream 后每 100ms 推送一帧，最后 end_stream。对比：
+1. 同步建连（旧行为）：begin_stream 里直接 open_session，捕获线程卡住整个握手
+2. DeferredSession（SpeechRecognizer.begin_stream）：建连在连接线程里，期间的帧缓存后补发
+
+统计捕获线程在 begin_stream 上的最长耗时，以及服务端收到的帧数是否等于推送的帧数（缓存没有丢帧、没有乱序）
+
+运行：python benchmarks/bench_streaming_connect.py [--connect-delay 1.0] [--utterances 3] [--frames 20]
+（需要 pip install websocket-client）
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import queue
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_recognizer import SpeechRecognizer  # noqa: E402
+from streaming_asr import TencentStreamingASR  # noqa: E402
+from bench_capture_process import silence_stdout  # noqa: E402
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+FRAME_BYTES = 3200  # 100ms 16kHz int16
+
+
+def start_standin(connect_delay: float) -> socketserver.ThreadingTCPServer:
+    """启动 WebSocket 替身服务器（后台线程），server.received 记录每个会话收到的帧序号"""
+    
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            headers = {}
+            self.rfile.readline()  # GET /asr/v2/<appid>?... HTTP/1.1
+            while True:
+                line = self.rfile.readline().decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            
+            time.sleep(connect_delay)
+            accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest())
+            self.wfile.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                             b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+            
+            frames = []
+            try:
+                while True:
+                    opcode, payload = self.read_frame()
+                    if opcode == 0x2:
+                        frames.append(payload[0])  # 第一个字节是帧序号
+                    elif opcode == 0x1 and json.loads(payload).get("type") == "end":
+                        text = f"收到{len(frames)}帧"
+                        self.send_text({"code": 0, "result": {"index": 0, "voice_text_str": text}, "final": 0})
+                        self.send_text({"code": 0, "final": 1})
+                        break
+                    elif opcode == 0x8:
+                        break
+            except (ConnectionError, struct.error):
+                pass
+            server.received.append(frames)
+        
+        def read_frame(self) -> tuple[int, bytes]:
+            first, second = struct.unpack("!BB", self.rfile.read(2))
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack("!H", self.rfile.read(2))
+            elif length == 127:
+                length, = struct.unpack("!Q", self.rfile.read(8))
+            mask = self.rfile.read(4) if second & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self.rfile.read(length)))
+            return first & 0x0F, payload
+        
+        def send_text(self, data: dict):
+            payload = json.dumps(data, ensure_ascii=False).encode()
+            header = struct.pack("!BB", 0x81, len(payload)) if len(payload) < 126 else \
+                struct.pack("!BBH", 0x81, 126, len(payload))
+            self.wfile.write(header + payload)
+    
+    socketserver.ThreadingTCPServer.daemon_threads = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.received = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def open_synchronously(recognizer: SpeechRecognizer, source: str):
+    """旧行为：捕获线程里直接建连（失败则这段语音没有会话）"""
+    recognizer.end_stream(source)
+    try:
+        recognizer._sessions[source] = recognizer.asr_backend.open_session(
+            lambda text, is_final: recognizer._on_stream_result(source, text, is_final)
+        )
+    except Exception as e:
+        recognizer._record_error(source, e)
+
+
+def run(mode: str, port: int, args) -> dict:
+    backend = TencentStreamingASR("id", "key", "app", url=f"ws://127.0.0.1:{port}/asr/v2/")
+    results = []
+    recognizer = SpeechRecognizer(queue.Queue(), threading.Event(), backend,
+                                  on_result_callback=lambda source, text, ts: results.append(text))
+    blocked = []
+    for _ in range(args.utterances):
+        start = time.perf_counter()
+        if mode == "sync":
+            open_synchronously(recognizer, "speaker")
+        else:
+            recognizer.begin_stream("speaker")
+        blocked.append(time.perf_counter() - start)
+        
+        next_frame = time.perf_counter()
+        for i in range(args.frames):
+            recognizer.feed_stream("speaker", bytes([i]) + bytes(FRAME_BYTES - 1))
+            next_frame += 0.1
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+        recognizer.end_stream("speaker")
+    
+    deadline = time.time() + args.connect_delay + 5
+    while len(results) < args.utterances and time.time() < deadline:
+        time.sleep(0.05)
+    recognizer.close_streams()
+    return {"blocked": max(blocked), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connect-delay', type=float, default=1.0, help='替身服务器握手延迟（秒）')
+    parser.add_argument('--utterances', type=int, default=3, help='语音段数')
+    parser.add_argument('--frames', type=int, default=20, help='每段推送的帧数（100ms 一帧）')
+    args = parser.parse_args()
+    
+    print(f"握手延迟 {args.connect_delay:.1f}秒，{args.utterances} 段语音，每段 {args.frames} 帧")
+    print(f"{'方式':<16}{'begin_stream 最长':>18}{'服务端收到 / 推送':>20}   帧序")
+    print("-" * 72)
+    for mode, label in (("sync", "同步建连"), ("deferred", "DeferredSession")):
+        server = start_standin(args.connect_delay)
+        with silence_stdout():
+            result = run(mode, server.server_address[1], args)
+        time.sleep(0.2)
+        received = [len(frames) for frames in server.received]
+        in_order = all(frames == list(range(len(frames))) for frames in server.received)
+        print(f"{label:<16}{result['blocked'] * 1000:>16.0f}ms"
+              f"{'/'.join(map(str, received)):>14} / {args.frames}   {'有序' if in_order else '乱序'}")
+        assert in_order, "服务端收到的帧乱序"
+        if mode == "deferred":
+            assert received == [args.frames] * args.utterances, f"缓存补发丢帧：{received}"
+            assert result["results"] == [f"收到{args.frames}帧"] * args.utterances, result["results"]
+        server.shutdown()
+    print("✓ DeferredSession：捕获线程不等握手，建连期间的帧全部按序补发")
+
+
+if __name__ == "__main__":
+    main()
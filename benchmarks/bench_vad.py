@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+VAD 离线基准测试：准确率 + 断句延迟 + 计算耗时
+
+输入：WAV 文件 + 同名 .labels 标注（每行 "开始秒 结束秒"，表示一段人声）
+不指定文件时自动合成一组测试夹具（安静、小声说话、底噪高、嗡嗡声、低频噪声、中途变吵）
+
+指标：
+- 帧级 precision / recall（100ms 帧）
+- 碎片数：一段真实语音被切成了几段（>1 说明说话中途被截断）
+- 起始延迟：真实开始到检测开始
+- 结束延迟：真实结束到语音片段提交（含 SILENCE_DURATION 静音等待）
+- 漏检：整段语音没有被检测到
+- 每帧耗时
+
+另有噪声突变检查：安静几秒后平稳噪声突然变强（白噪声、空调 / 风扇这类低频隆隆声），
+检测器必须在几秒内把它并入噪声谱、结束语音片段，不能一直判成语音直到 MAX_BUFFER_DURATION
+
+运行：
+    python benchmarks/bench_vad.py
+    python benchmarks/bench_vad.py recording1.wav recording2.wav
+"""
+
+import os
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CHUNK_DURATION, SILENCE_DURATION, MAX_BUFFER_DURATION, INT16_MAX  # noqa: E402
+from vad import VAD_DETECTORS, create_vad  # noqa: E402
+
+FIXTURE_RATE = 48000
+
+
+# ============ 测试夹具 ============
+
+def synth_speech(rate: int, seconds: float, rng: np.random.Generator) -> np.ndarray:
+    """合成类语音信号：基频抖动的谐波 + 音节包络 + 摩擦音噪声"""
+    n = int(rate * seconds)
+    t = np.arange(n) / rate
+    
+    f0 = 120 + 40 * np.sin(2 * np.pi * 0.7 * t) + rng.normal(0, 3, n).cumsum() / np.sqrt(n)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    
+    # 音节包络：约 4 音节/秒，音节间能量下陷
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t + rng.uniform(0, np.pi)), 0, None) ** 0.7
+    fricative_gate = np.sin(2 * np.pi * 1.3 * t + rng.uniform(0, np.pi)) > 0.9
+    fricative = rng.normal(0, 0.15, n) * fricative_gate
+    
+    return (voiced * syllables + fricative) * 0.3
+
+
+def synth_noise(kind: str, rate: int, n: int, level: float, rng: np.random.Generator) -> np.ndarray:
+    if kind == 'white':
+        return rng.normal(0, level, n)
+    if kind == 'hum':
+        t = np.arange(n) / rate
+        return level * 2 * (np.sin(2 * np.pi * 50 * t) + 0.5 * np.sin(2 * np.pi * 150 * t))
+    if kind == 'lowpass':
+        # 300Hz 以上按 4 阶滚降：空调、风扇的低频隆隆声
+        spectrum = np.fft.rfft(rng.normal(0, 1, n))
+        spectrum /= np.sqrt(1 + (np.fft.rfftfreq(n, 1.0 / rate) / 300.0) ** 8)
+        shaped = np.fft.irfft(spectrum, n)
+        return level * shaped / (np.std(shaped) + 1e-9)
+    if kind == 'brown':
+        brown = rng.normal(0, 1, n).cumsum()
+        brown -= np.convolve(brown, np.ones(rate) / rate, mode='same')
+        return level * brown / (np.std(brown) + 1e-9)
+    raise ValueError(kind)
+
+
+def build_fixture(name: str, noise: str, level: float, step_up: float = 1.0,
+                  loudness: float = 1.0, seed: int = 0):
+    """生成 30 秒：安静 → 语音 → 停顿 → 语音 ...，返回 (int16 音频, 标注)"""
+    rng = np.random.default_rng(seed)
+    rate = FIXTURE_RATE
+    total = 30.0
+    audio = np.zeros(int(rate * total))
+    
+    labels = []
+    cursor = 2.0
+    while cursor < total - 4:
+        length = min(rng.uniform(1.5, 5.0), total - cursor - 1.0)
+        start = int(cursor * rate)
+        speech = synth_speech(rate, length, rng) * rng.uniform(0.3, 1.0) * loudness
+        audio[start:start + len(speech)] += speech
+        labels.append((cursor, cursor + length))
+        cursor += length + rng.uniform(1.5, 3.0)
+    
+    noise_signal = synth_noise(noise, rate, len(audio), level, rng)
+    noise_signal[len(audio) // 2:] *= step_up  # 中途环境变吵
+    audio += noise_signal
+    
+    pcm = (np.clip(audio, -1, 1) * (INT16_MAX - 1)).astype(np.int16)
+    return name, pcm, rate, labels
+
+
+def write_fixtures(directory: str) -> list:
+    fixtures = [
+        build_fixture('quiet', 'white', 0.002, seed=1),
+        build_fixture('soft_speaker', 'white', 0.002, loudness=0.25, seed=6),
+        build_fixture('noisy_mic', 'white', 0.06, seed=2),
+        build_fixture('hum', 'hum', 0.05, seed=3),
+        build_fixture('brown', 'brown', 0.03, seed=4),
+        build_fixture('getting_louder', 'white', 0.005, step_up=6.0, seed=5),
+    ]
+    paths = []
+    for name, pcm, rate, labels in fixtures:
+        path = os.path.join(directory, f"{name}.wav")
+        with wave.open(path, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(rate)
+            wav_file.writeframes(pcm.tobytes())
+        with open(path[:-4] + '.labels', 'w') as f:
+            f.writelines(f"{start:.3f} {end:.3f}\n" for start, end in labels)
+        paths.append(path)
+    return paths
+
+
+def load_fixture(path: str):
+    with wave.open(path, 'rb') as wav_file:
+        rate = wav_file.getframerate()
+        channels = wav_file.getnchannels()
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+    pcm = pcm.reshape(-1, channels)[:, 0]
+    
+    with open(path[:-4] + '.labels') as f:
+        labels = [tuple(map(float, line.split())) for line in f if line.strip()]
+    return pcm, rate, labels
+
+
+# ============ 评估 ============
+
+def segment(decisions: list) -> list:
+    """按捕获线程的规则把逐帧判断变成语音片段 [(开始帧, 提交帧)]"""
+    silence_needed = int(SILENCE_DURATION / CHUNK_DURATION)
+    max_frames = int(MAX_BUFFER_DURATION / CHUNK_DURATION)
+    
+    segments = []
+    start = None
+    silence = 0
+    for i, speech in enumerate(decisions):
+        if speech:
+            if start is None:
+                start = i
+            silence = 0
+        elif start is not None:
+            silence += 1
+        
+        if start is not None and (silence >= silence_needed or i - start + 1 >= max_frames):
+            segments.append((start, i))
+            start, silence = None, 0
+    if start is not None:
+        segments.append((start, len(decisions) - 1))
+    return segments
+
+
+def evaluate(mode: str, pcm: np.ndarray, rate: int, labels: list) -> dict:
+    vad = create_vad(rate, mode)
+    frame_size = int(rate * CHUNK_DURATION)
+    frames = [pcm[i:i + frame_size] for i in range(0, len(pcm) - frame_size + 1, frame_size)]
+    
+    decisions = []
+    elapsed = 0.0
+    for frame in frames:
+        audio_float = frame.astype(np.float32) / INT16_MAX
+        start = time.perf_counter()
+        decisions.append(vad.is_speech(audio_float))
+        elapsed += time.perf_counter() - start
+    
+    truth = np.zeros(len(frames), dtype=bool)
+    for start_s, end_s in labels:
+        truth[int(start_s / CHUNK_DURATION):int(np.ceil(end_s / CHUNK_DURATION))] = True
+    pred = np.array(decisions)
+    
+    tp = int((pred & truth).sum())
+    precision = tp / max(int(pred.sum()), 1)
+    recall = tp / max(int(truth.sum()), 1)
+    
+    segments = segment(decisions)
+    fragments, onsets, ends, missed = [], [], [], 0
+    for start_s, end_s in labels:
+        first, last = int(start_s / CHUNK_DURATION), int(end_s / CHUNK_DURATION)
+        hits = [seg for seg in segments if seg[0] <= last + 1 and seg[1] >= first]
+        if not hits:
+            missed += 1
+            continue
+        fragments.append(len(hits))
+        onsets.append(max(0, hits[0][0] - first) * CHUNK_DURATION)
+        ends.append((hits[-1][1] + 1) * CHUNK_DURATION - end_s)
+    
+    return {
+        'precision': precision,
+        'recall': recall,
+        'fragments': float(np.mean(fragments)) if fragments else 0.0,
+        'onset': float(np.mean(onsets)) if onsets else 0.0,
+        'end': float(np.mean(ends)) if ends else 0.0,
+        'missed': missed,
+        'utterances': len(labels),
+        'us_per_frame': elapsed / max(len(frames), 1) * 1e6,
+    }
+
+
+def check_noise_step(rate: int = 16000, quiet: float = 3.0, seconds: float = 60.0,
+                     max_recovery: float = 3.0) -> bool:
+    """
+    平稳噪声在 quiet 秒后突然变强 +10/+20dB，之后持续 seconds 秒（没有人声）
+    
+    恢复时间：噪声变强后，到检测器不再判为语音、语音片段提交为止的时长
+    """
+    print(f"\n噪声突变：安静 {quiet:.0f}秒后平稳噪声变强，持续 {seconds:.0f}秒（无人声）")
+    print(f"{'噪声':<10}{'突变':>6}{'判为语音':>12}{'恢复时间':>10}")
+    print("-" * 40)
+    frame_size = int(rate * CHUNK_DURATION)
+    start = int(quiet / CHUNK_DURATION)
+    ok = True
+    for kind in ('white', 'lowpass'):
+        for step_db in (10, 20):
+            rng = np.random.default_rng(step_db)
+            audio = synth_noise(kind, rate, int(rate * (quiet + seconds)), 0.002, rng)
+            audio[int(rate * quiet):] *= 10 ** (step_db / 20)
+            
+            vad = create_vad(rate, 'adaptive')
+            decisions = [vad.is_speech(audio[i:i + frame_size].astype(np.float32))
+                         for i in range(0, len(audio) - frame_size + 1, frame_size)]
+            after = [seg for seg in segment(decisions) if seg[1] >= start]
+            recovery = (after[-1][1] + 1 - start) * CHUNK_DURATION if after else 0.0
+            ok &= recovery <= max_recovery
+            print(f"{kind:<10}{step_db:>4}dB{sum(decisions[start:]):>7}/{len(decisions) - start:<4}{recovery:>9.1f}s")
+    print(f"{'✓' if ok else '❌'} 噪声变强后 {max_recovery:.0f} 秒内{'全部' if ok else '没有全部'}恢复")
+    return ok
+
+
+def main():
+    paths = sys.argv[1:]
+    tmp = None
+    if not paths:
+        tmp = tempfile.TemporaryDirectory()
+        paths = write_fixtures(tmp.name)
+        print(f"未指定 WAV，使用合成夹具（{len(paths)} 个）")
+    
+    print(f"{'夹具':<16}{'检测器':<10}{'精确率':>8}{'召回率':>8}{'碎片':>6}"
+          f"{'起始延迟':>10}{'结束延迟':>10}{'漏检':>8}{'耗时/帧':>12}")
+    print("-" * 92)
+    
+    for path in paths:
+        pcm, rate, labels = load_fixture(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        for mode in VAD_DETECTORS:
+            r = evaluate(mode, pcm, rate, labels)
+            print(f"{name:<16}{mode:<10}{r['precision']:>8.2f}{r['recall']:>8.2f}{r['fragments']:>6.1f}"
+                  f"{r['onset']:>9.2f}s{r['end']:>9.2f}s{r['missed']:>5}/{r['utterances']:<2}"
+                  f"{r['us_per_frame']:>10.0f}µs")
+    
+    if tmp:
+        tmp.cleanup()
+    
+    if not check_noise_step():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+热路径基准测试套件（asv 风格）
+
+每个类是一组用例：params / param_names 给出参数网格，setup 准备数据（不计时），
+time_* 计时，peakmem_* 统计峰值内存。setup 抛 NotImplementedError 表示该用例
+在当前代码里不存在（比较旧提交时会出现），记为跳过。
+
+规模按实际使用取：设备采样率 44.1 / 48 kHz、1~8 通道、100ms 一帧；
+一句话 1~30 秒；LLM 回答 2k token；对话记录几千句。
+
+运行和保存结果见 run_suite.py：
+    python benchmarks/run_suite.py
+"""
+
+import importlib
+import os
+import sys
+
+import numpy as np
+
+# run_suite.py 比较其他提交时通过环境变量指向那个提交的代码目录
+PROJECT_ROOT = os.environ.get("BENCH_PROJECT_ROOT") or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+TARGET_RATE = 16000
+FRAME_DURATION = 0.1  # 与 config.CHUNK_DURATION 一致
+
+
+def _require(module: str, *names: str):
+    """从项目里导入；模块或属性不存在（旧提交）时跳过该用例"""
+    try:
+        mod = importlib.import_module(module)
+        return [getattr(mod, name) for name in names] if names else mod
+    except (ImportError, AttributeError) as e:
+        raise NotImplementedError(str(e))
+
+
+def make_speech(rate: int, seconds: float, channels: int = 1, seed: int = 0) -> np.ndarray:
+    """
+    类语音测试信号（int16，多通道时交织）
+    
+    基频 + 谐波 + 噪声，每 1.5 秒有 0.3 秒停顿，VAD 和切段都有真实的决策要做
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    voiced = ((t % 1.5) < 1.2).astype(np.float64)
+    signal = voiced * (
+        0.4 * np.sin(2 * np.pi * 180 * t)
+        + 0.2 * np.sin(2 * np.pi * 900 * t)
+        + 0.1 * np.sin(2 * np.pi * 2500 * t)
+    ) + 0.01 * rng.standard_normal(len(t))
+    mono = (signal * 16000).astype(np.int16)
+    return np.repeat(mono, channels) if channels > 1 else mono
+
+
+ANSWER_SENTENCE = "在上一个项目里我负责 Redis 缓存层的重构，把 p99 延迟从 120ms 降到了 35ms。"
+ANSWER_SENTENCE_TOKENS = 33  # llm.estimate_tokens 的估算值
+
+
+def make_answer(tokens: int) -> str:
+    """约 tokens 个 token 的中英混合回答"""
+    return ANSWER_SENTENCE * max(1, round(tokens / ANSWER_SENTENCE_TOKENS))
+
+
+class InstantProvider:
+    """零延迟出字的 LLM 提供商（套件自带，旧提交里没有 FakeLLMProvider 也能比较）"""
+    
+    def __init__(self, answer: str, chunk_chars: int):
+        self.model = "instant"
+        self.chunks = [answer[i:i + chunk_chars] for i in range(0, len(answer), chunk_chars)]
+    
+    def chat_stream(self, messages, system_prompt=None, cancel=None):
+        yield from self.chunks
+
+
+class FrameDSP:
+    """捕获线程每 100ms 一帧的处理（转单声道、归一化、静音判断、重采样、转 PCM）"""
+    
+    params = ([44100, 48000], [1, 2, 8])
+    param_names = ["rate", "channels"]
+    
+    def setup(self, rate, channels):
+        AudioProcessor, PolyphaseResampler = _require("audio_processor", "AudioProcessor", "PolyphaseResampler")
+        self.processor = AudioProcessor
+        self.channels = channels
+        self.frame = make_speech(rate, FRAME_DURATION, channels)
+        self.mono = AudioProcessor.to_mono(self.frame, channels)
+        self.normalized = AudioProcessor.normalize(self.mono)
+        self.resampler = PolyphaseResampler(rate, TARGET_RATE)
+        self.frame_16k = self.resampler.process(self.mono)
+    
+    def time_to_mono(self, rate, channels):
+        self.processor.to_mono(self.frame, self.channels)
+    
+    def time_normalize(self, rate, channels):
+        self.processor.normalize(self.mono)
+    
+    def time_is_silent(self, rate, channels):
+        self.processor.is_silent(self.normalized, 0.01)
+    
+    def time_resample_frame(self, rate, channels):
+        self.resampler.process(self.mono)
+    
+    def time_to_pcm16(self, rate, channels):
+        if not hasattr(self.processor, "to_pcm16"):
+            raise NotImplementedError("AudioProcessor.to_pcm16")
+        self.processor.to_pcm16(self.frame_16k, scale=1.0)
+
+
+class VAD:
+    """语音活动检测（每帧一次）"""
+    
+    params = (["peak", "adaptive"], [44100, 48000])
+    param_names = ["mode", "rate"]
+    
+    def setup(self, mode, rate):
+        create_vad = _require("vad", "create_vad")[0]
+        AudioProcessor = _require("audio_processor", "AudioProcessor")[0]
+        self.vad = create_vad(rate, mode)
+        audio = AudioProcessor.normalize(make_speech(rate, 3.0))
+        frame = int(rate * FRAME_DURATION)
+        self.frames = [audio[i:i + frame] for i in range(0, len(audio) - frame + 1, frame)]
+        self.index = 0
+    
+    def time_is_speech(self, mode, rate):
+        self.vad.is_speech(self.frames[self.index % len(self.frames)])
+        self.index += 1
+
+
+class CaptureUtterance:
+    """
+    一句话的捕获全流程：逐帧（转单声道 → 归一化 → VAD → 重采样 → 写环形缓冲区）
+    + 语音结束时 _process_buffer 打包入队
+    """
+    
+    params = ([48000], [2], [1.0, 10.0, 30.0])
+    param_names = ["rate", "channels", "seconds"]
+    timeout = 120
+    
+    def setup(self, rate, channels, seconds):
+        AudioCaptureThread = _require("audio_capture", "AudioCaptureThread")[0]
+        DeviceInfo = _require("audio_device", "DeviceInfo")[0]
+        PriorityAudioQueue = _require("audio_scheduler", "PriorityAudioQueue")[0]
+        AudioProcessor = _require("audio_processor", "AudioProcessor")[0]
+        import threading
+        
+        device = DeviceInfo(index=0, name="bench", channels=channels, sample_rate=rate, priority=0)
+        self.queue = PriorityAudioQueue(maxsize=4)
+        self.capture = AudioCaptureThread(self.queue, device, "speaker", threading.Event())
+        if not hasattr(self.capture, "_consume_frame"):
+            raise NotImplementedError("AudioCaptureThread._consume_frame")
+        self.processor = AudioProcessor
+        
+        audio = make_speech(rate, seconds, channels)
+        frame = int(rate * FRAME_DURATION) * channels
+        self.frames = [audio[i:i + frame].tobytes() for i in range(0, len(audio) - frame + 1, frame)]
+        self.seconds = seconds
+    
+    def _capture(self):
+        capture, processor = self.capture, self.processor
+        for data in self.frames:
+            audio_data = processor.to_mono(np.frombuffer(data, dtype=np.int16), capture.device_info.channels)
+            capture.vad.is_speech(processor.normalize(audio_data))
+            capture._consume_frame(capture._resample_frame(audio_data))
+        capture._process_buffer(self.seconds)
+        self.queue.get_nowait()
+    
+    def time_capture(self, rate, channels, seconds):
+        self._capture()
+    
+    def peakmem_capture(self, rate, channels, seconds):
+        self._capture()
+
+
+class UtteranceDSP:
+    """整段音频的处理（整段重采样、长句切段）"""
+    
+    params = ([44100, 48000], [1.0, 10.0, 30.0])
+    param_names = ["rate", "seconds"]
+    
+    def setup(self, rate, seconds):
+        AudioProcessor = _require("audio_processor", "AudioProcessor")[0]
+        self.processor = AudioProcessor
+        self.audio = make_speech(rate, seconds)
+        self.audio_16k = AudioProcessor.normalize(make_speech(TARGET_RATE, seconds))
+    
+    def time_resample(self, rate, seconds):
+        self.processor.resample(self.audio, rate, TARGET_RATE)
+    
+    def peakmem_resample(self, rate, seconds):
+        self.processor.resample(self.audio, rate, TARGET_RATE)
+    
+    def time_split_at_pauses(self, rate, seconds):
+        if not hasattr(self.processor, "split_at_pauses"):
+            raise NotImplementedError("AudioProcessor.split_at_pauses")
+        self.processor.split_at_pauses(self.audio_16k, TARGET_RATE, 8.0, 3.0)
+
+
+class RecognitionQueue:
+    """识别队列：两个来源交替入队、出队；以及过载时的丢弃路径"""
+    
+    params = ([20, 200],)
+    param_names = ["chunks"]
+    
+    def setup(self, chunks):
+        AudioChunk = _require("audio_processor", "AudioChunk")[0]
+        self.queue_class = _require("audio_scheduler", "PriorityAudioQueue")[0]
+        audio = np.zeros(TARGET_RATE, dtype=np.float32)
+        self.chunks = [
+            AudioChunk(source=("speaker", "microphone")[i % 2], audio_data=audio, timestamp=0.0, duration=1.0)
+            for i in range(chunks)
+        ]
+    
+    def time_put_get(self, chunks):
+        audio_queue = self.queue_class(maxsize=len(self.chunks))
+        for chunk in self.chunks:
+            audio_queue.put_nowait(chunk)
+        for _ in self.chunks:
+            audio_queue.get_nowait()
+            audio_queue.task_done()
+    
+    def time_overload(self, chunks):
+        audio_queue = self.queue_class(maxsize=4)
+        for chunk in self.chunks:
+            audio_queue.put_nowait(chunk)
+
+
+class LLMStreaming:
+    """LLM 回答流的本地开销（提供商零延迟出字，测的是逐片段拼接、写历史、token 估算）"""
+    
+    params = ([500, 2000], [1, 4])
+    param_names = ["tokens", "chunk_chars"]
+    
+    def setup(self, tokens, chunk_chars):
+        LLMAssistant = _require("llm", "LLMAssistant")[0]
+        self.answer = make_answer(tokens)
+        self.assistant = LLMAssistant(InstantProvider(self.answer, chunk_chars))
+        self.llm = _require("llm")
+    
+    def time_chat_stream(self, tokens, chunk_chars):
+        self.assistant.clear_history()
+        for _ in self.assistant.chat_stream("请介绍一下你做过的缓存优化"):
+            pass
+    
+    def time_estimate_tokens(self, tokens, chunk_chars):
+        if not hasattr(self.llm, "estimate_tokens"):
+            raise NotImplementedError("llm.estimate_tokens")
+        self.llm.estimate_tokens(self.answer)
+
+
+class ConversationBudget:
+    """多轮对话后的历史维护（超出 token 预算时压缩成摘要）"""
+    
+    params = ([10, 50],)
+    param_names = ["turns"]
+    
+    def setup(self, turns):
+        self.history_class = _require("llm", "ConversationHistory")[0]
+        self.answer = make_answer(300)
+    
+    def time_append_turns(self, turns):
+        history = self.history_class()
+        for i in range(turns):
+            history.append("user", f"面试官问题：第 {i} 个问题是什么？")
+            history.append("assistant", self.answer)
+
+
+class Transcript:
+    """对话记录：面试进行很久（几千句）后，追加一句和取面试官最后一个问题"""
+    
+    params = ([100, 5000],)
+    param_names = ["utterances"]
+    
+    def setup(self, utterances):
+        store_class = _require("transcript", "TranscriptStore")[0]
+        self.store = store_class(max_entries=utterances)
+        for i in range(utterances):
+            self.store.append("speaker" if i % 3 else "microphone", f"第 {i} 句：请介绍一下你做过的项目。")
+    
+    def time_append(self, utterances):
+        self.store.append("speaker", "请介绍一下你做过的项目。")
+    
+    def time_last_question(self, utterances):
+        self.store.last("speaker")
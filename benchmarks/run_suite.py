@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+运行 benchmarks.py 基准套件，按提交保存结果，比较两次结果找回归
+
+套件按 asv 的约定编写，这里是不依赖 asv 的最小运行器（项目不是可安装的包，
+asv 的逐提交构建用不上）：
+- time_*：自动确定每轮调用次数（每轮 ≥ 0.1 秒），重复 5 轮，记录最小值和中位数
+- peakmem_*：tracemalloc 统计一次调用的峰值 Python 内存分配（asv 统计的是进程 RSS）
+- setup 抛 NotImplementedError 的用例记为跳过
+
+结果写到 benchmarks/results/<提交>.json（工作区有改动时加 -dirty 后缀），
+包含提交、时间、Python / numpy 版本和机器信息，不同机器的结果不要混着比
+
+用法：
+    python benchmarks/run_suite.py                      # 当前工作区
+    python benchmarks/run_suite.py --bench FrameDSP     # 只跑名字匹配的用例（正则）
+    python benchmarks/run_suite.py --commit HEAD~3      # 在临时 worktree 里跑某个提交（用当前套件）
+    python benchmarks/run_suite.py --compare HEAD~3 HEAD   # 比较两次结果，慢 10% 以上标出
+"""
+
+import argparse
+import importlib.util
+import inspect
+import itertools
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+REPEAT = 5
+MIN_ROUND_TIME = 0.1  # 每轮至少运行多久（秒）
+REGRESSION_FACTOR = 1.1
+
+
+def git(*args: str, cwd: str = REPO_DIR) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def load_suite():
+    """按文件路径导入 benchmarks.py（不要求 benchmarks 是包）"""
+    spec = importlib.util.spec_from_file_location("bench_suite", os.path.join(BENCH_DIR, "benchmarks.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def discover(module, pattern: str = None) -> list:
+    """[(用例名, 类, 方法名, 参数组合)]，用例名形如 FrameDSP.time_to_mono(48000, 2)"""
+    cases = []
+    for class_name, cls in inspect.getmembers(module, inspect.isclass):
+        if cls.__module__ != module.__name__:
+            continue
+        grid = list(itertools.product(*cls.params)) if getattr(cls, "params", None) else [()]
+        for method in sorted(name for name in vars(cls) if name.startswith(("time_", "peakmem_"))):
+            for params in grid:
+                name = f"{class_name}.{method}({', '.join(map(str, params))})"
+                if pattern is None or re.search(pattern, name):
+                    cases.append((name, cls, method, params))
+    return cases
+
+
+def run_case(cls, method: str, params: tuple, repeat: int) -> dict:
+    instance = cls()
+    try:
+        if hasattr(instance, "setup"):
+            instance.setup(*params)
+    except NotImplementedError as e:
+        return {"skipped": str(e) or "NotImplementedError"}
+    
+    func = getattr(instance, method)
+    call = lambda: func(*params)  # noqa: E731
+    try:
+        call()  # 预热（也能在计时前暴露不支持的参数组合）
+    except NotImplementedError as e:
+        return {"skipped": str(e) or "NotImplementedError"}
+    
+    if method.startswith("peakmem_"):
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {"value": peak, "unit": "bytes"}
+    
+    timer = timeit.Timer(call)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * MIN_ROUND_TIME / max(elapsed, 1e-9)))
+    rounds = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {"value": min(rounds), "median": statistics.median(rounds), "number": number, "unit": "seconds"}
+
+
+def run_suite(pattern: str = None, repeat: int = REPEAT, label: str = None, root: str = REPO_DIR) -> str:
+    """跑一遍套件，写结果文件，返回路径"""
+    module = load_suite()
+    results = {}
+    for name, cls, method, params in discover(module, pattern):
+        try:
+            result = run_case(cls, method, params, repeat)
+        except Exception as e:
+            result = {"failed": f"{type(e).__name__}: {e}"}
+        results[name] = result
+        print(f"  {name:<60} {format_result(result)}", flush=True)
+    
+    commit = git("rev-parse", "HEAD", cwd=root)
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no", cwd=root))
+    label = label or commit[:10] + ("-dirty" if dirty else "")
+    numpy = sys.modules.get("numpy")
+    record = {
+        "commit": commit,
+        "label": label,
+        "subject": git("log", "-1", "--format=%s", commit, cwd=root),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__ if numpy else None,
+        "machine": f"{platform.system()} {platform.machine()} {platform.processor() or ''}".strip(),
+        "results": results,
+    }
+    
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{label}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {os.path.relpath(path, REPO_DIR)}")
+    return path
+
+
+def run_commit(revision: str, pattern: str = None, repeat: int = REPEAT) -> str:
+    """把提交检出到临时 worktree，用当前的套件在那份代码上跑（套件里不存在的接口记为跳过）"""
+    commit = git("rev-parse", revision)
+    worktree = tempfile.mkdtemp(prefix="bench-")
+    git("worktree", "add", "--detach", worktree, commit)
+    try:
+        env = dict(os.environ, BENCH_PROJECT_ROOT=worktree)
+        command = [sys.executable, os.path.abspath(__file__), "--root", worktree, "--repeat", str(repeat)]
+        if pattern:
+            command += ["--bench", pattern]
+        subprocess.run(command, cwd=worktree, env=env, check=True)
+    finally:
+        git("worktree", "remove", "--force", worktree)
+        shutil.rmtree(worktree, ignore_errors=True)
+    return os.path.join(RESULTS_DIR, f"{commit[:10]}.json")
+
+
+def format_result(result: dict) -> str:
+    if "skipped" in result:
+        return f"跳过（{result['skipped']}）"
+    if "failed" in result:
+        return f"失败（{result['failed']}）"
+    return format_value(result["value"], result["unit"])
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == "bytes":
+        return f"{value / 1024:.1f} KiB" if value < 1024 ** 2 else f"{value / 1024 ** 2:.2f} MiB"
+    for scale, suffix in ((1, "s"), (1e-3, "ms"), (1e-6, "μs")):
+        if value >= scale:
+            return f"{value / scale:.2f} {suffix}"
+    return f"{value * 1e9:.0f} ns"
+
+
+def load_result(ref: str) -> dict:
+    """结果文件路径、标签或 git 提交"""
+    candidates = [ref, os.path.join(RESULTS_DIR, f"{ref}.json")]
+    try:
+        candidates.append(os.path.join(RESULTS_DIR, f"{git('rev-parse', ref)[:10]}.json"))
+    except subprocess.CalledProcessError:
+        pass
+    for path in candidates:
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    raise FileNotFoundError(f"找不到 {ref} 的结果（先运行 --commit {ref}）")
+
+
+def compare(base_ref: str, head_ref: str, factor: float = REGRESSION_FACTOR) -> int:
+    """打印两次结果的对比表，返回变慢（或内存变大）超过 factor 倍的用例数"""
+    base, head = load_result(base_ref), load_result(head_ref)
+    print(f"基准 {base['label']}  {base['subject']}")
+    print(f"对比 {head['label']}  {head['subject']}")
+    if base["machine"] != head["machine"] or base["python"] != head["python"]:
+        print("⚠️  两次结果来自不同的机器或 Python 版本，比较仅供参考")
+    print(f"\n{'':2}{'用例':<60}{'基准':>12}{'对比':>12}{'比值':>8}")
+    
+    regressions = 0
+    for name in sorted(set(base["results"]) | set(head["results"])):
+        old, new = base["results"].get(name, {}), head["results"].get(name, {})
+        if "value" not in old or "value" not in new:
+            status = "新增" if "value" in new else "缺失" if "value" in old else "跳过"
+            print(f"{'':2}{name:<60}{status:>32}")
+            continue
+        ratio = new["value"] / old["value"] if old["value"] else float("inf")
+        flag = "+" if ratio > factor else "-" if ratio < 1 / factor else ""
+        regressions += flag == "+"
+        print(f"{flag:2}{name:<60}{format_value(old['value'], old['unit']):>12}"
+              f"{format_value(new['value'], new['unit']):>12}{ratio:>8.2f}")
+    
+    threshold = f"{factor - 1:.0%}"
+    print(f"\n{regressions} 个用例变慢超过 {threshold}（+ 变慢 / - 变快）" if regressions
+          else f"\n没有用例变慢超过 {threshold}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bench", help="只运行名字匹配该正则的用例")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="每个用例重复几轮")
+    parser.add_argument("--commit", nargs="+", metavar="REV", help="在这些提交上运行（临时 worktree）")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="比较两次结果（提交、标签或文件）")
+    parser.add_argument("--factor", type=float, default=REGRESSION_FACTOR, help="慢多少倍算回归")
+    parser.add_argument("--root", default=REPO_DIR, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.compare:
+        return 1 if compare(*args.compare, factor=args.factor) else 0
+    if args.commit:
+        for revision in args.commit:
+            print(f"== {revision}")
+            run_commit(revision, args.bench, args.repeat)
+        return 0
+    run_suite(args.bench, args.repeat, root=args.root)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
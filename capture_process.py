@@ -0,0 +1,259 @@
+"""
+捕获子进程 - 把音频捕获和逐帧预处理搬到独立进程
+职责：子进程里跑 AudioCaptureThread（转单声道、VAD、重采样、写环形缓冲区），
+主进程只收「哪段共享内存是一句话」的元数据，GIL 留给识别、LLM 和 GUI
+
+数据流：
+    子进程：设备 → 逐帧处理 → 写入共享内存环形缓冲区（float32 + int16 PCM 各一个）
+            语音结束 → 发送 (来源, 偏移, 长度, 绝对位置, 时长, 追踪时刻) 小消息
+    主进程：桥接线程收到消息 → 在同一块共享内存上建 numpy 视图（零拷贝）
+            → 组装 AudioChunk 放入识别队列
+
+音频本身从不经过 pickle；视图的有效期与进程内模式相同：缓冲区绕回一整圈之前有效。
+已写位置计数也在共享内存里，主进程的 RingGuard 能看到子进程的覆盖
+流式识别（需要逐帧推给主进程里的识别器）不支持子进程模式
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from config import RATE, RING_BUFFER_DURATION, DEBUG_MODE, CAPTURE_MODE
+from audio_capture import start_capture_threads
+from audio_processor import AudioChunk, AudioRingBuffer, RingGuard
+from tracing import tracer
+
+STATS_INTERVAL = 1.0  # 子进程多久上报一次捕获统计（秒）
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    子进程按名字挂上主进程创建的共享内存
+    
+    spawn 出来的子进程和主进程共用同一个资源跟踪器，这里的登记与主进程的重复（集合去重），
+    unlink 只由主进程做一次
+    """
+    return shared_memory.SharedMemory(name=name)
+
+
+class _ChunkSender:
+    """
+    子进程里代替识别队列交给 AudioCaptureThread：
+    put_nowait 收到的 AudioChunk 的音频是共享内存环形缓冲区的视图，只发送偏移和长度
+    """
+    
+    def __init__(self, messages, rings: dict):
+        self.messages = messages
+        self.rings = rings  # source -> (float32 缓冲区, int16 缓冲区)
+    
+    def put_nowait(self, chunk: AudioChunk):
+        audio_ring, pcm_ring = self.rings[chunk.source]
+        self.messages.put((
+            "chunk",
+            chunk.source,
+            self._offset(chunk.audio_data, audio_ring),
+            len(chunk.audio_data),
+            self._offset(chunk.pcm, pcm_ring),
+            chunk.guard.position,
+            chunk.timestamp,
+            chunk.duration,
+            tracer.marks(chunk.trace_id),
+        ))
+    
+    @staticmethod
+    def _offset(view: np.ndarray, ring: np.ndarray) -> int:
+        return (view.ctypes.data - ring.ctypes.data) // ring.itemsize
+    
+    def qsize(self) -> int:
+        return 0  # 识别队列在主进程（只用于调试输出）
+
+
+def _capture_main(devices: dict, shm_names: dict, capacity: int, messages,
+                  stop_event, mode: str, trace_enabled: bool):
+    """子进程入口：启动捕获，定期上报统计，收到停止信号后退出"""
+    tracer.enabled = trace_enabled
+    shms, rings = [], {}
+    for source, (audio_name, pcm_name) in shm_names.items():
+        audio_shm, pcm_shm = _attach(audio_name), _attach(pcm_name)
+        shms += [audio_shm, pcm_shm]
+        rings[source] = (
+            AudioRingBuffer(capacity, np.float32, buffer=audio_shm.buf),
+            AudioRingBuffer(capacity, np.int16, buffer=pcm_shm.buf),
+        )
+    
+    sender = _ChunkSender(messages, {
+        source: (audio_ring._data, pcm_ring._data) for source, (audio_ring, pcm_ring) in rings.items()
+    })
+    threads, captures = start_capture_threads(sender, devices, stop_event, mode=mode, process=False,
+                                              ring_buffers=rings)
+    
+    def report():
+        for capture in captures:
+            messages.put(("stats", capture.source_type, capture.stats()))
+    
+    while not stop_event.wait(STATS_INTERVAL):
+        report()
+    for thread in threads:
+        thread.join(timeout=5)
+    report()
+    
+    captures.clear()
+    rings.clear()
+    sender.rings.clear()
+    for shm in shms:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # 还有视图在用（进程马上退出，由系统回收映射）
+    messages.put(("exit", None, None))
+
+
+class RemoteCapture:
+    """主进程里代表子进程中的一个设备（stats() 返回最近一次上报的统计）"""
+    
+    def __init__(self, source_type: str):
+        self.source_type = source_type
+        self._stats = {"mode": "process", "frames": 0, "dropped": None, "input_overflows": None, "max_backlog": None}
+    
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+class CaptureProcessBridge:
+    """
+    主进程一侧：创建共享内存、启动子进程，把子进程发来的元数据组装成 AudioChunk 入队
+    
+    stop_event 置位后通知子进程退出，等它结束，再释放共享内存
+    """
+    
+    def __init__(self, audio_queue: queue.Queue, devices: dict, stop_event: threading.Event,
+                 mode: str = CAPTURE_MODE, capacity: int = int(RING_BUFFER_DURATION * RATE)):
+        self.audio_queue = audio_queue
+        self.devices = {source: device for source, device in devices.items() if device is not None}
+        self.stop_event = stop_event
+        self.mode = mode
+        self.capacity = capacity
+        self.captures = {source: RemoteCapture(source) for source in self.devices}
+        
+        self._context = multiprocessing.get_context("spawn")  # 各平台行为一致，不继承主进程的线程和锁
+        self._messages = self._context.Queue()
+        self._child_stop = self._context.Event()
+        self._shms = []
+        self._rings = {}  # source -> (float32 缓冲区, int16 缓冲区)：主进程只读，用于建视图和检查覆盖
+        self.process: Optional[multiprocessing.Process] = None
+    
+    def start(self) -> threading.Thread:
+        shm_names = {}
+        for source in self.devices:
+            audio_shm = shared_memory.SharedMemory(create=True, size=AudioRingBuffer.nbytes(self.capacity, np.float32))
+            pcm_shm = shared_memory.SharedMemory(create=True, size=AudioRingBuffer.nbytes(self.capacity, np.int16))
+            self._shms += [audio_shm, pcm_shm]
+            shm_names[source] = (audio_shm.name, pcm_shm.name)
+            self._rings[source] = (
+                AudioRingBuffer(self.capacity, np.float32, buffer=audio_shm.buf),
+                AudioRingBuffer(self.capacity, np.int16, buffer=pcm_shm.buf),
+            )
+        
+        self.process = self._context.Process(
+            target=_capture_main,
+            args=(self.devices, shm_names, self.capacity, self._messages, self._child_stop,
+                  self.mode, tracer.enabled),
+            name="CaptureProcess",
+            daemon=True
+        )
+        self.process.start()
+        print(f"✓ 捕获子进程已启动（PID {self.process.pid}，{', '.join(self.devices)}）")
+        
+        thread = threading.Thread(target=self.run, daemon=False, name="CaptureBridge")
+        thread.start()
+        return thread
+    
+    def run(self):
+        """桥接线程：收消息直到子进程退出"""
+        try:
+            stopping = False
+            while True:
+                if self.stop_event.is_set() and not stopping:
+                    stopping = True
+                    self._child_stop.set()
+                try:
+                    kind, source, payload = self._receive()
+                except queue.Empty:
+                    if stopping and not self.process.is_alive():
+                        break
+                    continue
+                if kind == "exit":
+                    break
+                if kind == "stats":
+                    self.captures[source]._stats = dict(payload, mode=f"process/{payload['mode']}")
+                elif kind == "chunk":
+                    self._enqueue(source, payload)
+        finally:
+            self._child_stop.set()
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+            self._release()
+            print("✓ [捕获子进程] 已退出")
+    
+    def _receive(self) -> tuple:
+        message = self._messages.get(timeout=0.2)
+        if message[0] == "chunk":
+            return message[0], message[1], message[2:]
+        return message
+    
+    def _enqueue(self, source: str, payload: tuple):
+        offset, length, pcm_offset, position, timestamp, duration, marks = payload
+        rings = self._rings[source]
+        audio_ring, pcm_ring = rings
+        trace_id = tracer.adopt(source, marks)
+        chunk = AudioChunk(
+            source=source,
+            audio_data=audio_ring._data[offset:offset + length],
+            timestamp=timestamp,
+            duration=duration,
+            pcm=pcm_ring._data[pcm_offset:pcm_offset + length],
+            trace_id=trace_id,
+            guard=RingGuard(rings, position)
+        )
+        if DEBUG_MODE:
+            print(f"[捕获子进程] {source} 音频就绪（{length} 采样，{time.time() - timestamp:.3f}秒前）")
+        self.audio_queue.put_nowait(chunk)  # 满了由 PriorityAudioQueue 按优先级挤掉一条
+    
+    def _release(self):
+        """释放共享内存（识别线程可能还拿着视图：映射留到进程退出，名字先删掉）"""
+        self._rings.clear()
+        for shm in self._shms:
+            try:
+                shm.close()
+            except BufferError:
+                pass
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shms.clear()
+
+
+def start_capture_process(
+    audio_queue: queue.Queue,
+    devices: dict,
+    stop_event: threading.Event,
+    mode: str = CAPTURE_MODE
+) -> tuple[list[threading.Thread], list[RemoteCapture]]:
+    """
+    在子进程里启动所有设备的捕获（参数和返回值与 start_capture_threads 相同）
+    
+    Returns:
+        ([桥接线程], 各设备的 RemoteCapture)
+    """
+    bridge = CaptureProcessBridge(audio_queue, devices, stop_event, mode)
+    if not bridge.devices:
+        print("❌ 没有可用的捕获设备")
+        return [], []
+    return [bridge.start()], list(bridge.captures.values())
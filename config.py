@@ -9,20 +9,91 @@ import pyaudio
 FORMAT = pyaudio.paInt16
 RATE = 16000  # FunASR 要求的采样率
 CHUNK_DURATION = 0.1  # 每次读取 100ms
-MAX_BUFFER_DURATION = 10  # 最长缓冲 10 秒（支持长问题）
+MAX_BUFFER_DURATION = 50  # 最长缓冲 50 秒（超长问题才强制截断，识别时再按停顿切段）
 SILENCE_DURATION = 0.8  # 静音持续 0.8 秒后认为问题结束（面试场景）
 AUDIO_QUEUE_MAX_SIZE = 20  # 队列大小（支持两个设备）
 SILENCE_THRESHOLD = 0.2  # 静音检测阈值（麦克风底噪较高，提高阈值）
+# 语音活动检测（VAD）
+# "adaptive"：自适应频谱能量/过零率/谱通量检测，自动跟踪底噪（推荐）
+# "peak"：旧版峰值阈值检测，使用 SILENCE_THRESHOLD
+VAD_MODE = "adaptive"
+VAD_MARGIN_DB = 3.0  # 语音频带平均信噪比超过多少 dB 算人声
+VAD_MIN_ENERGY_DB = -55.0  # 绝对能量下限（低于此值一律视为静音）
+VAD_SPEECH_RATIO = 0.3  # 一帧中有声子帧占比达到多少算语音帧
+RING_BUFFER_DURATION = 120  # 每个捕获线程的环形缓冲区容量（秒，16kHz float32 约 7.5MB）
+# 队列里的语音是缓冲区视图：积压超过容量时旧视图被覆盖，识别线程检测到后丢弃该句并警告
+# 捕获模式
+# "blocking"：每个设备一个线程阻塞读取，处理跟不上时 PortAudio 静默丢帧（默认）
+# "callback"：PortAudio 回调只把原始帧拷进预分配环形缓冲区，一个 DSP 线程处理所有设备；
+#             Python 侧卡顿不丢帧（积压在缓冲区里），真丢帧时有计数
+CAPTURE_MODE = "blocking"
+CAPTURE_RING_DURATION = 5.0  # 回调模式每个设备的原始帧缓冲区能积压多久的音频（秒）
+# 捕获子进程：捕获和逐帧预处理（VAD、重采样）放到独立进程，音频经共享内存交给主进程，
+# 识别 / LLM / GUI 线程不再和 DSP 抢 GIL（流式识别模式下不生效）
+CAPTURE_PROCESS = False
 INT16_MAX = 32768.0
 
 # ============ 调试开关 ============
 DEBUG_MODE = False  # 调试模式（关闭以减少输出）
 SHOW_TIMING = True  # 显示性能计时
 SHOW_VOLUME = False  # 显示实时音量（已调优，可关闭）
+# 端到端延迟追踪：每段语音从第一帧人声到 LLM 最后一个 token 的各阶段耗时（见 tracing.py）
+TRACE_ENABLED = False
+TRACE_PATH = "traces.jsonl"  # 退出时导出（每行一段语音）
+TRACE_MAX_UTTERANCES = 2000  # 最多保留多少段语音的记录
+
+# ============ 识别并发 ============
+ASR_WORKERS = 2  # 并发识别 worker 数（面试官和麦克风的语音可同时识别）
+# 识别队列调度：数字越小越优先，队列满时先丢优先级低的
+SOURCE_PRIORITY = {'speaker': 0, 'microphone': 1}
+SCHEDULER_MAX_WAIT = 10.0  # 低优先级语音最多等待多久后允许插队（秒），防止麦克风被饿死
+# 长语音切段：超过 ASR_SEGMENT_DURATION 秒的语音在停顿处切开，各段并发识别后按顺序拼接
+ASR_SEGMENT_DURATION = 8.0  # 每段最长时长（秒），识别耗时随段长而不是总长增长
+ASR_SEGMENT_SEARCH_WINDOW = 3.0  # 在每段末尾多长的范围内找能量最低的切点（秒）
+ASR_SEGMENT_WORKERS = 4  # 切段识别的并发数（独立线程池，不占用识别 worker）
+# 流水线运行时
+# "threads"：捕获、识别调度、写盘各自一个线程（默认）
+# "asyncio"：捕获帧、VAD、识别调度和 LLM 流都是一个事件循环线程里的任务，
+#            阻塞的 ASR / LLM 请求共用一个线程池（大小 ASR_WORKERS + ASR_SEGMENT_WORKERS + 1），停止时立即退出
+PIPELINE_RUNTIME = "threads"
+LLM_STREAM_BUFFER = 64  # asyncio 运行时 LLM 流最多预读多少块（消费方跟不上时 HTTP 读取暂停）
+
+# ============ 对话记录 ============
+TRANSCRIPT_MAX_ENTRIES = 5000  # 内存中保留最近多少句识别结果（更早的丢弃，长时间面试内存不增长）
+TRANSCRIPT_VIEW_MAX_LINES = 2000  # GUI 左侧最多显示多少行（超出后自动删除最早的行）
+
+# ============ 会话录制 ============
+# 保存每句话的音频（16kHz int16 PCM）和识别文本，面试后用 session_recorder.py 回顾、搜索、导出回放
+SESSION_RECORD_ENABLED = False
+SESSION_RECORD_DIR = "sessions"  # 每次启动在这里新建一个子目录
+SESSION_SEGMENT_DURATION = 600  # 每个音频分段文件的容量（秒，约 19MB），写满换下一个文件
 
 # ============ 错误处理 ============
 MAX_CONSECUTIVE_ERRORS = 5  # 最大连续错误次数
 
+# ============ ASR 后端 ============
+# "tencent"：腾讯云（需要网络和 API Key）
+# "local"：本地 CPU 模型，无网络延迟（需要 pip install funasr torch torchaudio，首次运行下载模型）
+# "fake"：假后端，不识别，只用于测试
+ASR_BACKEND = "tencent"
+LOCAL_ASR_MODEL = "paraformer-zh"  # FunASR 模型名
+LOCAL_ASR_PUNC_MODEL = "ct-punc"  # 标点恢复模型（None 表示不加标点）
+LOCAL_ASR_DEVICE = "cpu"  # cpu / cuda:0 / mps
+
+# 容错（一句话识别，见 asr_resilience.py）：超时、重试、对冲、熔断
+ASR_TIMEOUT = 5.0  # 单次请求超时（秒）
+ASR_DEADLINE = 8.0  # 一句话识别的总耗时上限（秒，含重试）
+ASR_RETRIES = 2  # 网络 / 限流 / 服务端错误最多重试次数
+ASR_RETRY_BACKOFF = 0.2  # 重试退避基数（秒），第 n 次重试前随机等待 0 ~ 基数×2^n
+ASR_HEDGE_QUANTILE = 0.95  # 请求超过近期该分位耗时仍未返回就再发一个（0 表示不对冲）
+ASR_HEDGE_MIN_SAMPLES = 20  # 积累多少次请求耗时后才开始对冲
+ASR_BREAKER_THRESHOLD = 5  # 连续失败多少次后熔断
+ASR_BREAKER_COOLDOWN = 30.0  # 熔断多久后再试主后端（秒）
+# 主后端最多同时在途多少个请求（= 请求线程数）：超时的请求也占着名额直到真正返回，
+# 占满时新请求直接失败并计入熔断，不排队；至少留出 (ASR_WORKERS + ASR_SEGMENT_WORKERS) × 2（对冲）
+ASR_MAX_IN_FLIGHT = 16
+ASR_FALLBACK_BACKEND = None  # 熔断期间使用的备用后端（如 "local"），None 表示熔断期间放弃识别
+
 # ============ 腾讯云 ASR 配置 ============
 # 获取方式：https://console.cloud.tencent.com/cam/capi
 TENCENT_SECRET_ID = ""  # 替换为你的 SecretId
@@ -30,9 +101,39 @@ TENCENT_SECRET_KEY = ""  # 替换为你的 SecretKey
 TENCENT_APP_ID = ""  # 替换为你的 AppId
 TENCENT_ENGINE_MODEL_TYPE = "16k_zh"  # 中文模型，16k采样率
 TENCENT_REGION = "ap-shanghai"  # 地域：上海
+TENCENT_ASR_ENDPOINT = "https://asr.tencentcloudapi.com"  # 一句话识别 API 地址（可改为本地 HTTPS 替身服务器）
+TENCENT_ASR_CA_FILE = None  # 额外信任的 CA 证书（替身服务器使用自签名证书时填写）
+TENCENT_HEARTBEAT_INTERVAL = 20.0  # 连接保活间隔（秒），保证每句话都走已建好的 TLS 连接；0 表示不保活
+
+# 识别模式
+# "sentence"：一句话识别，静音 SILENCE_DURATION 秒后整段上传
+# "streaming"：实时识别，说话时逐帧推送，说完即出结果（需要 websocket-client）
+ASR_MODE = "sentence"
+TENCENT_STREAMING_URL = "wss://asr.cloud.tencent.com/asr/v2/"  # 可改为本地 WebSocket 替身服务器
 
 # ============ LLM 配置 ============
 LLM_PROVIDER = "qwen"  # "openai", "anthropic", "qwen"
+# 竞速：同一个问题同时发给多个提供商，用最先出字的那个，其余的立即取消（每次提问多付输入 token）
+# 填两个及以上时代替 LLM_PROVIDER，例如 ["qwen", "openai"]；其他 OpenAI 兼容接口写成字典：
+#     {"name": "qwen-backup", "api_key": "...", "model": "qwen-plus", "base_url": "https://..."}
+#     （加 "type": "anthropic" 表示 Anthropic 接口）
+LLM_RACE_PROVIDERS = []
+# 预取：面试官说完一句就在后台生成回答，按 Ctrl+V 时直接显示（会多消耗 token）
+LLM_PREFETCH = False
+# 流式读取超时（秒）：连接、首 token 前和两个片段之间最长等待多久；被取消的请求最迟这么久释放线程和连接
+LLM_READ_TIMEOUT = 30.0
+# AI 回答的刷新间隔（毫秒）：LLM 线程把 token 攒在缓冲区，GUI 每帧一次性追加（16~33 即 60~30 帧/秒）
+GUI_TOKEN_FLUSH_MS = 33
+# 对话历史预算（估算 token）：超出后最早的问答压缩成摘要，避免提示词随面试时长无限增长
+LLM_HISTORY_TOKEN_BUDGET = 3000
+LLM_SUMMARY_TOKEN_BUDGET = 600  # 其中摘要部分的上限
+# 回答缓存：面试官重复或换个说法问同一个问题时直接复用之前的回答
+ANSWER_CACHE_ENABLED = False
+ANSWER_CACHE_PATH = "answer_cache.json"  # 持久化文件，下次启动仍可命中
+ANSWER_CACHE_MAX_ENTRIES = 500  # 最多缓存条数（超出淘汰最久未用的）
+ANSWER_CACHE_SIMILARITY = 0.7  # 近似命中的最低相似度（字符 2-gram Jaccard，越高越严格）
+ANSWER_CACHE_CONTEXT_MAX_CHARS = 4  # 归一化后不超过几个字的问题视为追问（如「为什么」），只在上一个问题相同时命中
+ANSWER_CACHE_SAVE_INTERVAL = 30.0  # 两次写盘的最短间隔（秒），退出时补写
 
 # Qwen（通义千问）配置
 QWEN_API_KEY = ""
@@ -47,4 +148,6 @@ OPENAI_BASE_URL = None  # 自定义 API 地址（可选，用于第三方兼容
 # Anthropic 配置
 ANTHROPIC_API_KEY = "YOUR_ANTHROPIC_API_KEY_HERE"  # 替换为你的 Anthropic API Key
 ANTHROPIC_MODEL = "claude-3-5-sonnet-20241022"  # claude-3-5-sonnet-20241022 等
+ANTHROPIC_BASE_URL = None  # 自定义 API 地址（可选，如本地替身服务器）
+ANTHROPIC_MAX_TOKENS = 1024  # 每次回答的输出 token 上限（Anthropic 接口必填）
 
@@ -5,7 +5,6 @@
 """
 
 import sys
-import queue
 import threading
 import time
 from typing import Optional
@@ -18,23 +17,35 @@ from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt6.QtGui import QFont, QTextCursor, QColor
 
 from config import (
-    AUDIO_QUEUE_MAX_SIZE, TENCENT_SECRET_ID, TENCENT_SECRET_KEY, TENCENT_APP_ID,
-    TENCENT_ENGINE_MODEL_TYPE, TENCENT_REGION, LLM_PROVIDER,
-    QWEN_API_KEY, QWEN_MODEL, QWEN_BASE_URL,
-    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL
+    AUDIO_QUEUE_MAX_SIZE, ASR_BACKEND,
+    LLM_PROVIDER, LLM_PREFETCH, ANSWER_CACHE_ENABLED, GUI_TOKEN_FLUSH_MS, TRANSCRIPT_VIEW_MAX_LINES,
+    SESSION_RECORD_ENABLED, PIPELINE_RUNTIME
 )
 from audio_device import AudioDeviceManager
-from audio_capture import start_capture_thread
-from speech_recognizer import start_recognizer_thread
-from asr_backend import TencentASR
-from llm import LLMProvider, LLMAssistant
+from audio_capture import start_capture_threads
+from audio_scheduler import PriorityAudioQueue
+from speech_recognizer import SpeechRecognizer, start_recognizer_thread
+from async_pipeline import AsyncPipeline, AsyncPriorityQueue, StopEvent
+from session_recorder import start_session_recorder
+from asr_backend import create_asr_backend
+from llm import AnswerStream, LLMAssistant, LLMRaceProvider, create_llm_provider
+from llm_prefetch import LLMPrefetcher
+from answer_cache import AnswerCache
+from tracing import tracer
+from transcript import TranscriptStore
 
 
 class ASRWorker(QThread):
-    """语音识别工作线程"""
+    """
+    语音识别工作线程
+    
+    "threads" 运行时：启动捕获 / 识别线程后阻塞等待停止；
+    "asyncio" 运行时：事件循环直接跑在本线程里（见 async_pipeline.py）
+    """
     
     # 信号：(source, text, timestamp)
     text_recognized = pyqtSignal(str, str, float)
+    partial_recognized = pyqtSignal(str, str, float)  # 流式中间结果
     status_changed = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
     
@@ -43,12 +54,21 @@ class ASRWorker(QThread):
         # 发射信号到 GUI 线程
         self.text_recognized.emit(source, text, timestamp)
     
-    def __init__(self):
+    def on_partial_result(self, source: str, text: str, timestamp: float):
+        """流式中间结果回调（从识别会话读线程调用）"""
+        self.partial_recognized.emit(source, text, timestamp)
+    
+    def __init__(self, transcript: TranscriptStore, runtime: str = PIPELINE_RUNTIME):
         super().__init__()
-        self.stop_event = threading.Event()
+        self.transcript = transcript  # 识别结果写入这里，GUI 从这里读取
+        self.runtime = runtime
+        self.stop_event = StopEvent() if runtime == "asyncio" else threading.Event()
+        self.pipeline = None
         self.audio_queue = None
         self.threads = []
+        self.captures = []
         self.recognizer = None
+        self.recorder = None
         self.speaker_device = None
         self.microphone_device = None
     
@@ -66,60 +86,67 @@ class ASRWorker(QThread):
             self.status_changed.emit("设备检测完成")
             
             # 2. 初始化 ASR
-            self.status_changed.emit("初始化腾讯云 ASR...")
-            asr_backend = TencentASR(
-                secret_id=TENCENT_SECRET_ID,
-                secret_key=TENCENT_SECRET_KEY,
-                app_id=TENCENT_APP_ID,
-                engine_model_type=TENCENT_ENGINE_MODEL_TYPE,
-                region=TENCENT_REGION
-            )
+            self.status_changed.emit(f"初始化 ASR（{ASR_BACKEND}）...")
+            asr_backend = create_asr_backend()
             
-            # 3. 创建队列
-            self.audio_queue = queue.Queue(maxsize=AUDIO_QUEUE_MAX_SIZE)
+            # 3. 会话录制（开启时识别结果同时落盘）
+            recorder_thread = None
+            if SESSION_RECORD_ENABLED:
+                recorder_thread, self.recorder = start_session_recorder(self.stop_event)
+            devices = {'speaker': self.speaker_device, 'microphone': self.microphone_device}
+            
+            if self.runtime == "asyncio":
+                # 4. 队列、识别器和捕获都由本线程里的事件循环驱动
+                self.audio_queue = AsyncPriorityQueue(maxsize=AUDIO_QUEUE_MAX_SIZE)
+                self.recognizer = SpeechRecognizer(
+                    self.audio_queue,
+                    self.stop_event,
+                    asr_backend,
+                    on_result_callback=self.on_recognition_result,
+                    on_partial_callback=self.on_partial_result,
+                    transcript=self.transcript,
+                    recorder=self.recorder
+                )
+                if recorder_thread is not None:
+                    self.threads.append(recorder_thread)
+                streamer = self.recognizer if self.recognizer.supports_streaming else None
+                self.pipeline = AsyncPipeline(self.audio_queue, self.recognizer, devices, self.stop_event, streamer)
+                self.captures = self.pipeline.captures
+                
+                self.status_changed.emit("✓ 系统就绪")
+                self.pipeline.run_until_stopped()
+                return
             
-            # 4. 启动识别线程（带回调）
+            # 4. 创建队列，启动识别线程（带回调）
+            self.audio_queue = PriorityAudioQueue(maxsize=AUDIO_QUEUE_MAX_SIZE)
             thread, self.recognizer = start_recognizer_thread(
                 self.audio_queue,
                 self.stop_event,
                 asr_backend,
-                on_result_callback=self.on_recognition_result
+                on_result_callback=self.on_recognition_result,
+                on_partial_callback=self.on_partial_result,
+                transcript=self.transcript,
+                recorder=self.recorder
             )
             self.threads.append(thread)
+            if recorder_thread is not None:
+                self.threads.append(recorder_thread)
             
             # 5. 启动捕获线程
             self.status_changed.emit("启动音频捕获...")
-            speaker_thread = start_capture_thread(
+            streamer = self.recognizer if self.recognizer.supports_streaming else None
+            threads, self.captures = start_capture_threads(
                 self.audio_queue,
-                self.speaker_device,
-                'speaker',
-                self.stop_event
+                devices,
+                self.stop_event,
+                streamer
             )
-            if speaker_thread:
-                self.threads.append(speaker_thread)
-            
-            if self.microphone_device:
-                mic_thread = start_capture_thread(
-                    self.audio_queue,
-                    self.microphone_device,
-                    'microphone',
-                    self.stop_event
-                )
-                if mic_thread:
-                    self.threads.append(mic_thread)
+            self.threads.extend(threads)
             
             self.status_changed.emit("✓ 系统就绪")
             
-            # 6. 监听识别结果
-            while not self.stop_event.is_set():
-                if self.recognizer:
-                    # 检查是否有新的识别结果
-                    if hasattr(self.recognizer, 'last_speaker_text') and self.recognizer.last_speaker_text:
-                        # 通过信号发送给 GUI
-                        # 注意：这里我们需要在 SpeechRecognizer 中添加信号机制
-                        pass
-                
-                time.sleep(0.1)
+            # 6. 识别结果经回调信号送到 GUI，这里只需阻塞到停止
+            self.stop_event.wait()
         
         except Exception as e:
             self.error_occurred.emit(f"ASR 初始化失败: {str(e)}")
@@ -131,26 +158,90 @@ class ASRWorker(QThread):
             thread.join(timeout=2)
 
 
+class TokenBuffer:
+    """
+    LLM 线程写入、GUI 定时器取走的 token 缓冲区（线程安全）
+    
+    token 不再逐个发信号跨线程投递，GUI 每帧取一次，拼成一段文本
+    """
+    
+    def __init__(self):
+        self._chunks = []
+        self._lock = threading.Lock()
+    
+    def append(self, chunk: str):
+        with self._lock:
+            self._chunks.append(chunk)
+    
+    def take(self) -> str:
+        """取走目前攒下的全部文本（没有则返回空串）"""
+        with self._lock:
+            chunks, self._chunks = self._chunks, []
+        return "".join(chunks)
+
+
+class AnswerView:
+    """
+    AI 回答区域的渲染
+    
+    - 占位提示（"思考中"）用状态记录，不在文档里搜索文本
+    - 追加只在文档末尾插入，耗时与已显示的长度无关
+    - 只在用户停留在底部时自动滚动（往上翻看时不被拉回来）
+    """
+    
+    def __init__(self, text_edit: QTextEdit):
+        self.text_edit = text_edit
+        self.has_placeholder = False
+    
+    def show_placeholder(self, text: str):
+        self.text_edit.setPlainText(text)
+        self.has_placeholder = True
+    
+    def append(self, text: str):
+        if not text:
+            return
+        if self.has_placeholder:
+            self.text_edit.clear()
+            self.has_placeholder = False
+        
+        scrollbar = self.text_edit.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+    
+    def clear(self):
+        self.text_edit.clear()
+        self.has_placeholder = False
+
+
 class LLMWorker(QThread):
-    """LLM 流式响应工作线程"""
+    """
+    LLM 流式响应工作线程（token 写入 buffer，由 GUI 定时取走）
     
-    # 信号：(chunk_text, is_done)
-    chunk_received = pyqtSignal(str, bool)
+    回答被新问题打断（LLMAssistant.ask）时在下一个片段处结束，底层 HTTP 流已被关闭
+    """
+    
+    # 信号：全部 token 已写入 buffer（参数：回答是否来自缓存）
+    finished_streaming = pyqtSignal(bool)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, llm_assistant: LLMAssistant, question: str):
+    def __init__(self, answer: AnswerStream, buffer: TokenBuffer, trace_id: Optional[str] = None):
         super().__init__()
-        self.llm_assistant = llm_assistant
-        self.question = question
+        self.answer = answer
+        self.buffer = buffer
+        self.trace_id = trace_id  # 问题所在语音的追踪 ID（预取的回答已自带追踪，传 None）
     
     def run(self):
         """流式获取 AI 回复"""
         try:
-            for chunk in self.llm_assistant.chat_stream(self.question):
-                self.chunk_received.emit(chunk, False)
+            for chunk in tracer.trace_stream(self.trace_id, self.answer):
+                self.buffer.append(chunk)
             
             # 完成信号
-            self.chunk_received.emit("", True)
+            self.finished_streaming.emit(self.answer.cached)
         
         except Exception as e:
             self.error_occurred.emit(f"AI 回复失败: {str(e)}")
@@ -166,15 +257,22 @@ class InterviewAssistantGUI(QMainWindow):
         self.asr_worker = None
         self.llm_assistant = None
         self.llm_worker = None
+        self._retired_workers = []  # 被打断、还没退出的 LLMWorker（QThread 运行中不能被销毁）
+        self.prefetcher = None
+        
+        # 对话记录：识别线程写入，左侧只渲染其中面试官的部分
+        self.transcript = TranscriptStore()
+        self._rendered_id = 0  # 下一句待渲染的 ID
         
         # 初始化界面
         self.init_ui()
         self.init_llm()
         
-        # 定时器：轮询识别结果
-        self.poll_timer = QTimer()
-        self.poll_timer.timeout.connect(self.poll_recognition_results)
-        self.poll_timer.start(100)  # 每 100ms 检查一次
+        # 定时器：按帧把攒下的 AI token 刷到界面上（只在生成回答时运行）
+        self.token_buffer = TokenBuffer()
+        self.render_timer = QTimer()
+        self.render_timer.setInterval(GUI_TOKEN_FLUSH_MS)
+        self.render_timer.timeout.connect(self.flush_ai_tokens)
     
     def init_ui(self):
         """初始化用户界面"""
@@ -262,6 +360,7 @@ class InterviewAssistantGUI(QMainWindow):
         self.interviewer_text.setReadOnly(True)
         self.interviewer_text.setFont(QFont("Arial", 13))
         self.interviewer_text.setPlaceholderText("等待面试官提问...")
+        self.interviewer_text.document().setMaximumBlockCount(TRANSCRIPT_VIEW_MAX_LINES)  # 超出自动删除最早的行
         layout.addWidget(self.interviewer_text, stretch=10)  # 占据大部分空间
         
         # 提示文字（缩小）
@@ -291,6 +390,7 @@ class InterviewAssistantGUI(QMainWindow):
         self.ai_text.setFont(QFont("Arial", 13))
         self.ai_text.setPlaceholderText("点击「获取 AI 建议」按钮获取回答建议...")
         layout.addWidget(self.ai_text, stretch=10)  # 占据大部分空间
+        self.ai_view = AnswerView(self.ai_text)
         
         # 提示文字（缩小）
         hint = QLabel("💡 提示：AI 建议会流式显示，实时更新")
@@ -304,24 +404,14 @@ class InterviewAssistantGUI(QMainWindow):
     def init_llm(self):
         """初始化 LLM"""
         try:
-            if LLM_PROVIDER == "qwen":
-                provider = LLMProvider(
-                    api_key=QWEN_API_KEY,
-                    model=QWEN_MODEL,
-                    base_url=QWEN_BASE_URL
-                )
-            elif LLM_PROVIDER == "openai":
-                provider = LLMProvider(
-                    api_key=OPENAI_API_KEY,
-                    model=OPENAI_MODEL,
-                    base_url=OPENAI_BASE_URL or "https://api.openai.com/v1"
-                )
-            else:
-                self.statusBar.showMessage(f"⚠️  未知的 LLM 提供商: {LLM_PROVIDER}")
-                return
+            provider = create_llm_provider()
             
-            self.llm_assistant = LLMAssistant(provider)
-            self.statusBar.showMessage(f"✓ LLM 已初始化 ({LLM_PROVIDER})")
+            answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
+            self.llm_assistant = LLMAssistant(provider, answer_cache=answer_cache)
+            if LLM_PREFETCH:
+                self.prefetcher = LLMPrefetcher(self.llm_assistant)
+            name = f"竞速 {', '.join(provider.providers)}" if isinstance(provider, LLMRaceProvider) else LLM_PROVIDER
+            self.statusBar.showMessage(f"✓ LLM 已初始化 ({name})")
         
         except Exception as e:
             self.statusBar.showMessage(f"⚠️  LLM 初始化失败: {str(e)}")
@@ -333,10 +423,11 @@ class InterviewAssistantGUI(QMainWindow):
             self.start_button.setText("正在启动...")
             
             # 创建并启动 ASR 工作线程
-            self.asr_worker = ASRWorker()
+            self.asr_worker = ASRWorker(self.transcript)
             self.asr_worker.status_changed.connect(self.on_asr_status_changed)
             self.asr_worker.error_occurred.connect(self.on_asr_error)
             self.asr_worker.text_recognized.connect(self.on_text_recognized)
+            self.asr_worker.partial_recognized.connect(self.on_partial_recognized)
             self.asr_worker.start()
         else:
             self.statusBar.showMessage("语音识别已经在运行中")
@@ -356,37 +447,32 @@ class InterviewAssistantGUI(QMainWindow):
         self.start_button.setEnabled(True)
         self.start_button.setText("🎤 重新启动")
     
-    def poll_recognition_results(self):
-        """轮询识别结果（定时器调用）"""
-        # 现在使用信号机制，不需要轮询了
-        pass
-    
     def on_text_recognized(self, source: str, text: str, timestamp: float):
-        """接收识别结果（信号槽）"""
+        """接收识别结果（信号槽）：结果已写入对话记录，这里只负责渲染和预取"""
+        self.render_transcript()
+        if source == 'speaker' and self.prefetcher:
+            self.prefetcher.prefetch(text, tracer.latest(source))
+    
+    def on_partial_recognized(self, source: str, text: str, timestamp: float):
+        """接收流式中间结果：面试官还在说话，先在状态栏预览"""
         if source == 'speaker':
-            self.add_interviewer_question(text)
-        else:
-            # 麦克风的话也可以显示（可选）
-            pass
+            self.statusBar.showMessage(f"🎧 识别中: {text[-40:]}")
     
     def get_last_question(self) -> str:
         """获取最后一个问题"""
-        text = self.interviewer_text.toPlainText()
-        if not text:
-            return ""
-        
-        # 提取最后一个问题（假设格式为 "HH:MM:SS - 问题内容"）
-        lines = text.strip().split('\n')
-        if lines:
-            last_line = lines[-1]
-            if ' - ' in last_line:
-                return last_line.split(' - ', 1)[1]
-        return ""
+        utterance = self.transcript.last('speaker')
+        return utterance.text if utterance else ""
     
-    def add_interviewer_question(self, question: str):
+    def render_transcript(self):
+        """把对话记录里还没显示的面试官问题追加到左侧（麦克风的话不显示）"""
+        for utterance in self.transcript.since(self._rendered_id):
+            self._rendered_id = utterance.id + 1
+            if utterance.source == 'speaker':
+                self.add_interviewer_question(utterance.text, utterance.timestamp)
+    
+    def add_interviewer_question(self, question: str, timestamp: float):
         """添加面试官问题到左侧"""
-        timestamp = time.strftime("%H:%M:%S")
-        formatted_text = f"\n{timestamp} - {question}\n"
+        formatted_text = f"\n{time.strftime('%H:%M:%S', time.localtime(timestamp))} - {question}"
         
         self.interviewer_text.append(formatted_text)
         
@@ -411,61 +497,81 @@ class InterviewAssistantGUI(QMainWindow):
             self.statusBar.showMessage("⚠️  没有检测到面试官问题")
             return
         
-        # 清空右侧
-        self.ai_text.clear()
-        self.ai_text.append("💭 AI 正在思考...\n\n")
-        
-        # 禁用按钮
-        self.ask_ai_button.setEnabled(False)
-        self.ask_ai_button.setText("AI 思考中...")
+        # 打断还在生成的回答：不再接收它的信号，它写的缓冲区一并丢弃（已输出的部分由 LLMAssistant 写入历史）
+        if self.llm_worker is not None:
+            self.llm_worker.finished_streaming.disconnect()
+            self.llm_worker.error_occurred.disconnect()
+            self._retired_workers.append(self.llm_worker)
+        self._retired_workers = [worker for worker in self._retired_workers if worker.isRunning()]
         
-        # 启动 LLM 工作线程
-        self.llm_worker = LLMWorker(self.llm_assistant, last_question)
-        self.llm_worker.chunk_received.connect(self.on_ai_chunk)
+        # 清空右侧
+        self.token_buffer = TokenBuffer()
+        self.ai_view.show_placeholder("💭 AI 正在思考...\n\n")
+        
+        # 回答期间按钮仍可点击：再点一次就打断当前回答、重新提问
+        self.ask_ai_button.setText("🔄 重新提问（打断当前回答）")
+        
+        # 启动 LLM 工作线程（有预取结果就直接用；两者都会打断上一个回答）
+        answer = self.prefetcher.take(last_question) if self.prefetcher else None
+        trace_id = None
+        if answer is None:
+            answer = self.llm_assistant.ask(last_question)
+            trace_id = tracer.latest('speaker')
+        self.llm_worker = LLMWorker(answer, self.token_buffer, trace_id)
+        self.llm_worker.finished_streaming.connect(self.on_ai_done)
         self.llm_worker.error_occurred.connect(self.on_ai_error)
+        self.render_timer.start()
         self.llm_worker.start()
     
-    def on_ai_chunk(self, chunk: str, is_done: bool):
-        """接收 AI 流式响应"""
-        if is_done:
-            # 完成
-            self.ask_ai_button.setEnabled(True)
-            self.ask_ai_button.setText("🤖 获取 AI 建议")
-            self.statusBar.showMessage("✓ AI 建议已生成")
+    def flush_ai_tokens(self):
+        """把缓冲区里的 token 一次性追加到回答区域（每帧一次）"""
+        self.ai_view.append(self.token_buffer.take())
+    
+    def on_ai_done(self, cached: bool):
+        """AI 回答完成"""
+        self.render_timer.stop()
+        self.flush_ai_tokens()
+        self.ask_ai_button.setText("🤖 获取 AI 建议")
+        if cached:
+            self.statusBar.showMessage("✓ AI 建议已生成（来自缓存）")
         else:
-            # 如果是第一个 chunk，清空"思考中"
-            current_text = self.ai_text.toPlainText()
-            if "思考中" in current_text:
-                self.ai_text.clear()
-            
-            # 追加文本
-            cursor = self.ai_text.textCursor()
-            cursor.movePosition(QTextCursor.MoveOperation.End)
-            cursor.insertText(chunk)
-            self.ai_text.setTextCursor(cursor)
-            
-            # 滚动到底部
-            self.ai_text.ensureCursorVisible()
+            self.statusBar.showMessage("✓ AI 建议已生成")
     
     def on_ai_error(self, error: str):
         """AI 错误"""
-        self.ai_text.append(f"\n\n❌ {error}")
-        self.ask_ai_button.setEnabled(True)
+        self.render_timer.stop()
+        self.flush_ai_tokens()
+        self.ai_view.append(f"\n\n❌ {error}")
         self.ask_ai_button.setText("🤖 重试")
         self.statusBar.showMessage(f"❌ {error}")
     
     def clear_all(self):
         """清空所有显示"""
         self.interviewer_text.clear()
-        self.ai_text.clear()
+        self.transcript.clear()
+        self.ai_view.clear()
         self.statusBar.showMessage("已清空")
     
     def closeEvent(self, event):
         """关闭事件：停止所有线程"""
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        if self.llm_assistant:
+            self.llm_assistant.cancel()
+        for worker in self._retired_workers + [self.llm_worker]:
+            if worker is not None:
+                worker.wait(2000)  # 已取消，下一个片段处就会退出
+        if self.llm_assistant and self.llm_assistant.answer_cache is not None:
+            self.llm_assistant.answer_cache.close()
+        
         if self.asr_worker:
             self.asr_worker.stop()
             self.asr_worker.wait()
         
+        if tracer.enabled:
+            tracer.print_summary()
+            tracer.export()
+        
         event.accept()
 
 
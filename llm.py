@@ -1,9 +1,196 @@
 """
 LLM 对话接口 - 简化版
-直接使用 OpenAI SDK，支持所有 OpenAI 兼容接口（包括 Qwen）
+直接使用 OpenAI SDK，支持所有 OpenAI 兼容接口（包括 Qwen），Anthropic 使用官方 SDK
+
+每次提问返回一个可取消的 AnswerStream：新问题会打断还在生成的旧回答（关闭 HTTP 流），
+旧回答已输出的部分带上打断标记写入对话历史
+
+配置了 LLM_RACE_PROVIDERS 时 create_llm_provider 返回 LLMRaceProvider：同一个请求同时发给多个提供商，
+用最先出字的那个，其余的立即取消
 """
 
-from typing import Iterator, Optional
+import math
+import queue
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, Sequence, Union
+
+from config import LLM_HISTORY_TOKEN_BUDGET, LLM_SUMMARY_TOKEN_BUDGET, LLM_READ_TIMEOUT
+from config import LLM_PROVIDER, LLM_RACE_PROVIDERS
+from config import QWEN_API_KEY, QWEN_MODEL, QWEN_BASE_URL
+from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL
+from config import ANTHROPIC_API_KEY, ANTHROPIC_MODEL, ANTHROPIC_BASE_URL, ANTHROPIC_MAX_TOKENS
+from answer_cache import AnswerCache
+from tracing import percentile
+
+# 中日韩文字和全角标点：一个字约一个 token
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+# 其余文本：按单词 / 数字 / 标点切分
+_WORD_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_SENTENCE_END = re.compile(r"[。！？!?\n]|\.\s")
+
+MESSAGE_OVERHEAD_TOKENS = 4  # 每条消息的角色、分隔符开销
+LLM_ERROR_PREFIX = "\n❌ LLM 错误"  # 请求失败时流中输出的提示（这样的回答不写缓存）
+INTERRUPTED_MARK = "（回答被打断）"  # 没说完的回答写入历史时追加的标记
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    离线估算 token 数（不依赖具体模型的分词器）
+    
+    汉字按 1 个 token 计，英文单词按每 4 个字母 1 个 token 计，数字和标点各 1 个。
+    只用于控制预算，不追求与服务端计费完全一致
+    """
+    cjk = len(_CJK_PATTERN.findall(text))
+    rest = _CJK_PATTERN.sub(" ", text)
+    words = sum(math.ceil(len(word) / 4) for word in _WORD_PATTERN.findall(rest))
+    return cjk + words
+
+
+def estimate_message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationHistory:
+    """
+    按 token 预算管理的对话历史
+    
+    - 最近的对话原样保留
+    - 超出预算时，最早的一问一答被压缩成一行摘要（问题 + 回答首句），不需要调用模型
+    - 摘要本身也有预算，超出时丢弃最早的摘要行
+    """
+    
+    MIN_VERBATIM_MESSAGES = 3  # 至少原样保留：上一轮问答 + 当前问题
+    QUESTION_CHARS = 60  # 摘要中问题保留的字数
+    ANSWER_CHARS = 80  # 摘要中回答保留的字数
+    
+    def __init__(self, token_budget: int = LLM_HISTORY_TOKEN_BUDGET,
+                 summary_budget: int = LLM_SUMMARY_TOKEN_BUDGET):
+        """
+        Args:
+            token_budget: 历史（摘要 + 原文）的 token 上限
+            summary_budget: 其中摘要的 token 上限
+        """
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.clear()
+    
+    def clear(self):
+        self.messages = []
+        self._message_tokens = []  # 与 messages 一一对应，避免重复估算
+        self.summary_lines = []
+        self._summary_tokens = []
+        self.compacted_turns = 0  # 累计压缩了多少轮
+    
+    def __len__(self):
+        return len(self.messages)
+    
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+    
+    @property
+    def tokens(self) -> int:
+        """当前历史（摘要 + 原文）的估算 token 数"""
+        return sum(self._message_tokens) + sum(self._summary_tokens)
+    
+    def append(self, role: str, content: str):
+        message = {"role": role, "content": content}
+        self.messages.append(message)
+        self._message_tokens.append(estimate_message_tokens(message))
+        self._compact()
+    
+    def _compact(self):
+        """把最早的问答移进摘要，直到原文 + 摘要不超过预算"""
+        while self.tokens > self.token_budget and len(self.messages) > self.MIN_VERBATIM_MESSAGES:
+            question = self._pop_oldest()
+            answer = ""
+            if question["role"] == "user" and self.messages and self.messages[0]["role"] == "assistant":
+                answer = self._pop_oldest()["content"]
+            self._add_summary_line(question["content"], answer)
+            self.compacted_turns += 1
+        
+        while sum(self._summary_tokens) > self.summary_budget and self.summary_lines:
+            self.summary_lines.pop(0)
+            self._summary_tokens.pop(0)
+    
+    def _pop_oldest(self) -> dict:
+        self._message_tokens.pop(0)
+        return self.messages.pop(0)
+    
+    def _add_summary_line(self, question: str, answer: str):
+        line = f"- {self._clip(question, self.QUESTION_CHARS)}"
+        if answer:
+            first_sentence = _SENTENCE_END.split(answer.strip(), maxsplit=1)[0]
+            line += f" → {self._clip(first_sentence, self.ANSWER_CHARS)}"
+        self.summary_lines.append(line)
+        self._summary_tokens.append(estimate_tokens(line) + 1)
+    
+    @staticmethod
+    def _clip(text: str, limit: int) -> str:
+        text = " ".join(text.split())
+        return text if len(text) <= limit else text[:limit] + "…"
+
+
+class CancelToken:
+    """
+    取消信号：cancel() 可在任何线程调用
+    
+    提供商在读取线程里逐片段检查 cancelled，取消后在下一个片段处停止并关闭 HTTP 流
+    （SDK 的 close() 在另一个线程调用时打断不了正在进行的读取，还可能让连接留着没关）；
+    阻塞的读取最迟在 LLM_READ_TIMEOUT 秒后超时。on_cancel 登记的函数在取消时立即执行
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass  # 关闭失败不影响取消本身
+    
+    def on_cancel(self, callback: Callable[[], None]):
+        """登记取消时要执行的函数（已取消则立即执行）"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+    
+    def wait(self, timeout: float) -> bool:
+        """等待 timeout 秒，期间被取消返回 True（代替 time.sleep）"""
+        return self._event.wait(timeout)
+
+
+@dataclass
+class AnswerMeta:
+    """一次回答的来源信息（开始生成时由 LLMAssistant 填写，每个回答一份，预取和现场请求互不覆盖）"""
+    cached: bool = False  # 来自回答缓存
+    prompt_tokens: int = 0  # 提示词大小（估算，命中缓存时为 0）
+
+
+def _close_stream(stream):
+    """关闭 SDK 的流（在读取线程里调用），失败只打印警告"""
+    try:
+        stream.close()
+    except Exception as e:
+        print(f"⚠️  关闭 LLM 流失败: {e}")
 
 
 class LLMProvider:
@@ -29,11 +216,18 @@ class LLMProvider:
         
         self.client = OpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            timeout=LLM_READ_TIMEOUT
         )
     
-    def chat_stream(self, messages: list[dict], system_prompt: Optional[str] = None) -> Iterator[str]:
-        """流式对话"""
+    def chat_stream(self, messages: list[dict], system_prompt: Optional[str] = None,
+                    cancel: Optional[CancelToken] = None) -> Iterator[str]:
+        """
+        流式对话
+        
+        Args:
+            cancel: 取消信号（可选），取消后在下一个片段处关闭 HTTP 流，不再计费
+        """
         # 添加系统提示
         full_messages = []
         if system_prompt:
@@ -47,31 +241,346 @@ class LLMProvider:
                 stream=True,
                 temperature=0.7
             )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            try:
+                for chunk in stream:
+                    if cancel is not None and cancel.cancelled:
+                        break
+                    if chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                _close_stream(stream)  # 调用方提前停止、被取消时都在读取线程里释放连接
+        
+        except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return  # 取消之后的读取错误（超时、连接关闭）不算错误
+            yield f"{LLM_ERROR_PREFIX}: {e}\n"
+
+
+class AnthropicProvider:
+    """Anthropic Claude（Messages API），接口与 LLMProvider 相同"""
+    
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None,
+                 max_tokens: int = ANTHROPIC_MAX_TOKENS):
+        """
+        Args:
+            api_key: API Key
+            model: 模型名称
+            base_url: API 地址（None 表示官方地址）
+            max_tokens: 每次回答的输出 token 上限
+        """
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self.max_tokens = max_tokens
+        
+        try:
+            from anthropic import Anthropic
+        except ImportError:
+            raise ImportError("请安装 anthropic 库：pip install anthropic")
+        
+        self.client = Anthropic(api_key=api_key, base_url=base_url, timeout=LLM_READ_TIMEOUT)
+    
+    def chat_stream(self, messages: list[dict], system_prompt: Optional[str] = None,
+                    cancel: Optional[CancelToken] = None) -> Iterator[str]:
+        """
+        流式对话（系统提示词走单独的 system 参数）
+        
+        Args:
+            cancel: 取消信号（可选），取消后在下一个片段处关闭 HTTP 流，不再计费
+        """
+        kwargs = {"system": system_prompt} if system_prompt else {}
+        try:
+            stream = self.client.messages.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                stream=True,
+                temperature=0.7,
+                **kwargs
+            )
+            try:
+                for event in stream:
+                    if cancel is not None and cancel.cancelled:
+                        break
+                    if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                        yield event.delta.text
+            finally:
+                _close_stream(stream)
+        
+        except Exception as e:
+            if cancel is not None and cancel.cancelled:
+                return
+            yield f"{LLM_ERROR_PREFIX}: {e}\n"
+
+
+class FakeLLMProvider:
+    """
+    确定性假 LLM（测试、离线回放用，接口与 LLMProvider 相同）
+    
+    等 ttft 秒后按 tokens_per_second 的速度逐块输出回答（每块 chunk_chars 个字符），
+    默认回答复述问题，便于校验回答和问题对应
+    """
+    
+    def __init__(self, ttft: float = 0.5, tokens_per_second: float = 40.0,
+                 answer: Optional[str] = None, chunk_chars: int = 4):
+        """
+        Args:
+            ttft: 首个片段之前的等待时间（秒）
+            tokens_per_second: 输出速度（每秒片段数）
+            answer: 固定回答（None 表示复述问题）
+            chunk_chars: 每个片段的字符数
+        """
+        self.model = "fake"
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.answer = answer
+        self.chunk_chars = max(1, chunk_chars)
+        self.calls = 0
+    
+    def chat_stream(self, messages: list[dict], system_prompt: Optional[str] = None,
+                    cancel: Optional[CancelToken] = None) -> Iterator[str]:
+        self.calls += 1
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        answer = self.answer or f"（模拟回答）关于「{question[-40:]}」，可以从背景、做法和结果三方面回答。"
+        cancel = cancel or CancelToken()
+        
+        if cancel.wait(self.ttft):
+            return
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for i in range(0, len(answer), self.chunk_chars):
+            if i and interval and cancel.wait(interval):
+                return
+            yield answer[i:i + self.chunk_chars]
+
+
+class LLMRaceProvider:
+    """
+    竞速：同一个请求同时发给多个提供商，用最先出字的那个，其余的立即取消（关闭 HTTP 流）
+    
+    报错（LLM_ERROR_PREFIX 开头）或没有任何输出的提供商不算出字，交给下一个；全部失败时输出最后一个错误。
+    选定之后只转发获胜者的片段，获胜者中途出错照常输出错误文本（与单个提供商一致）。
+    
+    stats() 记录每个提供商的参赛、获胜、失败次数和获胜时的首 token 耗时，用来决定竞速名单里留下谁
+    （输掉的提供商在出字前就被取消，拿不到它的首 token 耗时，所以只统计获胜的那次）
+    """
+    
+    LATENCY_WINDOW = 200  # 每个提供商保留最近多少次首 token 耗时
+    
+    def __init__(self, providers: dict):
+        """
+        Args:
+            providers: 名称 -> 提供商（LLMProvider、AnthropicProvider 或任何有 chat_stream 的对象）
+        """
+        if not providers:
+            raise ValueError("竞速至少需要一个提供商")
+        self.providers = dict(providers)
+        self.model = " / ".join(getattr(provider, "model", name) for name, provider in self.providers.items())
+        self.last_winner: Optional[str] = None
+        self._lock = threading.Lock()
+        self._ttfts = {name: deque(maxlen=self.LATENCY_WINDOW) for name in self.providers}
+        self._counters = {name: dict.fromkeys(("races", "wins", "failures"), 0) for name in self.providers}
+    
+    def chat_stream(self, messages: list[dict], system_prompt: Optional[str] = None,
+                    cancel: Optional[CancelToken] = None) -> Iterator[str]:
+        """
+        流式对话：每个提供商一个线程读取，片段汇总到一个队列，选出获胜者后只转发它的片段
         
+        Args:
+            cancel: 取消信号（可选），取消时关闭所有提供商的流
+        """
+        cancel = cancel or CancelToken()
+        events: queue.Queue = queue.Queue()  # (名称, 片段)，片段为 None 表示该提供商的流结束
+        tokens = {name: CancelToken() for name in self.providers}
+        start = time.monotonic()
+        for name, provider in self.providers.items():
+            cancel.on_cancel(tokens[name].cancel)
+            self._count(name, "races")
+            threading.Thread(
+                target=self._run, args=(name, provider, messages, system_prompt, tokens[name], events),
+                daemon=True, name=f"LLMRace-{name}"
+            ).start()
+        
+        winner, error = None, None
+        out = set()  # 已出局（报错、没有输出）的提供商
+        running = len(tokens)
+        try:
+            while running:
+                name, chunk = events.get()
+                if chunk is None:
+                    running -= 1
+                    if name == winner:
+                        return
+                    if winner is None and name not in out and not cancel.cancelled:
+                        out.add(name)
+                        self._count(name, "failures")
+                    continue
+                
+                if winner is None and name not in out:
+                    if chunk.startswith(LLM_ERROR_PREFIX):
+                        out.add(name)
+                        error = chunk
+                        self._count(name, "failures")
+                        continue
+                    winner = name
+                    self._record_win(name, time.monotonic() - start)
+                    for other, token in tokens.items():
+                        if other != name:
+                            token.cancel()
+                
+                if name == winner:
+                    yield chunk
+            
+            if winner is None and error is not None:
+                yield error
+        finally:
+            for token in tokens.values():
+                token.cancel()  # 调用方提前停止时获胜者也要关闭
+    
+    @staticmethod
+    def _run(name: str, provider, messages: list[dict], system_prompt: Optional[str],
+             token: CancelToken, events: queue.Queue):
+        """参赛线程：把一个提供商的片段放进队列，取消后停止"""
+        try:
+            for chunk in provider.chat_stream(messages, system_prompt, cancel=token):
+                if token.cancelled:
+                    break
+                events.put((name, chunk))
         except Exception as e:
-            yield f"\n❌ LLM 错误: {e}\n"
+            events.put((name, f"{LLM_ERROR_PREFIX}: {e}\n"))
+        finally:
+            events.put((name, None))
+    
+    def _record_win(self, name: str, ttft: float):
+        with self._lock:
+            self._counters[name]["wins"] += 1
+            self._ttfts[name].append(ttft)
+            self.last_winner = name
+    
+    def _count(self, name: str, counter: str):
+        with self._lock:
+            self._counters[name][counter] += 1
+    
+    def stats(self) -> dict:
+        """名称 -> 参赛 / 获胜 / 失败次数、胜率和获胜时首 token 耗时的 p50 / p95（秒）"""
+        with self._lock:
+            result = {}
+            for name, counters in self._counters.items():
+                stats = dict(counters)
+                stats["win_rate"] = stats["wins"] / stats["races"] if stats["races"] else 0.0
+                values = sorted(self._ttfts[name])
+                if values:
+                    stats["ttft_p50"] = percentile(values, 0.50)
+                    stats["ttft_p95"] = percentile(values, 0.95)
+                result[name] = stats
+        return result
+
+
+class AnswerStream:
+    """
+    一次提问的回答：迭代得到片段，cancel() 可在任何线程调用
+    
+    结束时（说完、被打断或调用方不再读取）把一问一答写入对话历史，只写一次；
+    没说完的回答保存已输出的部分并追加 INTERRUPTED_MARK，历史里的问答始终成对
+    """
+    
+    def __init__(self, assistant: 'LLMAssistant', question: str, chunks: Iterator[str], token: CancelToken,
+                 meta: Optional[AnswerMeta] = None):
+        self.assistant = assistant
+        self.question = question
+        self.token = token
+        self.meta = meta or AnswerMeta()
+        self._chunks = chunks
+        self._parts = []
+        self._complete = False  # 流正常结束
+        self._finished = False  # 已写入历史
+        self._lock = threading.Lock()
+    
+    def __iter__(self) -> Iterator[str]:
+        try:
+            # 逐片段不加锁（回答可能有几千个片段）：打断的瞬间最多有一个片段已输出但没写入历史
+            for chunk in self._chunks:
+                if self._finished:
+                    break  # 已被打断，之后的片段不再输出
+                self._parts.append(chunk)
+                yield chunk
+            else:
+                self._complete = not self.token.cancelled
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if close:
+                close()
+            self._finish()
+    
+    def cancel(self):
+        """打断：关闭底层流，已输出的部分立即写入历史"""
+        self.token.cancel()
+        self._finish()
+    
+    def close(self):
+        """停止读取（已说完则什么也不做；tracer.trace_stream 结束时调用）"""
+        if not self._complete:
+            self.cancel()
+    
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+    
+    @property
+    def interrupted(self) -> bool:
+        """已结束但没说完"""
+        return self._finished and not self._complete
+    
+    @property
+    def cached(self) -> bool:
+        """回答来自缓存（开始输出后有效）"""
+        return self.meta.cached
+    
+    @property
+    def prompt_tokens(self) -> int:
+        """这次请求的提示词大小（估算，开始输出后有效）"""
+        return self.meta.prompt_tokens
+    
+    def _finish(self):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            answer = "".join(self._parts)
+        if not self._complete:
+            answer += INTERRUPTED_MARK
+        self.assistant._finish_answer(self, answer)
 
 
 class LLMAssistant:
     """
     LLM 助手 - 管理对话历史和上下文
+    
+    同一时间只有一个回答在生成：ask() 先打断上一个（见 AnswerStream）
     """
     
-    def __init__(self, provider: LLMProvider, system_prompt: Optional[str] = None):
+    def __init__(
+        self,
+        provider: LLMProvider,
+        system_prompt: Optional[str] = None,
+        history_token_budget: int = LLM_HISTORY_TOKEN_BUDGET,
+        answer_cache: Optional[AnswerCache] = None
+    ):
         """
         初始化助手
         
         Args:
             provider: LLM 提供商实例
             system_prompt: 系统提示词
+            history_token_budget: 对话历史的 token 预算（超出部分压缩成摘要）
+            answer_cache: 回答缓存（可选，重复问题直接返回缓存的回答）
         """
         self.provider = provider
         self.system_prompt = system_prompt or self._default_system_prompt()
-        self.conversation_history = []
+        self.history = ConversationHistory(history_token_budget)
+        self.answer_cache = answer_cache
+        self.history_version = 0  # 历史每变化一次加一（预取据此判断上下文是否过期）
+        self._active: Optional[AnswerStream] = None  # 正在生成的回答
+        self._lock = threading.Lock()  # 保护 _active 和历史写入（回答线程、GUI 线程都会写）
     
     def _default_system_prompt(self) -> str:
         """默认系统提示词"""
@@ -89,56 +598,160 @@ class LLMAssistant:
 - 避免过于冗长的理论
 
 记住：你是在帮助用户准备面试回答，不是在写论文。"""
+
+    @property
+    def conversation_history(self) -> list[dict]:
+        """原样保留的最近对话（更早的部分在 self.history.summary 中）"""
+        return self.history.messages
     
     def add_user_message(self, content: str):
         """添加用户消息到历史"""
-        self.conversation_history.append({
-            "role": "user",
-            "content": content
-        })
+        self.history.append("user", content)
+        self.history_version += 1
     
     def add_assistant_message(self, content: str):
         """添加助手消息到历史"""
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": content
-        })
+        self.history.append("assistant", content)
+        self.history_version += 1
     
-    def chat_stream(self, question: str) -> Iterator[str]:
+    def _build_prompt(self, messages: list[dict]) -> tuple[str, list[dict], int]:
         """
-        流式对话
+        拼出实际发送的系统提示词（附带早期对话摘要）和消息列表，并估算提示词大小
+        
+        Returns:
+            (system_prompt, messages, prompt_tokens)
+        """
+        system_prompt = self.system_prompt
+        if self.history.summary_lines:
+            system_prompt += f"\n\n之前的对话要点：\n{self.history.summary}"
+        
+        prompt_tokens = estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS + sum(
+            estimate_message_tokens(message) for message in messages
+        )
+        return system_prompt, messages, prompt_tokens
+    
+    def _format_question(self, question: str) -> str:
+        return f"面试官问题：{question}"
+    
+    def _messages_for(self, question: str) -> list[dict]:
+        return self.conversation_history + [{"role": "user", "content": self._format_question(question)}]
+    
+    def stream_answer(self, question: str, cancel: Optional[CancelToken] = None,
+                      meta: Optional[AnswerMeta] = None) -> Iterator[str]:
+        """
+        流式获取回复，但不写入对话历史（用于预取）
+        
+        回复确定要用时交给 ask(question, chunks, cancel, meta)，结束时写入历史
         
         Args:
             question: 用户问题（面试官的提问）
+            cancel: 取消信号（可选）
+            meta: 开始生成时填写来源信息（可选）
         
         Yields:
             AI 回复的文本片段
         """
-        # 添加用户消息
-        self.add_user_message(f"面试官问题：{question}")
+        yield from self._generate(question, self._messages_for(question), cancel, meta)
+    
+    def record_exchange(self, question: str, answer: str):
+        """把一问一答写入对话历史"""
+        with self._lock:
+            self.add_user_message(self._format_question(question))
+            self.add_assistant_message(answer)
+    
+    def ask(self, question: str, chunks: Optional[Iterator[str]] = None,
+            cancel: Optional[CancelToken] = None, meta: Optional[AnswerMeta] = None) -> AnswerStream:
+        """
+        开始回答 question：还在生成的上一个回答先被打断（已输出的部分写入历史），再发出请求
         
-        # 流式获取回复
-        full_response = ""
-        for chunk in self.provider.chat_stream(
-            self.conversation_history,
-            self.system_prompt
-        ):
-            full_response += chunk
+        Args:
+            question: 用户问题（面试官的提问）
+            chunks: 已在生成的回答（预取），None 表示现场请求
+            cancel: chunks 对应的取消信号
+            meta: chunks 对应的来源信息
+        
+        Returns:
+            AnswerStream，迭代得到回复片段，结束时写入历史
+        """
+        self.cancel()
+        cancel = cancel or CancelToken()
+        meta = meta or AnswerMeta()
+        if chunks is None:
+            chunks = self._generate(question, self._messages_for(question), cancel, meta)
+        answer = AnswerStream(self, question, chunks, cancel, meta)
+        with self._lock:
+            self._active = answer
+        return answer
+    
+    def chat_stream(self, question: str) -> Iterator[str]:
+        """
+        流式对话（ask 的简写，不需要打断时使用）
+        
+        Args:
+            question: 用户问题（面试官的提问）
+        
+        Returns:
+            AI 回复片段的迭代器（提前停止迭代按打断处理）
+        """
+        return iter(self.ask(question))
+    
+    def cancel(self):
+        """打断正在生成的回答（新问题到来、退出时调用）"""
+        with self._lock:
+            answer, self._active = self._active, None
+        if answer is not None:
+            answer.cancel()
+    
+    def _finish_answer(self, answer: AnswerStream, text: str):
+        """AnswerStream 结束时调用：写入历史"""
+        with self._lock:
+            if self._active is answer:
+                self._active = None
+        self.record_exchange(answer.question, text)
+    
+    def _generate(self, question: str, messages: list[dict], cancel: Optional[CancelToken] = None,
+                  meta: Optional[AnswerMeta] = None) -> Iterator[str]:
+        """先查回答缓存，未命中再请求 LLM，完整成功的回答写入缓存（来源信息写入 meta）"""
+        meta = meta if meta is not None else AnswerMeta()
+        # 上一个问题：追问类的问题按它区分上下文
+        previous = next((message["content"] for message in reversed(messages[:-1]) if message["role"] == "user"), None)
+        cached = self.answer_cache.lookup(question, previous) if self.answer_cache is not None else None
+        meta.cached = cached is not None
+        if cached:
+            meta.prompt_tokens = 0
+            yield from self.answer_cache.stream(cached)
+            return
+        
+        system_prompt, messages, meta.prompt_tokens = self._build_prompt(messages)
+        if self.answer_cache is None:
+            yield from self.provider.chat_stream(messages, system_prompt, cancel=cancel)
+            return
+        
+        started = time.time()
+        chunks = []
+        for chunk in self.provider.chat_stream(messages, system_prompt, cancel=cancel):
+            chunks.append(chunk)
             yield chunk
+        if cancel is not None and cancel.cancelled:
+            return  # 没说完的回答不缓存
         
-        # 添加助手回复到历史
-        self.add_assistant_message(full_response)
+        answer = "".join(chunks)
+        if LLM_ERROR_PREFIX not in answer:
+            self.answer_cache.store(question, answer, time.time() - started, previous)
     
     def clear_history(self):
         """清空对话历史"""
-        self.conversation_history = []
+        self.history.clear()
+        self.history_version += 1
     
     def get_history_summary(self) -> str:
         """获取对话历史摘要"""
         if not self.conversation_history:
             return "（无对话历史）"
         
-        summary = f"共 {len(self.conversation_history)} 条消息\n"
+        summary = f"共 {len(self.conversation_history)} 条消息（约 {self.history.tokens} tokens）\n"
+        if self.history.compacted_turns:
+            summary += f"  更早的 {self.history.compacted_turns} 轮已压缩为摘要\n"
         for i, msg in enumerate(self.conversation_history[-6:], 1):  # 只显示最近6条
             role = "用户" if msg["role"] == "user" else "AI"
             content = msg["content"][:50] + "..." if len(msg["content"]) > 50 else msg["content"]
@@ -146,3 +759,55 @@ class LLMAssistant:
         
         return summary
 
+
+def _create_single_provider(spec: Union[str, dict]):
+    """按名称（qwen / openai / anthropic）或自定义接口字典创建一个提供商"""
+    if isinstance(spec, dict):
+        if spec.get("type", "openai") == "anthropic":
+            return AnthropicProvider(spec["api_key"], spec["model"], spec.get("base_url"))
+        return LLMProvider(spec["api_key"], spec["model"], spec["base_url"])
+    
+    if spec == "qwen":
+        if not QWEN_API_KEY:
+            raise ValueError("未配置 Qwen API Key")
+        return LLMProvider(api_key=QWEN_API_KEY, model=QWEN_MODEL, base_url=QWEN_BASE_URL)
+    if spec == "openai":
+        if OPENAI_API_KEY == "YOUR_OPENAI_API_KEY_HERE" or not OPENAI_API_KEY:
+            raise ValueError("未配置 OpenAI API Key（在 config.py 中设置 OPENAI_API_KEY）")
+        return LLMProvider(api_key=OPENAI_API_KEY, model=OPENAI_MODEL,
+                           base_url=OPENAI_BASE_URL or "https://api.openai.com/v1")
+    if spec == "anthropic":
+        if ANTHROPIC_API_KEY == "YOUR_ANTHROPIC_API_KEY_HERE" or not ANTHROPIC_API_KEY:
+            raise ValueError("未配置 Anthropic API Key（在 config.py 中设置 ANTHROPIC_API_KEY）")
+        return AnthropicProvider(api_key=ANTHROPIC_API_KEY, model=ANTHROPIC_MODEL, base_url=ANTHROPIC_BASE_URL)
+    raise ValueError(f"未知的 LLM 提供商: {spec}（支持: qwen, openai, anthropic）")
+
+
+def create_llm_provider(name: str = LLM_PROVIDER, race: Sequence[Union[str, dict]] = LLM_RACE_PROVIDERS):
+    """
+    按配置创建 LLM 提供商
+    
+    Args:
+        name: 提供商名称（qwen / openai / anthropic）
+        race: 竞速名单（名称或自定义接口字典），两个及以上时返回 LLMRaceProvider，
+              没配置好的跳过；只剩一个时直接返回它
+    
+    Raises:
+        ValueError: 未知的提供商、未配置 API Key
+        ImportError: 没有安装对应的 SDK
+    """
+    if len(race) < 2:
+        return _create_single_provider(name)
+    
+    providers = {}
+    for spec in race:
+        label = spec["name"] if isinstance(spec, dict) else spec
+        try:
+            providers[label] = _create_single_provider(spec)
+        except (ValueError, ImportError) as e:
+            print(f"⚠️  竞速提供商 {label} 不可用，跳过: {e}")
+    if not providers:
+        raise ValueError("竞速名单里没有可用的 LLM 提供商")
+    if len(providers) == 1:
+        return next(iter(providers.values()))
+    return LLMRaceProvider(providers)
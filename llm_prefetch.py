@@ -0,0 +1,167 @@
+"""
+LLM 预取
+职责：面试官一句话识别完就在后台开始生成回答，按下快捷键时直接展示已缓冲的内容
+
+- 只保留最新一个问题的预取，新问题到来时取消旧的（关闭 HTTP 流）
+- 预取不写对话历史；被取用后交给 LLMAssistant.ask，结束时写入（和手动提问效果一致，被打断也一样）
+- 对话历史在预取期间变了（比如刚问过别的问题），预取作废，改为现场请求
+- 预取请求失败（输出了 LLM_ERROR_PREFIX 错误提示）也作废：投机请求的偶发错误不展示给用户，改为现场请求
+"""
+
+import threading
+import time
+from typing import Iterator, Optional
+
+from llm import LLM_ERROR_PREFIX, AnswerMeta, AnswerStream, CancelToken, LLMAssistant
+from tracing import tracer
+
+
+class PrefetchedAnswer:
+    """一次预取：后台线程往里追加片段，取用方边等边读"""
+    
+    def __init__(self, question: str, history_version: int, trace_id: Optional[str] = None):
+        self.question = question
+        self.history_version = history_version
+        self.trace_id = trace_id
+        self.started = time.time()
+        self.first_chunk_at = None
+        self.chunks = []
+        self.meta = AnswerMeta()  # 这次预取的来源信息，取用后随 AnswerStream 交给调用方
+        self.done = False
+        self.cancelled = False
+        self.failed = False  # 输出了错误提示（提供商报错或读取异常），不能当回答用
+        self._cond = threading.Condition()
+        # 取消信号：预取被新问题取代，或取用后的回答被打断，都关闭底层流
+        self.token = CancelToken()
+        self.token.on_cancel(self._on_cancel)
+    
+    def append(self, chunk: str):
+        with self._cond:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.time()
+            if chunk.startswith(LLM_ERROR_PREFIX):
+                self.failed = True
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+    
+    def finish(self):
+        with self._cond:
+            self.done = True
+            self._cond.notify_all()
+    
+    def cancel(self):
+        self.token.cancel()
+    
+    def _on_cancel(self):
+        with self._cond:
+            self.cancelled = True
+            self.done = True
+            self._cond.notify_all()
+    
+    def stream(self) -> Iterator[str]:
+        """先吐出已缓冲的片段，再跟随后台线程继续输出，直到完成"""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.done:
+                    self._cond.wait()
+                if index >= len(self.chunks):
+                    return
+                pending = self.chunks[index:]
+                index = len(self.chunks)
+            yield from pending
+
+
+class LLMPrefetcher:
+    """
+    投机预取 LLM 回答
+    
+    用法：
+        prefetcher = LLMPrefetcher(llm_assistant)
+        recognizer.on_result_callback = prefetcher.on_result  # 面试官说完即预取
+        answer = prefetcher.take(question) or llm_assistant.ask(question)
+    """
+    
+    def __init__(self, assistant: LLMAssistant, sources: tuple = ('speaker',)):
+        """
+        Args:
+            assistant: LLM 助手
+            sources: 哪些来源的识别结果触发预取
+        """
+        self.assistant = assistant
+        self.sources = sources
+        self._current = None  # 最新的 PrefetchedAnswer
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "cancelled": 0, "failed": 0, "hits": 0, "misses": 0}
+    
+    def on_result(self, source: str, text: str, timestamp: float):
+        """识别结果回调（签名与 SpeechRecognizer.on_result_callback 一致）"""
+        if source in self.sources and text:
+            self.prefetch(text, tracer.latest(source))
+    
+    def prefetch(self, question: str, trace_id: Optional[str] = None):
+        """在后台开始为 question 生成回答，取消上一个预取（trace_id：问题所在语音的追踪 ID）"""
+        entry = PrefetchedAnswer(question, self.assistant.history_version, trace_id)
+        with self._lock:
+            self._cancel_locked()
+            self._current = entry
+            self._stats["started"] += 1
+        
+        thread = threading.Thread(target=self._run, args=(entry,), daemon=True, name="LLMPrefetch")
+        thread.start()
+    
+    def _run(self, entry: PrefetchedAnswer):
+        stream = tracer.trace_stream(entry.trace_id, self.assistant.stream_answer(entry.question, entry.token, entry.meta))
+        try:
+            for chunk in stream:
+                if entry.cancelled:
+                    break
+                entry.append(chunk)
+        except Exception as e:
+            entry.append(f"{LLM_ERROR_PREFIX}: {e}\n")
+        finally:
+            stream.close()
+            entry.finish()
+    
+    def take(self, question: str) -> Optional[AnswerStream]:
+        """
+        取用 question 的预取结果
+        
+        Returns:
+            AnswerStream（已缓冲的部分立即可读，会打断上一个回答）；没有可用预取（含已失败的）时返回 None，
+            调用方应改用 LLMAssistant.ask
+        """
+        with self._lock:
+            entry = self._current
+            if entry is not None and entry.failed:
+                self._current = None
+                self._stats["failed"] += 1
+            usable = (
+                entry is not None
+                and not entry.cancelled
+                and not entry.failed
+                and entry.question == question
+                and entry.history_version == self.assistant.history_version
+            )
+            if not usable:
+                self._stats["misses"] += 1
+                return None
+            self._current = None
+            self._stats["hits"] += 1
+        return self.assistant.ask(entry.question, entry.stream(), entry.token, entry.meta)
+    
+    def cancel(self):
+        """取消当前预取（退出时调用）"""
+        with self._lock:
+            self._cancel_locked()
+    
+    def _cancel_locked(self):
+        if self._current is not None and not self._current.done:
+            self._current.cancel()
+            self._stats["cancelled"] += 1
+        self._current = None
+    
+    def stats(self) -> dict:
+        """预取次数、取消次数、失败作废次数、命中/未命中次数"""
+        with self._lock:
+            return dict(self._stats)
@@ -9,35 +9,57 @@
 import sys
 import signal
 import time
-import queue
 import threading
+import concurrent.futures
+from typing import Optional
 
-from config import AUDIO_QUEUE_MAX_SIZE
-from config import TENCENT_SECRET_ID, TENCENT_SECRET_KEY, TENCENT_APP_ID
-from config import TENCENT_ENGINE_MODEL_TYPE, TENCENT_REGION
-from config import LLM_PROVIDER
-from config import QWEN_API_KEY, QWEN_MODEL, QWEN_BASE_URL
-from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL
-from config import ANTHROPIC_API_KEY, ANTHROPIC_MODEL
+from config import AUDIO_QUEUE_MAX_SIZE, SHOW_TIMING, PIPELINE_RUNTIME
+from config import LLM_PREFETCH, ANSWER_CACHE_ENABLED, SESSION_RECORD_ENABLED
 from audio_device import AudioDeviceManager
-from audio_capture import start_capture_thread
-from speech_recognizer import start_recognizer_thread
+from audio_capture import start_capture_threads
+from audio_scheduler import PriorityAudioQueue
+from speech_recognizer import SpeechRecognizer, start_recognizer_thread
+from async_pipeline import AsyncPriorityQueue, StopEvent, start_async_pipeline
+from session_recorder import start_session_recorder
 from keyboard_listener import start_keyboard_listener
-from asr_backend import TencentASR
-from llm import LLMProvider, LLMAssistant
+from asr_backend import create_asr_backend
+from llm import LLMAssistant, LLMRaceProvider, create_llm_provider
+from llm_prefetch import LLMPrefetcher
+from answer_cache import AnswerCache
+from tracing import tracer
+from transcript import Utterance
 
 
 class InterviewAssistant:
-    """面试辅助工具主类 - 协调各个模块"""
+    """
+    面试辅助工具主类 - 协调各个模块
     
-    def __init__(self):
-        self.stop_event = threading.Event()
+    ASR 后端、LLM 提供商和捕获设备都可以从外部注入（离线回放 replay.py 用文件设备 + 假后端），
+    不注入时按 config 创建 / 自动检测
+    
+    runtime（见 config.PIPELINE_RUNTIME）："threads" 每级一个线程，"asyncio" 捕获、识别调度和
+    LLM 流都在 async_pipeline 的事件循环线程里
+    """
+    
+    def __init__(self, asr_backend=None, llm_provider=None, speaker_device=None, microphone_device=None,
+                 runtime: str = PIPELINE_RUNTIME):
+        if runtime not in ("threads", "asyncio"):
+            raise ValueError(f"未知的运行时: {runtime}（支持: threads, asyncio）")
+        self.runtime = runtime
+        self.stop_event = StopEvent() if runtime == "asyncio" else threading.Event()
         self.audio_queue = None
+        self.pipeline = None  # asyncio 运行时（runtime == "asyncio"）
         self.threads = []
-        self.speaker_device = None
-        self.microphone_device = None
+        self.captures = []  # 各设备的捕获（stats() 查看丢帧）
+        self.asr_backend = asr_backend
+        self.llm_provider = llm_provider
+        self.speaker_device = speaker_device
+        self.microphone_device = microphone_device
         self.recognizer = None  # 语音识别器（用于获取最新识别结果）
         self.llm_assistant = None  # LLM 助手
+        self.prefetcher = None  # LLM 预取（LLM_PREFETCH 开启时）
+        self.recorder = None  # 会话录制（SESSION_RECORD_ENABLED 开启时）
+        self._answer_lock = threading.Lock()  # 同一时间只打印一个回答
     
     def setup_signal_handler(self):
         """注册信号处理器"""
@@ -56,7 +78,8 @@ class InterviewAssistant:
             True if successful, False otherwise
         """
         print("\n[1/3] 检测音频捕获设备...")
-        self.speaker_device, self.microphone_device = AudioDeviceManager.get_best_devices()
+        if self.speaker_device is None:
+            self.speaker_device, self.microphone_device = AudioDeviceManager.get_best_devices()
         
         if self.speaker_device is None:
             print("\n❌ 至少需要扬声器捕获设备才能运行")
@@ -73,35 +96,45 @@ class InterviewAssistant:
         """
         print("\n[2/3] 初始化语音识别...")
         
-        # 创建腾讯云 ASR
+        # 创建 ASR 后端（config.ASR_BACKEND，已注入则直接使用）
         try:
-            asr_backend = TencentASR(
-                secret_id=TENCENT_SECRET_ID,
-                secret_key=TENCENT_SECRET_KEY,
-                app_id=TENCENT_APP_ID,
-                engine_model_type=TENCENT_ENGINE_MODEL_TYPE,
-                region=TENCENT_REGION
-            )
+            asr_backend = self.asr_backend if self.asr_backend is not None else create_asr_backend()
         except Exception as e:
-            print(f"❌ 腾讯云 ASR 初始化失败: {e}")
+            print(f"❌ ASR 初始化失败: {e}")
             import traceback
             traceback.print_exc()
             return False
         
+        # 会话录制（写线程在识别线程之后 join，收尾时的识别结果也能落盘）
+        recorder_thread = None
+        if SESSION_RECORD_ENABLED:
+            recorder_thread, self.recorder = start_session_recorder(self.stop_event)
+        
+        if self.runtime == "asyncio":
+            # 识别器由事件循环驱动，start_capture 时和捕获一起启动
+            self.audio_queue = AsyncPriorityQueue(maxsize=AUDIO_QUEUE_MAX_SIZE)
+            self.recognizer = SpeechRecognizer(self.audio_queue, self.stop_event, asr_backend, recorder=self.recorder)
+            if recorder_thread is not None:
+                self.threads.append(recorder_thread)
+            return True
+        
         # 创建共享队列
-        self.audio_queue = queue.Queue(maxsize=AUDIO_QUEUE_MAX_SIZE)
+        self.audio_queue = PriorityAudioQueue(maxsize=AUDIO_QUEUE_MAX_SIZE)
         
         # 启动识别线程
         thread, recognizer = start_recognizer_thread(
             self.audio_queue,
             self.stop_event,
-            asr_backend
+            asr_backend,
+            recorder=self.recorder
         )
         
         if thread is None:
             return False
         
         self.threads.append(thread)
+        if recorder_thread is not None:
+            self.threads.append(recorder_thread)
         self.recognizer = recognizer  # 保存识别器引用
         return True
     
@@ -115,39 +148,35 @@ class InterviewAssistant:
         print("\n初始化 LLM 助手...")
         
         try:
-            # 根据配置选择 LLM 提供商
-            if LLM_PROVIDER == "qwen":
-                if not QWEN_API_KEY:
-                    print("⚠️  未配置 Qwen API Key，跳过 LLM 初始化")
+            # 根据配置选择 LLM 提供商（已注入则直接使用）
+            if self.llm_provider is not None:
+                provider = self.llm_provider
+                print(f"  使用 {type(provider).__name__}")
+            else:
+                try:
+                    provider = create_llm_provider()
+                except ValueError as e:
+                    print(f"⚠️  {e}，跳过 LLM 初始化")
                     return False
                 
-                provider = LLMProvider(
-                    api_key=QWEN_API_KEY,
-                    model=QWEN_MODEL,
-                    base_url=QWEN_BASE_URL
-                )
-                print(f"  使用 Qwen {QWEN_MODEL}")
-                print(f"  API 地址: {QWEN_BASE_URL}")
+                if isinstance(provider, LLMRaceProvider):
+                    print(f"  竞速: {', '.join(provider.providers)}（用最先出字的，其余取消）")
+                else:
+                    print(f"  使用 {type(provider).__name__} {provider.model}")
+                    if provider.base_url:
+                        print(f"  API 地址: {provider.base_url}")
             
-            elif LLM_PROVIDER == "openai":
-                if OPENAI_API_KEY == "YOUR_OPENAI_API_KEY_HERE" or not OPENAI_API_KEY:
-                    print("⚠️  未配置 OpenAI API Key，跳过 LLM 初始化")
-                    print("   在 config.py 中设置 OPENAI_API_KEY")
-                    return False
-                
-                provider = LLMProvider(
-                    api_key=OPENAI_API_KEY,
-                    model=OPENAI_MODEL,
-                    base_url=OPENAI_BASE_URL or "https://api.openai.com/v1"
-                )
-                print(f"  使用 OpenAI {OPENAI_MODEL}")
+            answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
+            if answer_cache is not None:
+                print(f"  回答缓存: {len(answer_cache)} 条")
+            self.llm_assistant = LLMAssistant(provider, answer_cache=answer_cache)
             
-            else:
-                print(f"❌ 未知的 LLM 提供商: {LLM_PROVIDER}")
-                print(f"   支持的提供商: qwen, openai")
-                return False
+            # 预取：面试官的话一识别完就开始生成回答
+            if LLM_PREFETCH and self.recognizer:
+                self.prefetcher = LLMPrefetcher(self.llm_assistant)
+                self.recognizer.on_result_callback = self.prefetcher.on_result
+                print("  已开启回答预取")
             
-            self.llm_assistant = LLMAssistant(provider)
             print("✓ LLM 助手初始化完成")
             return True
         
@@ -159,39 +188,61 @@ class InterviewAssistant:
         """启动音频捕获线程"""
         print("\n[3/3] 启动音频处理线程...")
         
-        # 启动扬声器捕获
-        speaker_thread = start_capture_thread(
+        # 流式模式：捕获线程直接把帧推给识别器
+        streamer = self.recognizer if self.recognizer.supports_streaming else None
+        devices = {'speaker': self.speaker_device, 'microphone': self.microphone_device}
+        
+        if self.runtime == "asyncio":
+            thread, self.pipeline = start_async_pipeline(
+                self.audio_queue, self.recognizer, devices, self.stop_event, streamer
+            )
+            self.captures = self.pipeline.captures
+            self.threads.insert(0, thread)  # 先于会话录制的写线程 join
+            return
+        
+        # 启动捕获（回调模式下所有设备共用一个 DSP 线程）
+        threads, self.captures = start_capture_threads(
             self.audio_queue,
-            self.speaker_device,
-            'speaker',
-            self.stop_event
+            devices,
+            self.stop_event,
+            streamer
         )
-        if speaker_thread:
-            self.threads.append(speaker_thread)
-        
-        # 启动麦克风捕获（如果可用）
-        if self.microphone_device is not None:
-            mic_thread = start_capture_thread(
-                self.audio_queue,
-                self.microphone_device,
-                'microphone',
-                self.stop_event
-            )
-            if mic_thread:
-                self.threads.append(mic_thread)
+        self.threads.extend(threads)
     
-    def on_ctrl_v_pressed(self):
-        """Ctrl+V 按下时的回调函数 - 发送问题给 AI"""
+    def on_ctrl_v_pressed(self, utterance: Optional[Utterance] = None):
+        """
+        Ctrl+V 按下时的回调函数 - 发送问题给 AI
+        
+        还在输出的上一个回答会被打断（已输出的部分写入对话历史）；
+        键盘监听经 _on_hotkey 在新线程里调用，回放脚本在交付识别结果时同样在新线程里调用
+        
+        Args:
+            utterance: 要回答的那一句（None 表示面试官最新的一句）
+        """
         if self.recognizer is None or self.llm_assistant is None:
             return
         
         # 获取最新的面试官问题
-        question = self.recognizer.last_speaker_text
+        if utterance is None:
+            utterance = self.recognizer.transcript.last('speaker')
         
-        if not question:
+        if utterance is None:
             print("\n⚠️  没有捕获到面试官的问题")
             return
-        
+        question = utterance.text
+        
+        # 有预取结果就直接用，否则现场请求（两者都会先打断上一个回答）
+        answer = self.prefetcher.take(question) if self.prefetcher else None
+        stream = answer
+        if answer is None:
+            answer = self.llm_assistant.ask(question)
+            stream = tracer.trace_stream(utterance.trace_id, answer)
+        
+        # 上一个回答打印完打断提示后再开始输出
+        with self._answer_lock:
+            self._print_answer(question, answer, stream)
+    
+    def _print_answer(self, question: str, answer, stream):
         # 显示 AI 回复
         print("\n" + "="*60)
         print(f"📝 面试官问题：{question}")
@@ -199,16 +250,40 @@ class InterviewAssistant:
         print("🤖 AI 建议：")
         
         try:
-            # 流式输出 AI 回复
-            for chunk in self.llm_assistant.chat_stream(question):
-                print(chunk, end='', flush=True)
+            # 流式输出 AI 回复（asyncio 运行时在事件循环里消费，停止时立即中断）
+            if self.pipeline is not None:
+                self.pipeline.submit(self._print_stream(stream)).result()
+            else:
+                for chunk in stream:
+                    print(chunk, end='', flush=True)
+            
+            if answer.interrupted:
+                print("\n\n⚠️  回答被新问题打断\n")
+                return
             print("\n" + "="*60 + "\n")
-        
-        except KeyboardInterrupt:
+            
+            if SHOW_TIMING and answer.cached:
+                print("  💾 回答来自缓存\n")
+            elif SHOW_TIMING:
+                history = self.llm_assistant.history
+                print(f"  📏 提示词约 {answer.prompt_tokens} tokens | "
+                      f"历史 {history.tokens}/{history.token_budget} tokens（已压缩 {history.compacted_turns} 轮）\n")
+        
+        except (KeyboardInterrupt, concurrent.futures.CancelledError):
+            answer.cancel()
             print("\n\n⚠️  AI 回复被中断\n")
         except Exception as e:
+            answer.cancel()
             print(f"\n\n❌ AI 回复失败: {e}\n")
     
+    def _on_hotkey(self):
+        """键盘监听回调：在新线程里回答，正在输出的回答不会挡住新的按键"""
+        threading.Thread(target=self.on_ctrl_v_pressed, daemon=True, name="LLMAnswer").start()
+    
+    async def _print_stream(self, stream):
+        async for chunk in self.pipeline.stream(stream):
+            print(chunk, end='', flush=True)
+    
     def print_status(self):
         """打印系统状态"""
         print("\n" + "="*60)
@@ -228,14 +303,20 @@ class InterviewAssistant:
     def wait_for_stop(self):
         """等待退出信号"""
         try:
-            while not self.stop_event.is_set():
-                time.sleep(0.5)
+            # 带超时的 wait：置位时立即返回，超时只是为了让主线程能响应 Ctrl+C
+            while not self.stop_event.wait(timeout=1.0):
+                pass
         except KeyboardInterrupt:
             print("\n收到键盘中断")
             self.stop_event.set()
     
     def cleanup(self):
         """清理资源，等待线程退出"""
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        if self.llm_assistant:
+            self.llm_assistant.cancel()
+        
         print("\n等待所有线程退出...")
         
         for thread in self.threads:
@@ -244,6 +325,54 @@ class InterviewAssistant:
                 print(f"⚠️  线程 {thread.name} 未能正常退出")
         
         print("✓ 所有线程已退出")
+        if self.llm_assistant and self.llm_assistant.answer_cache is not None:
+            self.llm_assistant.answer_cache.close()  # 回答线程已退出，写入还没保存的条目
+        
+        if self.recorder:
+            stats = self.recorder.stats()
+            print(f"  💾 会话已保存到 {stats['directory']}：{stats['recorded']} 句，音频 {stats['audio_seconds']:.0f}秒"
+                  + (f"，丢弃 {stats['dropped']} 句" if stats['dropped'] else ""))
+        
+        if SHOW_TIMING:
+            for capture in self.captures:
+                stats = capture.stats()
+                if stats["dropped"] is not None:
+                    print(f"  🎧 [{capture.source_type}] 捕获 {stats['frames']} 帧 | 缓冲区满丢弃 {stats['dropped']} 帧 | "
+                          f"声卡溢出 {stats['input_overflows']} 次 | 最大积压 {stats['max_backlog']} 帧")
+        
+        if SHOW_TIMING and self.recognizer:
+            for source, stats in self.recognizer.latency_stats().items():
+                print(f"  ⏱️  [{source}] 识别延迟 p50 {stats['p50']:.2f}秒 | p95 {stats['p95']:.2f}秒 | 共 {stats['count']} 条")
+            for source, stats in self.audio_queue.stats().items():
+                print(f"  📥 [{source}] 排队等待 p95 {stats.get('wait_p95', 0):.2f}秒 | "
+                      f"入队 {stats['enqueued']} 条 | 丢弃 {stats['dropped']} 条")
+            asr_stats = getattr(self.recognizer.asr_backend, "stats", None)
+            if asr_stats:
+                stats = asr_stats()
+                print(f"  🛡️  ASR 请求 {stats['calls']} 次 | 重试 {stats['retries']} | 对冲 {stats['hedges']}"
+                      f"（胜出 {stats['hedge_wins']}）| 超时 {stats['timeouts']} | 线程占满 {stats['saturated']} | 备用 {stats['fallbacks']} | "
+                      f"熔断 {stats['breaker_opened']} 次")
+            llm_stats = getattr(self.llm_assistant.provider, "stats", None) if self.llm_assistant else None
+            if llm_stats:
+                for name, stats in llm_stats().items():
+                    ttft = f" | 首 token p50 {stats['ttft_p50']:.2f}秒 p95 {stats['ttft_p95']:.2f}秒" if stats['wins'] else ""
+                    print(f"  🏁 [{name}] 竞速 {stats['races']} 次 | 胜出 {stats['wins']} 次（{stats['win_rate']:.0%}）| "
+                          f"失败 {stats['failures']} 次{ttft}")
+            if self.prefetcher:
+                stats = self.prefetcher.stats()
+                print(f"  ⚡ 预取 {stats['started']} 次 | 命中 {stats['hits']} 次 | 取消 {stats['cancelled']} 次 | "
+                      f"失败作废 {stats['failed']} 次")
+            if self.llm_assistant and self.llm_assistant.answer_cache is not None:
+                stats = self.llm_assistant.answer_cache.stats()
+                print(f"  💾 回答缓存命中率 {stats['hit_rate']:.0%}（{stats['exact_hits'] + stats['similar_hits']}/{stats['lookups']}）| "
+                      f"节省 LLM 时间 {stats['saved_seconds']:.1f}秒")
+        
+        if tracer.enabled:
+            tracer.print_summary()
+            count = tracer.export()
+            if count:
+                print(f"  🔍 {count} 段语音的追踪记录已写入 {tracer.path}")
+        
         print("\n程序结束")
     
     def run(self) -> int:
@@ -278,7 +407,7 @@ class InterviewAssistant:
         # 4. 启动键盘监听（如果 LLM 可用）
         if self.llm_assistant:
             keyboard_thread = start_keyboard_listener(
-                self.on_ctrl_v_pressed,
+                self._on_hotkey,
                 self.stop_event
             )
             if keyboard_thread:
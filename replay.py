@@ -0,0 +1,311 @@
+"""
+离线回放 - 用录好的 WAV 文件跑完整流水线
+职责：不需要声卡和云端账号，对延迟和识别效果做基准测试 / 回归测试
+
+WAV 文件作为捕获设备（audio_device.FileDeviceInfo）接入 main.InterviewAssistant，
+按 1 倍速或 N 倍速回放；ASR 和 LLM 默认用假后端（也可用 config 里配置的真实后端）。
+面试官每说完一句就模拟按一次 Ctrl+V（和键盘监听一样在新线程里回答，上一个回答还在输出时被打断）。
+结束后输出报告：
+- 各阶段延迟分位数（tracing.py）
+- 识别结果与参考文本的字错率（CER）和句数
+- 队列丢弃、ASR 容错统计
+
+用法：
+    python replay.py interview.wav [--mic answer.wav] [--speed 4] [--reference ref.txt] [--report report.json]
+
+参考文本每行一句面试官的话。使用假 ASR 时参考文本按顺序作为识别结果返回
+（此时 CER 衡量的是断句：句子被合并或拆开都会体现为差异）
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import unicodedata
+import wave
+from typing import Optional
+
+from config import PIPELINE_RUNTIME
+from audio_device import FileDeviceInfo
+from asr_backend import FakeASR, create_asr_backend
+from llm import FakeLLMProvider
+from main import InterviewAssistant
+from tracing import tracer
+
+
+def normalize_text(text: str) -> str:
+    """计算 CER 前的归一化：全角转半角、小写、去掉标点和空白"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return re.sub(r"[\W_]+", "", text)
+
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    """字符级编辑距离（两行滚动 DP）"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(
+                previous[j] + 1,  # 删除
+                current[j - 1] + 1,  # 插入
+                previous[j - 1] + (ref_char != hyp_char),  # 替换
+            ))
+        previous = current
+    return previous[-1]
+
+
+def accuracy_report(reference_lines: list, recognized: list) -> dict:
+    """
+    识别效果
+    
+    Returns:
+        {"reference_utterances", "recognized_utterances", "cer", "errors", "reference_chars"}
+    """
+    reference = normalize_text("".join(reference_lines))
+    hypothesis = normalize_text("".join(recognized))
+    errors = edit_distance(reference, hypothesis)
+    return {
+        "reference_utterances": len(reference_lines),
+        "recognized_utterances": len(recognized),
+        "reference_chars": len(reference),
+        "errors": errors,
+        "cer": errors / len(reference) if reference else 0.0,
+    }
+
+
+class ReplayRun:
+    """
+    一次回放
+    
+    用法：
+        run = ReplayRun(speaker_wav, speed=4.0)
+        report = run.run()
+    """
+    
+    def __init__(
+        self,
+        speaker_path: str,
+        microphone_path: Optional[str] = None,
+        speed: float = 1.0,
+        asr_backend=None,
+        llm_provider=None,
+        reference: Optional[list] = None,
+        ask: bool = True,
+        timeout: Optional[float] = None,
+        runtime: str = PIPELINE_RUNTIME
+    ):
+        """
+        Args:
+            speaker_path: 面试官音频（WAV，16bit PCM）
+            microphone_path: 自己的音频（可选）
+            speed: 回放倍速（1 = 实时，0 = 尽快读完）
+            asr_backend: ASR 后端（None 表示按 config 创建）
+            llm_provider: LLM 提供商（None 表示不启用 LLM）
+            reference: 面试官参考文本（每句一项，可选）
+            ask: 面试官每说完一句是否模拟按 Ctrl+V
+            timeout: 最长运行时间（秒，None 表示按音频时长自动估算）
+            runtime: 流水线运行时（"threads" / "asyncio"，见 config.PIPELINE_RUNTIME）
+        """
+        self.speaker = FileDeviceInfo.from_wav(speaker_path, speed=speed)
+        self.microphone = FileDeviceInfo.from_wav(microphone_path, speed=speed) if microphone_path else None
+        self.speed = speed
+        self.reference = reference
+        self.ask = ask
+        self.timeout = timeout
+        
+        self.assistant = InterviewAssistant(
+            asr_backend=asr_backend if asr_backend is not None else create_asr_backend(),
+            llm_provider=llm_provider,
+            speaker_device=self.speaker,
+            microphone_device=self.microphone,
+            runtime=runtime
+        )
+        self.results = []  # [(source, text, 相对开始的秒数)]
+        self._answers = []  # 每次「按 Ctrl+V」的回答线程
+        self._started = None
+    
+    def run(self) -> dict:
+        """回放到所有文件读完、队列清空、回答输出完为止，返回报告"""
+        tracer.enabled = True
+        assistant = self.assistant
+        assistant.setup_signal_handler()
+        
+        if not (assistant.detect_devices() and assistant.initialize_recognizer()):
+            raise RuntimeError("回放初始化失败")
+        if assistant.llm_provider is not None:
+            assistant.initialize_llm()
+        
+        # 假 ASR 按调用次数返回参考文本：长句切段会多调用几次，回放时整句识别
+        if isinstance(assistant.recognizer.asr_backend, FakeASR) and self.reference:
+            assistant.recognizer.segment_duration = 0
+        
+        # 在原回调（预取）之外收集识别结果
+        downstream = assistant.recognizer.on_result_callback
+        assistant.recognizer.on_result_callback = lambda source, text, ts: self._on_result(
+            source, text, downstream
+        )
+        
+        self._started = time.perf_counter()
+        assistant.start_capture()
+        self._wait_until_drained()
+        wall_seconds = time.perf_counter() - self._started
+        
+        assistant.stop_event.set()
+        assistant.cleanup()
+        return self._report(wall_seconds)
+    
+    def _on_result(self, source: str, text: str, downstream):
+        self.results.append((source, text, time.perf_counter() - self._started))
+        if downstream:
+            downstream(source, text, time.time())
+        if source == 'speaker' and self.ask and self.assistant.llm_assistant:
+            self._press(self.assistant.recognizer.transcript.last('speaker'))
+    
+    def _press(self, utterance):
+        """
+        模拟用户：面试官说完这一句就按 Ctrl+V
+        
+        和 _on_hotkey 一样在新线程里回答，问的就是刚交付的这一句（回调里 transcript 已经写入）；
+        上一个回答还在输出时被打断，而不是排队等它输出完
+        """
+        answer = threading.Thread(target=self.assistant.on_ctrl_v_pressed, args=(utterance,),
+                                  daemon=True, name="ReplayAnswer")
+        self._answers.append(answer)
+        answer.start()
+    
+    def _wait_until_drained(self):
+        """等文件读完（含结尾静音）→ 识别队列处理完 → 回答输出完"""
+        audio_seconds = self.audio_seconds
+        timeout = self.timeout or (audio_seconds / self.speed if self.speed > 0 else 0) + 120
+        deadline = time.perf_counter() + timeout
+        stop_event = self.assistant.stop_event
+        
+        for device in filter(None, (self.speaker, self.microphone)):
+            while not stop_event.is_set() and time.perf_counter() < deadline:
+                if device.stream is not None and device.stream.finished.wait(0.2):
+                    break
+        
+        # 等识别和回答（Ctrl+C 或超时不再等）
+        audio_queue = self.assistant.audio_queue
+        while audio_queue.unfinished_tasks and not stop_event.is_set() and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        for answer in list(self._answers):
+            while answer.is_alive() and not stop_event.is_set() and time.perf_counter() < deadline:
+                answer.join(0.2)
+        if time.perf_counter() >= deadline:
+            print(f"\n⚠️  回放超过 {timeout:.0f} 秒仍未结束，不再等待")
+    
+    @property
+    def audio_seconds(self) -> float:
+        return max(self._duration(device) for device in filter(None, (self.speaker, self.microphone)))
+    
+    @staticmethod
+    def _duration(device: FileDeviceInfo) -> float:
+        with wave.open(device.path, 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    
+    def _report(self, wall_seconds: float) -> dict:
+        recognizer = self.assistant.recognizer
+        report = {
+            "run": {
+                "speaker": self.speaker.path,
+                "microphone": self.microphone.path if self.microphone else None,
+                "speed": self.speed,
+                "audio_seconds": round(self.audio_seconds, 2),
+                "wall_seconds": round(wall_seconds, 2),
+                "asr": type(recognizer.asr_backend).__name__,
+                "llm": type(self.assistant.llm_provider).__name__ if self.assistant.llm_provider else None,
+            },
+            "latency_ms": tracer.summary(),
+            "queue": self.assistant.audio_queue.stats(),
+            "utterances": [
+                {"source": source, "text": text, "at": round(at, 2)} for source, text, at in self.results
+            ],
+        }
+        
+        asr_stats = getattr(recognizer.asr_backend, "stats", None)
+        if asr_stats:
+            report["asr_stats"] = asr_stats()
+        llm = self.assistant.llm_assistant
+        llm_stats = getattr(llm.provider, "stats", None) if llm else None
+        if llm_stats:
+            report["llm_stats"] = llm_stats()
+        if self.reference is not None:
+            speaker_texts = [text for source, text, _ in self.results if source == 'speaker']
+            report["accuracy"] = accuracy_report(self.reference, speaker_texts)
+        return report
+
+
+def print_report(report: dict):
+    """终端摘要（完整内容见 JSON 报告）"""
+    run = report["run"]
+    print("\n" + "=" * 60)
+    print(f"回放报告：{run['speaker']}（{run['speed']}x，ASR {run['asr']}，LLM {run['llm']}）")
+    print(f"  音频 {run['audio_seconds']:.1f}秒 | 用时 {run['wall_seconds']:.1f}秒 | "
+          f"识别 {len(report['utterances'])} 句")
+    
+    for name in ("speech_end_to_text", "speech_end_to_first_token"):
+        stats = report["latency_ms"].get(name)
+        if stats:
+            print(f"  {name}: p50 {stats['p50']:.0f}ms | p95 {stats['p95']:.0f}ms | 共 {stats['count']} 条")
+    
+    dropped = sum(stats["dropped"] for stats in report["queue"].values())
+    if dropped:
+        print(f"  ⚠️  识别队列丢弃 {dropped} 段语音")
+    
+    accuracy = report.get("accuracy")
+    if accuracy:
+        print(f"  CER {accuracy['cer']:.1%}（{accuracy['errors']}/{accuracy['reference_chars']} 字）| "
+              f"句数 {accuracy['recognized_utterances']}/{accuracy['reference_utterances']}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('speaker', help='面试官音频（WAV，16bit PCM）')
+    parser.add_argument('--mic', help='自己的音频（WAV，可选）')
+    parser.add_argument('--speed', type=float, default=1.0, help='回放倍速（1 = 实时，0 = 尽快读完）')
+    parser.add_argument('--reference', help='面试官参考文本（每行一句）')
+    parser.add_argument('--asr', choices=['fake', 'config'], default='fake', help='fake：假 ASR；config：按 config.py 创建')
+    parser.add_argument('--asr-delay', type=float, default=0.3, help='假 ASR 每句固定耗时（秒）')
+    parser.add_argument('--asr-per-second', type=float, default=0.05, help='假 ASR 每秒音频耗时（秒）')
+    parser.add_argument('--llm', choices=['fake', 'none'], default='fake', help='fake：假 LLM；none：不启用')
+    parser.add_argument('--llm-ttft', type=float, default=0.5, help='假 LLM 首 token 耗时（秒）')
+    parser.add_argument('--llm-tps', type=float, default=40.0, help='假 LLM 每秒输出片段数')
+    parser.add_argument('--runtime', choices=['threads', 'asyncio'], default=PIPELINE_RUNTIME,
+                        help='流水线运行时（默认 config.PIPELINE_RUNTIME）')
+    parser.add_argument('--no-ask', action='store_true', help='不模拟按 Ctrl+V')
+    parser.add_argument('--report', help='报告输出路径（JSON）')
+    parser.add_argument('--trace', help='逐句追踪记录输出路径（JSONL，默认 config.TRACE_PATH）')
+    args = parser.parse_args()
+    
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding='utf-8') as f:
+            reference = [line.strip() for line in f if line.strip()]
+    
+    if args.asr == 'fake':
+        if reference and args.mic:
+            print("⚠️  假 ASR 按调用顺序返回参考文本，同时回放麦克风时句子会错位")
+        asr_backend = FakeASR(transcripts=reference, delay=args.asr_delay, per_second=args.asr_per_second)
+    else:
+        asr_backend = create_asr_backend()
+    llm_provider = FakeLLMProvider(args.llm_ttft, args.llm_tps) if args.llm == 'fake' else None
+    if args.trace:
+        tracer.path = args.trace
+    
+    run = ReplayRun(args.speaker, args.mic, args.speed, asr_backend, llm_provider, reference, ask=not args.no_ask,
+                    runtime=args.runtime)
+    report = run.run()
+    print_report(report)
+    
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"报告已写入 {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,329 @@
+"""
+会话录制 - 把每句话的音频和识别文本存到磁盘，面试结束后可回顾、搜索、导出回放
+职责：识别结果交付时记录一条，后台线程写入内存映射的分段文件，不阻塞识别和捕获
+
+目录结构（每次启动一个子目录）：
+    sessions/20261017-101500/
+        session.json          采样率、位宽、分段容量等元数据
+        speaker-0000.pcm      面试官音频（16kHz int16 单声道，各句首尾相接）
+        microphone-0000.pcm   麦克风音频
+        index.jsonl           每行一句：ID、来源、文本、时刻、所在分段、字节偏移和长度
+
+- 写入：record() 只复制 PCM 并放入有界队列（满了丢弃并计数），写线程把音频拷进预分配的
+  mmap 分段，写满换下一个文件；一句话不跨分段
+- 读取：SessionArchive 只加载索引，音频按需用 np.memmap 映射，一小时的面试也不必整体读进内存
+- 流式识别模式没有整句音频，只记录文本
+
+命令行回顾：
+    python session_recorder.py sessions/20261017-101500                  # 列出全部
+    python session_recorder.py sessions/20261017-101500 --search 项目     # 搜索文本
+    python session_recorder.py sessions/20261017-101500 --export speaker.wav   # 导出给 replay.py 回放
+"""
+
+import argparse
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+import wave
+from dataclasses import dataclass, asdict
+from typing import Iterator, Optional
+
+import numpy as np
+
+from config import RATE, SESSION_RECORD_DIR, SESSION_SEGMENT_DURATION
+from audio_processor import AudioChunk, AudioProcessor
+from transcript import Utterance
+
+SAMPLE_WIDTH = 2  # int16
+QUEUE_SIZE = 256  # 等待写入的句数上限（写线程跟不上时新来的丢弃）
+
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    """索引里的一句"""
+    id: int
+    source: str
+    text: str
+    timestamp: float
+    spoken_at: Optional[float] = None
+    segment: Optional[str] = None  # 分段文件名（没有音频时为 None）
+    offset: int = 0  # 分段内的字节偏移
+    bytes: int = 0  # 音频字节数
+    
+    @property
+    def duration(self) -> float:
+        return self.bytes / SAMPLE_WIDTH / RATE
+
+
+class _Segment:
+    """一个预分配、内存映射的分段文件，只在末尾追加"""
+    
+    def __init__(self, path: str, size: int):
+        self.name = os.path.basename(path)
+        self.size = size
+        self.used = 0
+        self._file = open(path, "w+b")
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+    
+    def fits(self, length: int) -> bool:
+        return self.used + length <= self.size
+    
+    def write(self, data: bytes) -> int:
+        """追加并返回写入位置"""
+        offset = self.used
+        self._map[offset:offset + len(data)] = data
+        self.used += len(data)
+        return offset
+    
+    def close(self):
+        """刷盘并截掉没用到的预分配空间"""
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self.used)
+        self._file.close()
+
+
+class SessionRecorder:
+    """
+    会话录制器：record() 由识别线程调用（不阻塞），run() 在写线程里落盘
+    
+    stop_event 置位后写完队列里剩下的句子，关闭分段和索引
+    """
+    
+    def __init__(self, stop_event: threading.Event, directory: Optional[str] = None,
+                 segment_duration: float = SESSION_SEGMENT_DURATION):
+        self.stop_event = stop_event
+        self.directory = directory or os.path.join(SESSION_RECORD_DIR, time.strftime("%Y%m%d-%H%M%S"))
+        self.segment_bytes = int(segment_duration * RATE) * SAMPLE_WIDTH
+        self.recorded = 0
+        self.dropped = 0
+        self.audio_bytes = 0
+        
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._segments: dict[str, _Segment] = {}  # source -> 当前分段
+        self._segment_counts: dict[str, int] = {}
+        self._index = None
+        self._closed = False
+    
+    def record(self, utterance: Utterance, chunk: Optional[AudioChunk] = None):
+        """记录一句（识别线程调用）：复制音频后入队，队列满或已关闭则丢弃"""
+        if self._closed:
+            self.dropped += 1
+            return
+        pcm = None
+        if chunk is not None:
+            pcm = chunk.pcm if chunk.pcm is not None else AudioProcessor.to_pcm16(chunk.audio_data)
+            pcm = np.ascontiguousarray(pcm, dtype=np.int16).tobytes()  # 捕获的环形缓冲区之后会被覆盖
+            if chunk.overwritten():  # 复制完再检查：复制期间被覆盖的音频不写入
+                pcm = None
+        try:
+            self._queue.put_nowait((utterance, pcm))
+        except queue.Full:
+            self.dropped += 1
+    
+    def open(self):
+        """建目录、写元数据、打开索引（start_session_recorder 调用）"""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "session.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "started": time.time(),
+                "rate": RATE,
+                "sample_width": SAMPLE_WIDTH,
+                "channels": 1,
+                "segment_bytes": self.segment_bytes,
+            }, f, ensure_ascii=False, indent=2)
+        self._index = open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8")
+    
+    def run(self):
+        """写线程：直到停止且队列清空"""
+        try:
+            while True:
+                try:
+                    utterance, pcm = self._queue.get(timeout=0.2)
+                except queue.Empty:
+                    if self.stop_event.is_set():
+                        break
+                    continue
+                self._write(utterance, pcm)
+        finally:
+            self.close()
+    
+    def _write(self, utterance: Utterance, pcm: Optional[bytes]):
+        segment, offset = None, 0
+        if pcm:
+            segment = self._segment_for(utterance.source, len(pcm))
+            offset = segment.write(pcm)
+            self.audio_bytes += len(pcm)
+        
+        entry = ArchiveEntry(
+            id=utterance.id,
+            source=utterance.source,
+            text=utterance.text,
+            timestamp=utterance.timestamp,
+            spoken_at=utterance.spoken_at,
+            segment=segment.name if segment else None,
+            offset=offset,
+            bytes=len(pcm) if pcm else 0
+        )
+        self._index.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+        self._index.flush()  # 程序异常退出时已写的句子仍可读
+        self.recorded += 1
+    
+    def _segment_for(self, source: str, length: int) -> _Segment:
+        """当前分段放不下就关掉它、开下一个（超长的一句单独占一个更大的分段）"""
+        segment = self._segments.get(source)
+        if segment is not None and segment.fits(length):
+            return segment
+        if segment is not None:
+            segment.close()
+        
+        number = self._segment_counts.get(source, 0)
+        self._segment_counts[source] = number + 1
+        path = os.path.join(self.directory, f"{source}-{number:04d}.pcm")
+        segment = _Segment(path, max(self.segment_bytes, length))
+        self._segments[source] = segment
+        return segment
+    
+    def close(self):
+        self._closed = True
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+    
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "audio_seconds": self.audio_bytes / SAMPLE_WIDTH / RATE,
+        }
+
+
+def start_session_recorder(
+    stop_event: threading.Event,
+    directory: Optional[str] = None
+) -> tuple[threading.Thread, SessionRecorder]:
+    """
+    启动会话录制的写线程
+    
+    Args:
+        stop_event: 停止事件（置位后写完剩余数据再退出）
+        directory: 本次会话的目录（默认 SESSION_RECORD_DIR 下按启动时刻新建）
+    
+    Returns:
+        (thread, recorder) 线程对象和录制器（交给 start_recognizer_thread）
+    """
+    recorder = SessionRecorder(stop_event, directory)
+    recorder.open()
+    thread = threading.Thread(target=recorder.run, daemon=False, name="SessionRecorder")
+    thread.start()
+    print(f"✓ 会话录制已开启：{recorder.directory}")
+    return thread, recorder
+
+
+class SessionArchive:
+    """
+    读取录制好的会话：索引整体加载（每句一行，很小），音频按需内存映射
+    
+    同一分段只映射一次；返回的音频是映射上的只读视图
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "session.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.entries: list[ArchiveEntry] = []
+        with open(os.path.join(directory, "index.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self.entries.append(ArchiveEntry(**json.loads(line)))
+        self._by_id = {entry.id: entry for entry in self.entries}
+        self._maps: dict[str, np.memmap] = {}
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def __iter__(self) -> Iterator[ArchiveEntry]:
+        return iter(self.entries)
+    
+    def get(self, utterance_id: int) -> Optional[ArchiveEntry]:
+        return self._by_id.get(utterance_id)
+    
+    def search(self, keyword: str, source: Optional[str] = None) -> list[ArchiveEntry]:
+        """文本包含 keyword 的各句（不区分大小写）"""
+        keyword = keyword.lower()
+        return [
+            entry for entry in self.entries
+            if keyword in entry.text.lower() and (source is None or entry.source == source)
+        ]
+    
+    def audio(self, entry: ArchiveEntry) -> Optional[np.ndarray]:
+        """一句的 int16 PCM（没有音频返回 None）"""
+        if entry.segment is None:
+            return None
+        segment = self._maps.get(entry.segment)
+        if segment is None:
+            path = os.path.join(self.directory, entry.segment)
+            segment = np.memmap(path, dtype=np.int16, mode="r")
+            self._maps[entry.segment] = segment
+        start = entry.offset // SAMPLE_WIDTH
+        return segment[start:start + entry.bytes // SAMPLE_WIDTH]
+    
+    def export_wav(self, path: str, source: str = "speaker", gap: float = 2.0) -> int:
+        """
+        把某个来源的所有句子导出成一个 WAV（每句前后都有 gap 秒静音：自适应 VAD 开头要先估计底噪，句间静音让 replay.py 能重新断句）
+        
+        Returns:
+            导出的句数
+        """
+        silence = np.zeros(int(gap * RATE), dtype=np.int16).tobytes()
+        count = 0
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(self.meta.get("rate", RATE))
+            for entry in self.entries:
+                audio = self.audio(entry) if entry.source == source else None
+                if audio is None:
+                    continue
+                wav.writeframes(silence)
+                wav.writeframes(audio.tobytes())
+                count += 1
+            wav.writeframes(silence)
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回顾录制的面试会话")
+    parser.add_argument("directory", help="会话目录（sessions/ 下的子目录）")
+    parser.add_argument("--search", help="只列出包含该关键词的句子")
+    parser.add_argument("--source", choices=["speaker", "microphone"], help="只看某个来源")
+    parser.add_argument("--export", metavar="WAV", help="把该来源（默认 speaker）的音频导出为 WAV")
+    args = parser.parse_args()
+    
+    archive = SessionArchive(args.directory)
+    if args.export:
+        count = archive.export_wav(args.export, args.source or "speaker")
+        print(f"✓ 已导出 {count} 句到 {args.export}（可用 replay.py 回放）")
+        return
+    
+    entries = archive.search(args.search, args.source) if args.search else [
+        entry for entry in archive if args.source is None or entry.source == args.source
+    ]
+    for entry in entries:
+        speaker = "面试官" if entry.source == "speaker" else "我"
+        clock = time.strftime("%H:%M:%S", time.localtime(entry.timestamp))
+        duration = f"{entry.duration:5.1f}秒" if entry.bytes else "   无音频"
+        print(f"[{entry.id:>4}] {clock} {duration} {speaker}: {entry.text}")
+    print(f"\n共 {len(entries)} 句（会话共 {len(archive)} 句）")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,139 @@
 """
 语音识别 - 消费者线程
-职责：从队列取出音频，进行 ASR，输出结果
+职责：从队列取出音频，并发进行 ASR，按来源顺序输出结果
+
+两种调度方式共用识别和交付逻辑：
+- run()：调度线程 + worker 线程池（默认）
+- run_async()：asyncio 运行时里的 worker 协程（见 async_pipeline.py）
 """
 
+import asyncio
+import functools
 import queue
 import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 
-from config import MAX_CONSECUTIVE_ERRORS, SILENCE_THRESHOLD, DEBUG_MODE, SHOW_TIMING
+from config import (
+    MAX_CONSECUTIVE_ERRORS, DEBUG_MODE, SHOW_TIMING, ASR_WORKERS, RATE,
+    ASR_SEGMENT_DURATION, ASR_SEGMENT_SEARCH_WINDOW, ASR_SEGMENT_WORKERS, RING_BUFFER_DURATION
+)
 from audio_processor import AudioChunk, AudioProcessor
+from asr_backend import ASRBackend, supports_streaming
+from asr_resilience import CircuitOpenError
+from streaming_asr import DeferredSession
+from tracing import percentile, tracer
+from transcript import TranscriptStore
+
+
+@dataclass
+class RecognitionResult:
+    """一条待交付的识别结果"""
+    text: str
+    chunk: AudioChunk
+    started: float  # worker 开始处理的时刻
+    asr_elapsed: float
+    segments: int = 1  # 长语音切成了几段识别
 
 
 class SpeechRecognizer:
-    """语音识别器 - 消费者线程（使用腾讯云 ASR）"""
+    """
+    语音识别器 - 消费者线程（使用腾讯云 ASR）
+    
+    一个调度线程从队列取音频，交给 num_workers 个识别 worker 并发识别：
+    面试官的问题不会被排在前面的一长段麦克风语音堵住。
+    结果按来源重排序，同一来源的回调顺序与说话顺序一致。
+    超过 segment_duration 秒的长语音在停顿处切段，各段在独立的线程池里并发识别，
+    拼接成一条结果交付
+    """
+    
+    LATENCY_WINDOW = 200  # 延迟统计保留最近多少条
     
     def __init__(
         self,
         audio_queue: queue.Queue,
         stop_event: threading.Event,
-        asr_backend,
-        on_result_callback=None
+        asr_backend: ASRBackend,
+        on_result_callback=None,
+        on_partial_callback=None,
+        num_workers: int = ASR_WORKERS,
+        segment_duration: float = ASR_SEGMENT_DURATION,
+        segment_workers: int = ASR_SEGMENT_WORKERS,
+        transcript: Optional[TranscriptStore] = None,
+        recorder=None
     ):
         self.audio_queue = audio_queue
         self.stop_event = stop_event
         self.asr_backend = asr_backend
-        self.consecutive_errors = 0
-        self.on_result_callback = on_result_callback  # GUI 回调函数
+        self.num_workers = max(1, num_workers)
+        self.consecutive_errors = 0  # 多个 worker / 读线程会更新，用 _error_lock 保护
+        self._error_lock = threading.Lock()
+        self.on_result_callback = on_result_callback  # GUI 回调函数（最终结果）
+        self.on_partial_callback = on_partial_callback  # 中间结果回调（仅流式模式）
+        
+        # 全部识别结果（GUI / 命令行从这里取面试官的问题）
+        self.transcript = transcript if transcript is not None else TranscriptStore()
+        self.recorder = recorder  # 会话录制（可选，见 session_recorder.py）
         
-        # 缓存最新的识别结果
-        self.last_speaker_text = ""  # 面试官最后说的话
-        self.last_speaker_timestamp = 0  # 时间戳
+        # 流式识别会话：source -> StreamingSession（每个 source 只有自己的捕获线程访问）
+        self._sessions = {}
+        self._stream_end_times = {}  # source -> 语音结束时刻（用于统计出字延迟）
+        
+        # worker 池调度状态
+        self._slots = threading.Semaphore(self.num_workers)  # 空闲 worker 数
+        self._next_submit = {}  # source -> 下一个分配的序号（只有调度线程访问）
+        self._next_deliver = {}  # source -> 下一个应交付的序号
+        self._pending = {}  # source -> {序号: 结果}，等待前序结果
+        self._ready = {}  # source -> deque[结果]，已按序排好、等待交付
+        self._delivering = set()  # 正在交付的 source（同一来源同时只有一个线程在交付）
+        self._order_lock = threading.Lock()  # 只保护上面的状态，回调不在锁内执行
+        self._latencies = {}  # source -> deque[入队到交付的秒数]
+        
+        # 长语音切段识别：独立线程池（worker 在里面等各段结果，共用一个池会互相等死）
+        self.segment_duration = segment_duration
+        self._segment_executor = ThreadPoolExecutor(
+            max_workers=max(1, segment_workers), thread_name_prefix="ASRSegment"
+        )
     
     def run(self):
-        """消费者线程主循环"""
-        print("消费者线程启动，等待音频数据...")
+        """
+        消费者线程主循环 - 调度器
+        
+        只在有空闲 worker 时才从队列取数据：积压留在 audio_queue 里，
+        队列仍然是唯一的背压点（满了由捕获线程决定丢什么）
+        """
+        print(f"消费者线程启动，等待音频数据...（识别并发数: {self.num_workers}）")
+        
+        executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="ASRWorker")
         
         while not self.stop_event.is_set():
             try:
+                # 等待空闲 worker
+                if not self._slots.acquire(timeout=0.5):
+                    continue
+                
                 # 阻塞等待队列数据
                 try:
                     chunk = self.audio_queue.get(timeout=0.5)
                 except queue.Empty:
+                    self._slots.release()
                     continue
                 
                 # 验证数据类型
                 if not isinstance(chunk, AudioChunk):
                     print("⚠️  收到非法数据类型")
                     self.audio_queue.task_done()
+                    self._slots.release()
                     continue
+                tracer.mark(chunk.trace_id, "dequeued")
                 
-                # 处理音频
-                self._process_chunk(chunk)
-                self.audio_queue.task_done()
+                # 分配来源内序号，交给 worker
+                seq = self._next_submit.get(chunk.source, 0)
+                self._next_submit[chunk.source] = seq + 1
+                executor.submit(self._process_sequenced, chunk, seq)
             
             except Exception as e:
                 if not self.stop_event.is_set():
@@ -60,97 +142,422 @@ class SpeechRecognizer:
                     traceback.print_exc()
                 break
         
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._segment_executor.shutdown(wait=False, cancel_futures=True)
+        self.close_streams()
         print("✓ 消费者线程已退出")
     
+    def _process_sequenced(self, chunk: AudioChunk, seq: int):
+        """worker：识别一个音频块，按来源内顺序交付结果"""
+        try:
+            result = self._recognize(chunk)
+            self._deliver_in_order(chunk.source, seq, result)
+        except Exception as e:
+            print(f"❌ 识别 worker 异常: {e}")
+            self._deliver_in_order(chunk.source, seq, None)
+        finally:
+            self.audio_queue.task_done()
+            self._slots.release()
+    
+    async def run_async(self, executor):
+        """
+        asyncio 运行时的调度：num_workers 个 worker 协程从 audio_queue（AsyncPriorityQueue）取数据
+        
+        与 run() 相同，积压留在队列里、同一来源按顺序交付；被取消（停止）时立即退出，
+        不需要轮询停止事件
+        
+        Args:
+            executor: 执行阻塞后端调用的线程池
+        """
+        print(f"消费者协程启动，等待音频数据...（识别并发数: {self.num_workers}）")
+        workers = [asyncio.ensure_future(self._worker_async(executor)) for _ in range(self.num_workers)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._segment_executor.shutdown(wait=False, cancel_futures=True)
+            self.close_streams()
+            print("✓ 消费者协程已退出")
+    
+    async def _worker_async(self, executor):
+        while True:
+            chunk = await self.audio_queue.get()
+            try:
+                if not isinstance(chunk, AudioChunk):
+                    print("⚠️  收到非法数据类型")
+                    continue
+                tracer.mark(chunk.trace_id, "dequeued")
+                
+                # 取出顺序就是序号顺序（事件循环单线程，get 按等待先后唤醒）
+                seq = self._next_submit.get(chunk.source, 0)
+                self._next_submit[chunk.source] = seq + 1
+                try:
+                    result = await self._recognize_async(chunk, executor)
+                except Exception as e:
+                    print(f"❌ 识别 worker 异常: {e}")
+                    result = None
+                self._deliver_in_order(chunk.source, seq, result)
+            finally:
+                self.audio_queue.task_done()
+    
+    def _deliver_in_order(self, source: str, seq: int, result):
+        """
+        按来源重排序交付
+        
+        同一来源的后一句可能先识别完，先放进 pending，
+        等前面的序号都到齐再依次移进 ready；不同来源互不等待。
+        锁内只挪结果，回调（打印、GUI、LLM 预取）在锁外执行：
+        该来源没有线程在交付时由本线程交付，否则留给正在交付的线程顺带交付，顺序不变
+        """
+        with self._order_lock:
+            pending = self._pending.setdefault(source, {})
+            pending[seq] = result
+            ready = self._ready.setdefault(source, deque())
+            
+            next_seq = self._next_deliver.get(source, 0)
+            while next_seq in pending:
+                item = pending.pop(next_seq)
+                if item is not None:
+                    ready.append(item)
+                next_seq += 1
+            self._next_deliver[source] = next_seq
+            
+            if source in self._delivering:
+                return
+            self._delivering.add(source)
+        
+        while True:
+            with self._order_lock:
+                if not ready:
+                    self._delivering.discard(source)
+                    return
+                item = ready.popleft()
+            try:
+                self._deliver(source, item)
+            except Exception as e:
+                print(f"❌ 交付识别结果异常: {e}")
+    
     def _process_chunk(self, chunk: AudioChunk):
+        """同步处理单个音频块（识别 + 交付，不经过 worker 池）"""
+        result = self._recognize(chunk)
+        if result is not None:
+            self._deliver(chunk.source, result)
+    
+    def _recognize(self, chunk: AudioChunk) -> Optional[RecognitionResult]:
         """
-        处理单个音频块
+        识别单个音频块
         
         流程：
-        1. 验证音频数据
-        2. 检查是否为静音
-        3. 调用 ASR 模型
-        4. 输出结果
+        1. 验证音频数据（是否有人声已由捕获线程的 VAD 判断）
+        2. 调用 ASR 模型
+        
+        Returns:
+            识别结果，无文本或失败时返回 None
         """
-        total_start = time.time()
+        start = time.time()
+        segments = self._plan(chunk)
+        if segments is None:
+            return None
         
-        audio_data = chunk.audio_data
-        source = chunk.source
+        # 进行语音识别（使用后端）
+        try:
+            asr_start = time.time()
+            tracer.mark(chunk.trace_id, "asr_start")
+            if len(segments) == 1:
+                text = self.asr_backend.recognize(chunk.audio_data, pcm=chunk.pcm)
+            else:
+                text = self._recognize_segments(chunk, segments)
+        except Exception as e:
+            self._on_asr_error(chunk, e)
+            return None
+        return self._finish(chunk, text, start, asr_start, len(segments))
+    
+    async def _recognize_async(self, chunk: AudioChunk, executor) -> Optional[RecognitionResult]:
+        """
+        _recognize 的协程版：阻塞的后端调用放进 executor，事件循环等待结果
         
-        # 设置显示标签
-        label = "🔊 面试官" if source == 'speaker' else "🎙️  我"
+        长语音各段也提交到同一个 executor 并发识别：等待的是协程而不是线程，
+        不会像线程版那样需要单独的切段线程池来避免互相等死
+        """
+        start = time.time()
+        segments = self._plan(chunk)
+        if segments is None:
+            return None
         
+        loop = asyncio.get_running_loop()
+        try:
+            asr_start = time.time()
+            tracer.mark(chunk.trace_id, "asr_start")
+            texts = await asyncio.gather(*(
+                loop.run_in_executor(executor, functools.partial(
+                    self.asr_backend.recognize,
+                    chunk.audio_data[begin:end],
+                    pcm=None if chunk.pcm is None else chunk.pcm[begin:end]
+                ))
+                for begin, end in segments
+            ))
+        except Exception as e:
+            self._on_asr_error(chunk, e)
+            return None
+        text = texts[0] if len(texts) == 1 else self._stitch(texts)
+        return self._finish(chunk, text, start, asr_start, len(segments))
+    
+    @staticmethod
+    def _label(source: str) -> str:
+        return "🔊 面试官" if source == 'speaker' else "🎙️  我"
+    
+    def _plan(self, chunk: AudioChunk) -> Optional[list]:
+        """验证音频并决定怎么切段，返回 [(起, 止)]；音频无效返回 None"""
+        label = self._label(chunk.source)
         if DEBUG_MODE:
-            queue_delay = total_start - chunk.timestamp
+            queue_delay = time.time() - chunk.timestamp
             print(f"[{label}] 从队列取出音频，队列延迟: {queue_delay:.3f}秒，音频时长: {chunk.duration:.2f}秒")
         
+        if self._check_overwritten(chunk):
+            return None
+        
         # 验证音频数据
-        if not AudioProcessor.validate_audio(audio_data):
+        if not AudioProcessor.validate_audio(chunk.audio_data):
             print(f"⚠️  [{label}] 音频数据无效")
-            return
+            return None
         
-        # 检查静音
-        if AudioProcessor.is_silent(audio_data, SILENCE_THRESHOLD):
-            if DEBUG_MODE:
-                print(f"[{label}] 音频为静音，跳过识别")
+        # 长语音在停顿处切段
+        if self.segment_duration and chunk.duration > self.segment_duration:
+            return AudioProcessor.split_at_pauses(
+                chunk.audio_data, RATE, self.segment_duration, ASR_SEGMENT_SEARCH_WINDOW
+            )
+        return [(0, len(chunk.audio_data))]
+    
+    def _check_overwritten(self, chunk: AudioChunk) -> bool:
+        """音频视图已被环形缓冲区覆盖（队列积压超过缓冲区容量）则丢弃本句并警告"""
+        if not chunk.overwritten():
+            return False
+        print(f"⚠️  [{self._label(chunk.source)}] 音频在队列里积压太久，已被环形缓冲区覆盖"
+              f"（容量 {RING_BUFFER_DURATION} 秒），丢弃本句")
+        return True
+    
+    def _on_asr_error(self, chunk: AudioChunk, error: Exception):
+        label = self._label(chunk.source)
+        if isinstance(error, CircuitOpenError):
+            # 熔断期间放弃这一句，等主后端恢复，不停止识别线程
+            print(f"⚠️  [{label}] {error}，跳过本句")
+        else:
+            self._record_error(label, error)
+    
+    def _finish(self, chunk: AudioChunk, text: Optional[str], start: float, asr_start: float,
+                segments: int) -> Optional[RecognitionResult]:
+        """后端返回后：记录耗时和追踪，没有文本返回 None"""
+        asr_elapsed = time.time() - asr_start
+        tracer.mark(chunk.trace_id, "asr_end")
+        tracer.annotate(chunk.trace_id, segments=segments)
+        
+        self._reset_errors()
+        if not text or self._check_overwritten(chunk):  # 识别期间被覆盖：结果不可信
+            return None
+        
+        if DEBUG_MODE and segments > 1:
+            print(f"[{self._label(chunk.source)}] 长语音切成 {segments} 段并发识别")
+        return RecognitionResult(text, chunk, start, asr_elapsed, segments)
+    
+    def _recognize_segments(self, chunk: AudioChunk, segments: list) -> Optional[str]:
+        """
+        各段并发识别，按原顺序拼接（切片是零拷贝视图）
+        
+        任意一段抛异常则整句失败（和不切段时一样计入连续错误）
+        """
+        futures = [
+            self._segment_executor.submit(
+                self.asr_backend.recognize,
+                chunk.audio_data[begin:end],
+                pcm=None if chunk.pcm is None else chunk.pcm[begin:end]
+            )
+            for begin, end in segments
+        ]
+        return self._stitch([future.result() for future in futures])
+    
+    @staticmethod
+    def _stitch(texts: list) -> Optional[str]:
+        """拼接各段文本：中文直接相连，两边都是英文/数字时补一个空格"""
+        stitched = ""
+        for text in texts:
+            text = (text or "").strip()
+            if not text:
+                continue
+            if stitched and stitched[-1].isascii() and stitched[-1].isalnum() \
+                    and text[0].isascii() and text[0].isalnum():
+                stitched += " "
+            stitched += text
+        return stitched or None
+    
+    def _deliver(self, source: str, result: RecognitionResult):
+        """交付一条识别结果并记录延迟"""
+        self._emit_result(source, result.text, result.chunk.trace_id, result.chunk.timestamp, result.chunk)
+        
+        now = time.time()
+        with self._order_lock:
+            self._latencies.setdefault(source, deque(maxlen=self.LATENCY_WINDOW)).append(
+                now - result.chunk.timestamp
+            )
+        
+        # 显示性能统计
+        if SHOW_TIMING:
+            total_elapsed = now - result.started
+            segments = f"（{result.segments} 段并发）" if result.segments > 1 else ""
+            print(f"  ⏱️  ASR耗时: {result.asr_elapsed:.2f}秒{segments} | 总耗时: {total_elapsed:.2f}秒 | 音频时长: {result.chunk.duration:.2f}秒")
+    
+    def latency_stats(self) -> dict:
+        """
+        各来源「入队 → 结果交付」延迟统计（最近 LATENCY_WINDOW 条）
+        
+        Returns:
+            {source: {"count": n, "p50": 秒, "p95": 秒, "max": 秒}}
+        """
+        stats = {}
+        with self._order_lock:
+            snapshot = {source: sorted(values) for source, values in self._latencies.items()}
+        
+        for source, values in snapshot.items():
+            if not values:
+                continue
+            stats[source] = {
+                "count": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "max": values[-1],
+            }
+        return stats
+    
+    def _reset_errors(self):
+        with self._error_lock:
+            self.consecutive_errors = 0
+    
+    def _record_error(self, label: str, error: Exception):
+        """记录识别失败，连续失败过多则停止"""
+        with self._error_lock:
+            self.consecutive_errors += 1
+            errors = self.consecutive_errors
+        print(f"❌ [{label}] 识别失败 ({errors}/{MAX_CONSECUTIVE_ERRORS}): {error}")
+        
+        if errors >= MAX_CONSECUTIVE_ERRORS:
+            print(f"❌ 连续失败{MAX_CONSECUTIVE_ERRORS}次，消费者线程退出")
+            self.stop_event.set()
+    
+    def _emit_result(self, source: str, text: str, trace_id: Optional[str] = None,
+                     spoken_at: Optional[float] = None, chunk: Optional[AudioChunk] = None):
+        """
+        输出最终识别结果
+        
+        一句话识别和流式识别共用这一个出口：打印、写入对话记录和会话录制、回调 GUI
+        （流式识别没有整句音频，chunk 为 None）
+        """
+        tracer.mark(trace_id, "delivered")  # 先于回调：回调里的 LLM 预取用 tracer.latest 找到这条记录
+        
+        # 先于回调写入：回调里读 transcript 一定能看到这一句
+        utterance = self.transcript.append(source, text, spoken_at=spoken_at, trace_id=trace_id)
+        if self.recorder is not None:
+            self.recorder.record(utterance, chunk)
+        if source == 'speaker':
+            print(f"面试官说: {text}")
+        else:
+            print(f"我说: {text}")
+        
+        # 调用 GUI 回调（如果有）
+        if self.on_result_callback:
+            try:
+                self.on_result_callback(source, text, time.time())
+            except Exception as e:
+                print(f"⚠️  回调函数错误: {e}")
+    
+    @property
+    def last_speaker_text(self) -> str:
+        """面试官最后说的话（没有则为空串）"""
+        utterance = self.transcript.last('speaker')
+        return utterance.text if utterance else ""
+    
+    # ============ 流式识别：捕获线程逐帧推送 ============
+    
+    @property
+    def supports_streaming(self) -> bool:
+        """后端支持流式识别时，捕获线程应把帧直接推给识别器（begin/feed/end_stream）"""
+        return supports_streaming(self.asr_backend)
+    
+    def begin_stream(self, source: str, trace_id: Optional[str] = None):
+        """检测到语音开始：为该 source 建立流式识别会话"""
+        self.end_stream(source)  # 防御：上一段会话未结束则先结束
+        
+        # 建连在连接线程里进行（最长 CONNECT_TIMEOUT 秒），捕获线程 / 事件循环不等待，期间的帧先缓存
+        label = "🔊 面试官" if source == 'speaker' else "🎙️  我"
+        self._sessions[source] = DeferredSession(
+            lambda: self.asr_backend.open_session(
+                lambda text, is_final: self._on_stream_result(source, text, is_final, trace_id)
+            ),
+            on_error=lambda e: self._record_error(label, e)
+        )
+    
+    def feed_stream(self, source: str, pcm: bytes):
+        """推送一帧 16kHz int16 PCM"""
+        session = self._sessions.get(source)
+        if session is None:
             return
         
-        # 进行语音识别（使用后端）
         try:
-            asr_start = time.time()
-            
-            # 调用 ASR 后端
-            text = self.asr_backend.recognize(audio_data)
-            
-            asr_elapsed = time.time() - asr_start
-            
-            # 输出结果
-            if text:
-                total_elapsed = time.time() - total_start
-                
-                # 根据来源显示
-                if source == 'speaker':
-                    print(f"面试官说: {text}")
-                    # 缓存面试官的话（用于 AI 回复）
-                    self.last_speaker_text = text
-                    self.last_speaker_timestamp = time.time()
-                    
-                    # 调用 GUI 回调（如果有）
-                    if self.on_result_callback:
-                        try:
-                            self.on_result_callback('speaker', text, time.time())
-                        except Exception as e:
-                            print(f"⚠️  回调函数错误: {e}")
-                else:
-                    print(f"我说: {text}")
-                    
-                    # 调用 GUI 回调（如果有）
-                    if self.on_result_callback:
-                        try:
-                            self.on_result_callback('microphone', text, time.time())
-                        except Exception as e:
-                            print(f"⚠️  回调函数错误: {e}")
-                
-                # 显示性能统计
-                if SHOW_TIMING:
-                    print(f"  ⏱️  ASR耗时: {asr_elapsed:.2f}秒 | 总耗时: {total_elapsed:.2f}秒 | 音频时长: {chunk.duration:.2f}秒")
-                
-                self.consecutive_errors = 0
+            session.send(pcm)
+        except Exception as e:
+            print(f"⚠️  流式推送失败: {e}")
+            self._sessions.pop(source, None)
+            session.close()
+    
+    def end_stream(self, source: str):
+        """检测到语音结束：通知服务端，最终结果异步回调"""
+        session = self._sessions.pop(source, None)
+        if session is None:
+            return
         
+        self._stream_end_times[source] = time.time()
+        try:
+            session.finish()
         except Exception as e:
-            self.consecutive_errors += 1
-            print(f"❌ [{label}] 识别失败 ({self.consecutive_errors}/{MAX_CONSECUTIVE_ERRORS}): {e}")
-            
-            if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS:
-                print(f"❌ 连续失败{MAX_CONSECUTIVE_ERRORS}次，消费者线程退出")
-                self.stop_event.set()
+            print(f"⚠️  流式结束信号发送失败: {e}")
+            session.close()
+    
+    def _on_stream_result(self, source: str, text: str, is_final: bool, trace_id: Optional[str] = None):
+        """流式结果回调（在会话读线程中调用）"""
+        if not is_final:
+            if DEBUG_MODE:
+                print(f"  … {text}")
+            if self.on_partial_callback:
+                try:
+                    self.on_partial_callback(source, text, time.time())
+                except Exception as e:
+                    print(f"⚠️  回调函数错误: {e}")
+            return
+        
+        self._emit_result(source, text, trace_id, self._stream_end_times.get(source))
+        self._reset_errors()
+        
+        if SHOW_TIMING:
+            end_time = self._stream_end_times.pop(source, None)
+            if end_time is not None:
+                print(f"  ⏱️  语音结束到出结果: {time.time() - end_time:.2f}秒")
+    
+    def close_streams(self):
+        """关闭所有未结束的流式会话"""
+        for source in list(self._sessions):
+            session = self._sessions.pop(source, None)
+            if session is not None:
+                session.close()
 
 
 def start_recognizer_thread(
     audio_queue: queue.Queue,
     stop_event: threading.Event,
     asr_backend,
-    on_result_callback=None
+    on_result_callback=None,
+    on_partial_callback=None,
+    num_workers: int = ASR_WORKERS,
+    transcript: Optional[TranscriptStore] = None,
+    recorder=None
 ) -> tuple[threading.Thread, SpeechRecognizer]:
     """
     启动语音识别线程的工厂函数
@@ -158,13 +565,20 @@ def start_recognizer_thread(
     Args:
         audio_queue: 音频队列
         stop_event: 停止事件
-        asr_backend: 腾讯云 ASR 实例
+        asr_backend: ASR 后端（见 asr_backend.create_asr_backend）
         on_result_callback: 识别结果回调函数 (source, text, timestamp)
+        on_partial_callback: 中间结果回调函数 (source, text, timestamp)，仅流式模式
+        num_workers: 并发识别 worker 数
+        transcript: 识别结果写入的对话记录（默认新建，GUI 传入自己读取的那一份）
+        recorder: 会话录制器（见 session_recorder.start_session_recorder，None 不录制）
     
     Returns:
         (thread, recognizer) 线程对象和识别器对象
     """
-    recognizer = SpeechRecognizer(audio_queue, stop_event, asr_backend, on_result_callback)
+    recognizer = SpeechRecognizer(
+        audio_queue, stop_event, asr_backend, on_result_callback, on_partial_callback, num_workers,
+        transcript=transcript, recorder=recorder
+    )
     
     # 启动线程
     thread = threading.Thread(
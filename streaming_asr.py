@@ -0,0 +1,328 @@
+"""
+腾讯云实时语音识别（流式）后端
+职责：通过 WebSocket 边说边识别，输出中间结果和最终结果
+
+与一句话识别的区别：
+- 一句话识别：说完 → 静音 0.8 秒 → 整段上传 → 等待结果
+- 流式识别：每 100ms 推送一帧，说话过程中服务端就在识别，
+  说完时只剩最后一小段需要处理
+
+建连（WebSocket 握手，最长 CONNECT_TIMEOUT 秒）不在捕获线程 / 事件循环里做：
+DeferredSession 在连接线程里 open_session，建连期间推送的帧先缓存，连上后按顺序补发
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+from urllib.parse import quote, urlencode, urlparse
+
+
+# 结果回调：(text, is_final)
+StreamResultCallback = Callable[[str, bool], None]
+
+
+class StreamingSession:
+    """
+    一次流式识别会话 = 一段语音（一个 WebSocket 连接）
+    
+    发送端（捕获线程）调用 send/finish，
+    接收端（内部读线程）解析结果并回调
+    """
+    
+    END_MESSAGE = json.dumps({"type": "end"})
+    
+    def __init__(self, ws, on_result: StreamResultCallback):
+        self._ws = ws
+        self._on_result = on_result
+        self._sentences = {}  # 句子序号 -> 文本（服务端 VAD 可能把一段语音切成多句）
+        self._final_sent = False
+        self._closed = False
+        
+        self._reader = threading.Thread(
+            target=self._read_loop,
+            daemon=True,
+            name="StreamingASRReader"
+        )
+        self._reader.start()
+    
+    @property
+    def text(self) -> str:
+        """当前累计的识别文本"""
+        return "".join(self._sentences[i] for i in sorted(self._sentences))
+    
+    def send(self, pcm: bytes):
+        """推送一帧 16kHz 16bit 单声道 PCM"""
+        if self._closed:
+            return
+        self._ws.send_binary(pcm)
+    
+    def finish(self):
+        """通知服务端音频结束，最终结果由读线程回调"""
+        if self._closed:
+            return
+        self._ws.send(self.END_MESSAGE)
+    
+    def close(self):
+        """立即关闭连接（不等待最终结果）"""
+        self._closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+    
+    def join(self, timeout: Optional[float] = None):
+        """等待读线程退出"""
+        self._reader.join(timeout)
+    
+    def _read_loop(self):
+        """读线程：解析服务端推送的 JSON 结果"""
+        try:
+            while True:
+                message = self._ws.recv()
+                if not message:
+                    break
+                
+                data = json.loads(message)
+                if data.get("code", 0) != 0:
+                    print(f"❌ 流式识别错误: {data.get('code')} {data.get('message')}")
+                    break
+                
+                result = data.get("result")
+                if result:
+                    self._sentences[result.get("index", 0)] = result.get("voice_text_str", "")
+                    self._deliver(self.text, False)
+                
+                if data.get("final") == 1:
+                    break
+        
+        except Exception as e:
+            if not self._closed:
+                print(f"⚠️  流式识别连接中断: {e}")
+        
+        finally:
+            # 无论正常结束还是连接中断，已识别的文本都作为最终结果交付
+            self._deliver_final()
+            self.close()
+    
+    def _deliver(self, text: str, is_final: bool):
+        try:
+            self._on_result(text, is_final)
+        except Exception as e:
+            print(f"⚠️  流式结果回调错误: {e}")
+    
+    def _deliver_final(self):
+        if self._final_sent:
+            return
+        self._final_sent = True
+        
+        text = self.text.strip()
+        if text:
+            self._deliver(text, True)
+
+
+class DeferredSession:
+    """
+    建连不阻塞调用方的会话：open_session 在连接线程里执行，接口与 StreamingSession 相同
+    
+    建连期间 send 的帧先缓存（最多 CONNECT_TIMEOUT 秒的音频），连上后由连接线程按顺序补发，
+    补发完才切换为直接发送，帧序不会乱；建连期间调用的 finish / close 在补发之后生效。
+    建连失败时丢弃缓存并调用 on_error
+    """
+    
+    def __init__(self, open_session: Callable[[], StreamingSession],
+                 on_error: Optional[Callable[[Exception], None]] = None):
+        """
+        Args:
+            open_session: 建立会话的函数（阻塞，在连接线程里调用）
+            on_error: 建连失败回调（在连接线程里调用）
+        """
+        self._open_session = open_session
+        self._on_error = on_error
+        self._session: Optional[StreamingSession] = None
+        self._buffer = []  # 建连期间的帧
+        self._finish_requested = False
+        self._closed = False
+        self._lock = threading.Lock()
+        
+        self._connector = threading.Thread(target=self._connect, daemon=True, name="StreamingASRConnect")
+        self._connector.start()
+    
+    @property
+    def connected(self) -> bool:
+        return self._session is not None
+    
+    def send(self, pcm: bytes):
+        with self._lock:
+            if self._closed:
+                return
+            if self._session is None:
+                self._buffer.append(pcm)
+                return
+            session = self._session
+        session.send(pcm)
+    
+    def finish(self):
+        with self._lock:
+            if self._closed:
+                return
+            if self._session is None:
+                self._finish_requested = True
+                return
+            session = self._session
+        session.finish()
+    
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._buffer.clear()
+            session = self._session
+        if session is not None:
+            session.close()
+    
+    def join(self, timeout: Optional[float] = None):
+        """等待建连和读线程退出"""
+        self._connector.join(timeout)
+        if self._session is not None:
+            self._session.join(timeout)
+    
+    def _connect(self):
+        """连接线程：建连，补发缓存的帧，再切换为直接发送"""
+        try:
+            session = self._open_session()
+        except Exception as e:
+            with self._lock:
+                self._closed = True
+                self._buffer.clear()
+            if self._on_error is not None:
+                self._on_error(e)
+            return
+        
+        finish = False
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        break
+                    frames, self._buffer = self._buffer, []
+                    if not frames:
+                        # 缓存已补发完：之后的帧由调用方直接发送
+                        self._session = session
+                        finish = self._finish_requested
+                        break
+                for pcm in frames:
+                    session.send(pcm)
+            
+            if self._closed:
+                session.close()
+            elif finish:
+                session.finish()
+        except Exception as e:
+            print(f"⚠️  流式补发失败: {e}")
+            self.close()
+            session.close()
+
+
+class TencentStreamingASR:
+    """
+    腾讯云实时语音识别后端
+    
+    协议：wss://asr.cloud.tencent.com/asr/v2/<appid>?<签名参数>
+    - 客户端：二进制帧推送 PCM，结束时发送 {"type": "end"}
+    - 服务端：JSON 推送 result.voice_text_str，final=1 表示结束
+    
+    url 可以指向本地 WebSocket 替身服务器（ws://127.0.0.1:xxxx/asr/v2/），
+    方便在没有网络和密钥的环境下测试
+    """
+    
+    SIGNATURE_EXPIRE = 24 * 3600  # 签名有效期（秒）
+    CONNECT_TIMEOUT = 5  # 建连超时（秒）
+    RESULT_TIMEOUT = 10  # 等待结果超时（秒），超时视为连接中断
+    
+    def __init__(self, secret_id: str, secret_key: str, app_id: str,
+                 engine_model_type: str = "16k_zh",
+                 url: str = "wss://asr.cloud.tencent.com/asr/v2/"):
+        """
+        初始化流式识别后端
+        
+        Args:
+            secret_id: 腾讯云 SecretId
+            secret_key: 腾讯云 SecretKey
+            app_id: 腾讯云 AppId
+            engine_model_type: 引擎模型类型
+            url: WebSocket 服务地址（不含 AppId）
+        """
+        print("初始化腾讯云流式 ASR...")
+        
+        if not secret_id or not secret_key or not app_id:
+            raise ValueError(
+                "请在 config.py 中配置腾讯云 SecretId / SecretKey / AppId！\n"
+                "获取地址: https://console.cloud.tencent.com/cam/capi"
+            )
+        
+        # 条件导入：只在使用流式识别时才需要 websocket-client
+        try:
+            import websocket
+        except ImportError:
+            raise ImportError(
+                "请先安装 WebSocket 客户端:\n"
+                "pip install websocket-client"
+            )
+        
+        self._websocket = websocket
+        self.secret_id = secret_id
+        self.secret_key = secret_key
+        self.app_id = app_id
+        self.engine_model_type = engine_model_type
+        self.url = url.rstrip("/") + "/" + app_id
+        
+        print(f"  地址: {self.url}")
+        print(f"  模型: {engine_model_type}")
+        print("✓ 腾讯云流式 ASR 初始化完成")
+    
+    def _signed_url(self) -> str:
+        """
+        生成带签名的连接地址
+        
+        签名原文：host + path + ? + 按 key 排序的参数（不做 URL 编码）
+        签名算法：Base64(HmacSHA1(SecretKey, 签名原文))
+        """
+        now = int(time.time())
+        params = {
+            "secretid": self.secret_id,
+            "timestamp": now,
+            "expired": now + self.SIGNATURE_EXPIRE,
+            "nonce": random.randint(1, 10**9),
+            "engine_model_type": self.engine_model_type,
+            "voice_id": uuid.uuid4().hex,
+            "voice_format": 1,  # 1 = PCM
+            "needvad": 1,
+        }
+        query = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        
+        parsed = urlparse(self.url)
+        sign_source = f"{parsed.netloc}{parsed.path}?{query}"
+        digest = hmac.new(self.secret_key.encode(), sign_source.encode(), hashlib.sha1).digest()
+        signature = base64.b64encode(digest).decode()
+        
+        return f"{self.url}?{urlencode(sorted(params.items()))}&signature={quote(signature, safe='')}"
+    
+    def open_session(self, on_result: StreamResultCallback) -> StreamingSession:
+        """
+        为一段语音建立识别会话
+        
+        Args:
+            on_result: 结果回调 (text, is_final)，在读线程中调用
+        """
+        ws = self._websocket.create_connection(self._signed_url(), timeout=self.CONNECT_TIMEOUT)
+        ws.settimeout(self.RESULT_TIMEOUT)
+        return StreamingSession(ws, on_result)
+    
+    def close(self):
+        """释放资源（连接随会话关闭，这里无需处理）"""
+        pass
@@ -0,0 +1,318 @@
+"""
+腾讯云 API 客户端（TC3-HMAC-SHA256 签名 + 长连接池）
+职责：把每次识别的开销压到「在已建好的 TLS 连接上发一个请求」
+
+- 连接池：HTTP/1.1 keep-alive，识别 worker 之间复用连接
+- 预热：启动时提前完成 DNS + TCP + TLS 握手
+- 心跳：监听期间定时在空闲连接上发一个轻量请求，防止服务端关闭空闲连接；
+  连接已失效则立即重连，保证下一句话到来时连接是热的
+"""
+
+import hashlib
+import hmac
+import http.client
+import json
+import ssl
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import urlparse
+
+
+class TencentCloudError(Exception):
+    """腾讯云 API 返回的错误"""
+    
+    def __init__(self, code: str, message: str, request_id: str = ""):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.request_id = request_id
+
+
+class HTTPSConnectionPool:
+    """
+    固定主机的 keep-alive 连接池（线程安全）
+    
+    空闲连接后进先出：最近用过的连接最可能还活着
+    """
+    
+    # 复用的连接可能已被服务端关闭，这些异常说明需要换新连接重试一次
+    STALE_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+    
+    def __init__(self, url: str, size: int = 2, timeout: float = 10.0,
+                 context: Optional[ssl.SSLContext] = None):
+        """
+        Args:
+            url: 服务地址（https://host[:port]，http:// 仅用于本地测试）
+            size: 最多保留多少条空闲连接
+            timeout: 连接和读取超时（秒）
+            context: TLS 配置（默认系统证书校验）
+        """
+        parsed = urlparse(url if "://" in url else f"https://{url}")
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.size = size
+        self.timeout = timeout
+        self.context = context or ssl.create_default_context()
+        
+        self._idle = []  # [(连接, 上次使用时刻)]
+        self._closed = False  # close() 之后归还的连接直接关闭（超时后仍在后台运行的请求）
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "reused": 0, "stale": 0}
+    
+    @property
+    def host_header(self) -> str:
+        default_port = 443 if self.scheme == "https" else 80
+        if self.port and self.port != default_port:
+            return f"{self.host}:{self.port}"
+        return self.host
+    
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            conn = http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.context)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        with self._lock:
+            self.stats["created"] += 1
+        return conn
+    
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """取一条连接，返回 (连接, 是否为复用的连接)"""
+        with self._lock:
+            if self._idle:
+                self.stats["reused"] += 1
+                return self._idle.pop()[0], True
+        return self._new_connection(), False
+    
+    def _release(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if not self._closed and conn.sock is not None and len(self._idle) < self.size:
+                self._idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+    
+    def request(self, method: str, path: str, body: bytes = None, headers: dict = None) -> tuple[int, bytes]:
+        """
+        发送请求并读完响应
+        
+        Returns:
+            (状态码, 响应体)
+        """
+        conn, reused = self._acquire()
+        try:
+            try:
+                return self._send(conn, method, path, body, headers)
+            except self.STALE_ERRORS:
+                if not reused:
+                    raise
+                # 空闲连接已被服务端关闭：换一条新连接重试一次（请求还没被处理，重试是安全的）
+                conn.close()
+                with self._lock:
+                    self.stats["stale"] += 1
+                conn = self._new_connection()
+                return self._send(conn, method, path, body, headers)
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            self._release(conn)
+    
+    def _send(self, conn, method, path, body, headers) -> tuple[int, bytes]:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        if response.will_close:
+            conn.close()
+        return response.status, data
+    
+    def prewarm(self, count: int = None):
+        """提前建立 count 条连接（DNS + TCP + TLS 握手），失败时静默（第一次请求会再试）"""
+        with self._lock:
+            missing = (self.size if count is None else count) - len(self._idle)
+        for _ in range(max(0, missing)):
+            conn = self._new_connection()
+            try:
+                conn.connect()
+            except OSError:
+                conn.close()
+                return
+            self._release(conn)
+    
+    def heartbeat(self, max_idle: float):
+        """
+        给空闲超过 max_idle 秒的连接发一个 HEAD 请求保活，失效的连接丢掉后补齐
+        
+        只动当时空闲的连接，不影响正在识别的请求
+        """
+        now = time.monotonic()
+        with self._lock:
+            stale = [item for item in self._idle if now - item[1] >= max_idle]
+            self._idle = [item for item in self._idle if now - item[1] < max_idle]
+        
+        for conn, _ in stale:
+            try:
+                self._send(conn, "HEAD", "/", None, {"Host": self.host_header})
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                continue
+            self._release(conn)
+        
+        self.prewarm()
+    
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+class TencentCloudClient:
+    """
+    腾讯云 API 3.0 客户端（只实现 JSON POST + TC3-HMAC-SHA256 签名）
+    
+    用法：
+        client = TencentCloudClient(secret_id, secret_key, "asr", "2019-06-14", "ap-shanghai")
+        result = client.call("SentenceRecognition", {...})
+    """
+    
+    ALGORITHM = "TC3-HMAC-SHA256"
+    CONTENT_TYPE = "application/json; charset=utf-8"
+    
+    def __init__(self, secret_id: str, secret_key: str, service: str, version: str, region: str,
+                 endpoint: Optional[str] = None, pool_size: int = 2, timeout: float = 10.0,
+                 context: Optional[ssl.SSLContext] = None):
+        """
+        Args:
+            secret_id / secret_key: 腾讯云 API 密钥
+            service: 服务名（如 asr）
+            version: 接口版本（如 2019-06-14）
+            region: 地域
+            endpoint: 服务地址（默认 https://{service}.tencentcloudapi.com，可指向本地替身服务器）
+            pool_size: 连接池大小（建议等于并发识别 worker 数）
+            timeout: 超时（秒）
+            context: TLS 配置（本地替身服务器用自签名证书时传入）
+        """
+        self.secret_id = secret_id
+        self.secret_key = secret_key
+        self.service = service
+        self.version = version
+        self.region = region
+        self.pool = HTTPSConnectionPool(
+            endpoint or f"https://{service}.tencentcloudapi.com",
+            size=pool_size, timeout=timeout, context=context
+        )
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread = None
+    
+    def call(self, action: str, params: dict, raw_fields: Optional[dict] = None) -> dict:
+        """
+        调用接口
+        
+        Args:
+            action: 接口名
+            params: 请求参数（JSON 序列化）
+            raw_fields: 已经是 JSON 字符串安全字节的字段（如 Base64 编码的音频），
+                        原样拼进请求体，大字段不用再经过 str 解码和 json.dumps 复制
+        
+        Returns:
+            Response 字段（已去掉外层）
+        
+        Raises:
+            TencentCloudError: 接口返回错误
+            OSError / http.client.HTTPException: 网络错误
+        """
+        payload = self._encode_payload(params, raw_fields or {})
+        status, body = self.pool.request("POST", "/", body=payload, headers=self._headers(action, payload))
+        
+        try:
+            response = json.loads(body)["Response"]
+        except (ValueError, KeyError):
+            raise TencentCloudError("InvalidResponse", f"HTTP {status}: {body[:200]!r}")
+        
+        error = response.get("Error")
+        if error:
+            raise TencentCloudError(error.get("Code", ""), error.get("Message", ""), response.get("RequestId", ""))
+        return response
+    
+    @staticmethod
+    def _encode_payload(params: dict, raw_fields: dict) -> bytes:
+        """{params..., "字段": "原始字节"...}，只在最后拼接时复制一次大字段"""
+        head = json.dumps(params, ensure_ascii=False).encode("utf-8")
+        if not raw_fields:
+            return head
+        
+        parts = [head[:-1]]  # 去掉结尾的 }
+        separator = b", " if params else b""
+        for name, value in raw_fields.items():
+            parts += [separator, json.dumps(name).encode("utf-8"), b': "', value, b'"']
+            separator = b", "
+        parts.append(b"}")
+        return b"".join(parts)
+    
+    def _headers(self, action: str, payload: bytes) -> dict:
+        """TC3-HMAC-SHA256 签名（https://cloud.tencent.com/document/api/1093/35641）"""
+        timestamp = int(time.time())
+        date = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+        host = self.pool.host_header
+        
+        canonical_request = "\n".join([
+            "POST", "/", "",
+            f"content-type:{self.CONTENT_TYPE}\nhost:{host}\n",
+            "content-type;host",
+            hashlib.sha256(payload).hexdigest(),
+        ])
+        scope = f"{date}/{self.service}/tc3_request"
+        string_to_sign = "\n".join([
+            self.ALGORITHM, str(timestamp), scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        
+        key = self._hmac(f"TC3{self.secret_key}".encode("utf-8"), date)
+        key = self._hmac(key, self.service)
+        key = self._hmac(key, "tc3_request")
+        signature = hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        
+        return {
+            "Authorization": (
+                f"{self.ALGORITHM} Credential={self.secret_id}/{scope}, "
+                f"SignedHeaders=content-type;host, Signature={signature}"
+            ),
+            "Content-Type": self.CONTENT_TYPE,
+            "Host": host,
+            "X-TC-Action": action,
+            "X-TC-Timestamp": str(timestamp),
+            "X-TC-Version": self.version,
+            "X-TC-Region": self.region,
+        }
+    
+    @staticmethod
+    def _hmac(key: bytes, msg: str) -> bytes:
+        return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+    
+    # ============ 预热 / 心跳 ============
+    
+    def prewarm(self):
+        """提前建好连接池里的连接"""
+        self.pool.prewarm()
+    
+    def start_heartbeat(self, interval: float):
+        """后台定时保活（interval 秒一次），close() 时停止"""
+        if self._heartbeat_thread is not None or interval <= 0:
+            return
+        
+        def loop():
+            while not self._heartbeat_stop.wait(interval):
+                self.pool.heartbeat(max_idle=interval)
+        
+        self._heartbeat_thread = threading.Thread(target=loop, daemon=True, name="TencentHeartbeat")
+        self._heartbeat_thread.start()
+    
+    def close(self):
+        self._heartbeat_stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join(timeout=2)
+        self.pool.close()
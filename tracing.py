@@ -0,0 +1,247 @@
+"""
+端到端延迟追踪
+职责：每段语音一个追踪 ID，记录从第一帧人声到 LLM 最后一个 token 的各个时刻，
+退出时导出 JSONL 并打印各阶段延迟分位数
+
+时刻（mark）按流水线顺序：
+    speech_start     第一帧人声（捕获线程读到这一帧）
+    speech_end       语音结束（静音够长或缓冲满）
+    enqueued         预处理完成，放入识别队列
+    dequeued         识别调度线程取出
+    asr_start / asr_end   ASR 请求
+    delivered        识别结果交给回调
+    llm_start        LLM 请求发出（预取或 Ctrl+V）
+    llm_first_token / llm_last_token
+
+各阶段（span）= 两个时刻之差，见 SPANS。追踪 ID 随 AudioChunk.trace_id 在线程间传递，
+LLM 侧用 latest(source) 找到「最近一条交付的识别结果」
+
+TRACE_ENABLED = False 时所有方法立即返回，不产生开销
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional, Sequence
+
+from config import TRACE_ENABLED, TRACE_PATH, TRACE_MAX_UTTERANCES
+
+# 阶段名 -> (起点时刻, 终点时刻)
+SPANS = {
+    "speech": ("speech_start", "speech_end"),
+    "preprocess": ("speech_end", "enqueued"),
+    "queue_wait": ("enqueued", "dequeued"),
+    "asr": ("asr_start", "asr_end"),
+    "delivery": ("asr_end", "delivered"),
+    "speech_end_to_text": ("speech_end", "delivered"),
+    "llm_ttft": ("llm_start", "llm_first_token"),
+    "llm_stream": ("llm_first_token", "llm_last_token"),
+    "speech_end_to_first_token": ("speech_end", "llm_first_token"),
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    最近秩分位数：不小于 q 比例样本的最小值（values 已升序排列，q ∈ (0, 1]）
+    
+    样本少时高分位数落在最大值上，而不是像向下取整的下标那样退化成中位数
+    """
+    rank = math.ceil(round(q * len(values), 9))  # round：0.95 * 20 这类乘积的浮点误差不能多进一位
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+class Trace:
+    """一段语音的追踪记录"""
+    
+    __slots__ = ("trace_id", "source", "wall_start", "marks", "attrs")
+    
+    def __init__(self, trace_id: str, source: str, at: float):
+        self.trace_id = trace_id
+        self.source = source
+        self.wall_start = time.time() - (time.perf_counter() - at)
+        self.marks = {"speech_start": at}  # 时刻名 -> perf_counter
+        self.attrs = {}
+    
+    def spans(self) -> dict:
+        """各阶段耗时（秒），缺少端点的阶段不出现"""
+        return {
+            name: self.marks[end] - self.marks[start]
+            for name, (start, end) in SPANS.items()
+            if start in self.marks and end in self.marks
+        }
+    
+    def to_dict(self) -> dict:
+        origin = self.marks["speech_start"]
+        return {
+            "id": self.trace_id,
+            "source": self.source,
+            "start": round(self.wall_start, 3),
+            "marks_ms": {name: round((at - origin) * 1000, 1) for name, at in self.marks.items()},
+            "spans_ms": {name: round(value * 1000, 1) for name, value in self.spans().items()},
+            **({"attrs": self.attrs} if self.attrs else {}),
+        }
+
+
+class Tracer:
+    """
+    追踪记录器（线程安全）
+    
+    用法：
+        trace_id = tracer.begin('speaker')
+        tracer.mark(trace_id, 'speech_end')
+        ...
+        tracer.export()
+        tracer.summary()
+    """
+    
+    def __init__(self, enabled: bool = TRACE_ENABLED, path: str = TRACE_PATH,
+                 max_traces: int = TRACE_MAX_UTTERANCES):
+        """
+        Args:
+            enabled: 是否记录
+            path: 导出的 JSONL 文件
+            max_traces: 最多保留多少段语音（超出丢最旧的）
+        """
+        self.enabled = enabled
+        self.path = path
+        self.max_traces = max_traces
+        self._traces = OrderedDict()  # trace_id -> Trace
+        self._latest = {}  # source -> 最近交付的 trace_id
+        self._counter = 0
+        self._lock = threading.Lock()
+    
+    def begin(self, source: str, at: Optional[float] = None) -> Optional[str]:
+        """第一帧人声：新建追踪，返回追踪 ID（关闭时返回 None）"""
+        if not self.enabled:
+            return None
+        
+        at = time.perf_counter() if at is None else at
+        with self._lock:
+            self._counter += 1
+            trace_id = f"{source[:3]}-{self._counter:05d}"
+            self._traces[trace_id] = Trace(trace_id, source, at)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return trace_id
+    
+    def mark(self, trace_id: Optional[str], name: str, at: Optional[float] = None):
+        """记录时刻（同名时刻只记第一次，如预取和 Ctrl+V 都会发起 LLM 请求）"""
+        if trace_id is None:
+            return
+        
+        at = time.perf_counter() if at is None else at
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return
+            trace.marks.setdefault(name, at)
+            if name == "delivered":
+                self._latest[trace.source] = trace_id
+    
+    def marks(self, trace_id: Optional[str]) -> dict:
+        """该追踪已记录的时刻（时刻名 -> perf_counter），供跨进程转交"""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            return dict(trace.marks) if trace is not None else {}
+    
+    def adopt(self, source: str, marks: dict) -> Optional[str]:
+        """
+        接管另一个进程记录的追踪（捕获子进程见 capture_process.py）
+        
+        perf_counter 是系统级单调时钟，同一台机器上跨进程可以直接比较
+        """
+        if not self.enabled or "speech_start" not in marks:
+            return None
+        trace_id = self.begin(source, at=marks["speech_start"])
+        for name, at in marks.items():
+            self.mark(trace_id, name, at)
+        return trace_id
+    
+    def annotate(self, trace_id: Optional[str], **attrs):
+        """附加信息（音频时长、切段数、是否命中缓存等），随 JSONL 导出"""
+        if trace_id is None:
+            return
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is not None:
+                trace.attrs.update(attrs)
+    
+    def latest(self, source: str) -> Optional[str]:
+        """该来源最近一条交付了识别结果的追踪 ID"""
+        with self._lock:
+            return self._latest.get(source)
+    
+    def trace_stream(self, trace_id: Optional[str], stream: Iterator[str]) -> Iterator[str]:
+        """包装 LLM 回答流：记录请求开始、第一个和最后一个 token"""
+        if trace_id is None:
+            yield from stream
+            return
+        
+        self.mark(trace_id, "llm_start")
+        first = True
+        try:
+            for chunk in stream:
+                if first:
+                    self.mark(trace_id, "llm_first_token")
+                    first = False
+                yield chunk
+            self.mark(trace_id, "llm_last_token")
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()  # 调用方提前关闭时把底层流也关掉
+    
+    def records(self) -> list:
+        """全部追踪记录（dict，按开始顺序）"""
+        with self._lock:
+            return [trace.to_dict() for trace in self._traces.values()]
+    
+    def export(self, path: Optional[str] = None) -> int:
+        """写出 JSONL（每行一段语音），返回条数"""
+        records = self.records()
+        if not records:
+            return 0
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return len(records)
+    
+    def summary(self) -> dict:
+        """
+        各阶段延迟分位数
+        
+        Returns:
+            {span: {"count": n, "p50": 毫秒, "p95": 毫秒, "p99": 毫秒, "max": 毫秒}}，按 SPANS 顺序
+        """
+        with self._lock:
+            spans = [trace.spans() for trace in self._traces.values()]
+        
+        summary = {}
+        for name in SPANS:
+            values = sorted(s[name] * 1000 for s in spans if name in s)
+            if not values:
+                continue
+            summary[name] = {
+                "count": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+                "max": values[-1],
+            }
+        return summary
+    
+    def print_summary(self):
+        """退出时打印分位数表"""
+        summary = self.summary()
+        if not summary:
+            return
+        print(f"  🔍 延迟追踪（毫秒）{'':<14}{'条数':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+        for name, stats in summary.items():
+            print(f"     {name:<30}{stats['count']:>6}{stats['p50']:>9.0f}{stats['p95']:>9.0f}"
+                  f"{stats['p99']:>9.0f}{stats['max']:>9.0f}")
+
+
+# 全局追踪器（各模块共用）
+tracer = Tracer()
@@ -0,0 +1,102 @@
+"""
+对话记录 - 识别结果的内存存储
+职责：按到达顺序保存每一句识别结果（来源、文本、时刻、ID），供 GUI / 命令行直接读取，
+不再从界面控件的文本里反向解析
+
+- 只追加：每句分配单调递增的 ID，按 ID 随机访问 O(1)
+- 有界：只保留最近 max_entries 句（环形存储），长时间面试内存不增长
+- 各来源的最后一句单独记录，取「面试官最后一个问题」O(1)
+- 线程安全：识别线程写入，GUI / 键盘回调线程读取
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from config import TRANSCRIPT_MAX_ENTRIES
+
+
+@dataclass(frozen=True)
+class Utterance:
+    """一句识别结果"""
+    id: int  # 单调递增，清空或淘汰后也不复用
+    source: str  # 'speaker' / 'microphone'
+    text: str  # 可能包含换行（长语音切段拼接、多行问题）
+    timestamp: float  # 识别完成时刻（time.time()）
+    spoken_at: Optional[float] = None  # 语音结束时刻（有则可算出字延迟）
+    trace_id: Optional[str] = None  # 延迟追踪 ID（见 tracing.py）
+
+
+class TranscriptStore:
+    """
+    只追加、按 ID 索引的有界对话记录
+    
+    ID 为 n 的一句存放在 _slots[n % max_entries]，超出容量时新句覆盖最早的一句
+    """
+    
+    def __init__(self, max_entries: int = TRANSCRIPT_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._slots: list[Optional[Utterance]] = [None] * self.max_entries
+        self._next_id = 0
+        self._first_id = 0  # 仍可访问的最早 ID
+        self._last_by_source: dict[str, Utterance] = {}
+        self._lock = threading.Lock()
+    
+    def append(self, source: str, text: str, timestamp: Optional[float] = None,
+               spoken_at: Optional[float] = None, trace_id: Optional[str] = None) -> Utterance:
+        """追加一句，返回带 ID 的记录"""
+        with self._lock:
+            utterance = Utterance(
+                id=self._next_id,
+                source=source,
+                text=text,
+                timestamp=time.time() if timestamp is None else timestamp,
+                spoken_at=spoken_at,
+                trace_id=trace_id
+            )
+            self._slots[utterance.id % self.max_entries] = utterance
+            self._next_id += 1
+            self._first_id = max(self._first_id, self._next_id - self.max_entries)
+            self._last_by_source[source] = utterance
+            return utterance
+    
+    def get(self, utterance_id: int) -> Optional[Utterance]:
+        """按 ID 取一句（已淘汰或不存在返回 None）"""
+        with self._lock:
+            if self._first_id <= utterance_id < self._next_id:
+                return self._slots[utterance_id % self.max_entries]
+            return None
+    
+    def last(self, source: Optional[str] = None) -> Optional[Utterance]:
+        """最后一句（指定 source 则为该来源的最后一句）"""
+        with self._lock:
+            if source is not None:
+                return self._last_by_source.get(source)
+            if self._next_id > self._first_id:
+                return self._slots[(self._next_id - 1) % self.max_entries]
+            return None
+    
+    def since(self, utterance_id: int, source: Optional[str] = None) -> list[Utterance]:
+        """ID ≥ utterance_id 的各句（按顺序），用于增量渲染；更早已淘汰的部分跳过"""
+        with self._lock:
+            start = max(utterance_id, self._first_id)
+            utterances = [self._slots[i % self.max_entries] for i in range(start, self._next_id)]
+        if source is not None:
+            utterances = [u for u in utterances if u.source == source]
+        return utterances
+    
+    @property
+    def next_id(self) -> int:
+        """下一句将分配的 ID（= 迄今追加的总句数）"""
+        return self._next_id
+    
+    def __len__(self) -> int:
+        return self._next_id - self._first_id
+    
+    def clear(self):
+        """清空记录（ID 继续递增，已渲染到的位置仍然有效）"""
+        with self._lock:
+            self._slots = [None] * self.max_entries
+            self._first_id = self._next_id
+            self._last_by_source.clear()
@@ -0,0 +1,235 @@
+"""
+语音活动检测（VAD）
+职责：逐帧判断是否有人声，决定语音片段的开始和结束
+
+检测器接口只有两个方法：is_speech(frame) 和 reset()，
+捕获线程只依赖这个接口，换检测器不需要改捕获逻辑
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from config import (
+    SILENCE_THRESHOLD, VAD_MODE,
+    VAD_MARGIN_DB, VAD_MIN_ENERGY_DB, VAD_SPEECH_RATIO
+)
+
+
+class VoiceActivityDetector(ABC):
+    """VAD 接口 - 输入归一化到 [-1, 1] 的 float32 单声道帧（子类必须实现 is_speech）"""
+    
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+    
+    @abstractmethod
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """这一帧是否包含人声"""
+    
+    def reset(self):
+        """清空内部状态（换设备或重新开始时调用）"""
+        pass
+
+
+class PeakVAD(VoiceActivityDetector):
+    """
+    峰值阈值检测（旧版行为）
+    
+    帧内最大绝对值超过固定阈值即判为语音，
+    底噪高的麦克风会一直"有声音"，底噪低的小声说话会被截断
+    """
+    
+    def __init__(self, sample_rate: int, threshold: float = SILENCE_THRESHOLD):
+        super().__init__(sample_rate)
+        self.threshold = threshold
+    
+    def is_speech(self, frame: np.ndarray) -> bool:
+        return float(np.abs(frame).max()) >= self.threshold
+
+
+class AdaptiveEnergyVAD(VoiceActivityDetector):
+    """
+    自适应频谱能量 VAD：逐频点信噪比 + 过零率 + 谱通量，噪声谱自动跟踪
+    
+    每个 100ms 帧切成 10ms 子帧（reshape + 批量 FFT，无循环）：
+    1. 语音频带内每个频点相对噪声谱的信噪比取平均，超过 margin_db 的子帧算"有声"
+       （按频点归一化后，嗡嗡声、低频隆隆声这类窄带噪声的起伏被抵消）
+    2. 过零率过高且信噪比优势不大的子帧视为宽带噪声（风扇、嘶声）
+    3. 谱通量大（频谱突变，语音起始）时降低门限，减少开头被吞
+    
+    噪声谱跟踪：下降快（安静下来立刻跟上），上升慢（说话不会把底噪抬高），
+    有非语音子帧时上升得更快（环境变吵能在 1 秒量级内适应）。
+    另外用最小值统计兜底：过去 MIN_WINDOW 秒平滑功率谱的逐频点最小值（补偿偏差后）是噪声谱的下限，
+    空调、风扇隆隆声这类平稳噪声突然出现时即使每个子帧都被判成语音，也会在约 1.5 秒内并入噪声谱
+    """
+    
+    SUBFRAME_DURATION = 0.01  # 子帧 10ms
+    SPEECH_BAND = (100.0, 4000.0)  # 人声主要能量所在频带（Hz）
+    EPS = 1e-12
+    
+    # 噪声谱跟踪速率（每个子帧的平滑系数）
+    FLOOR_DOWN = 0.1  # 能量低于噪声谱：约 100ms 跟上
+    FLOOR_UP_NOISE = 0.01  # 帧内有非语音子帧：约 1 秒
+    FLOOR_UP_SPEECH = 0.0005  # 整帧都是语音：约 20 秒
+    
+    # 最小值统计：子帧功率先做 MIN_SMOOTH 个子帧的滑动平均，再取 MIN_WINDOW 秒内逐频点的最小值
+    MIN_WINDOW = 1.5  # 比词间停顿长（说话时窗口里总有停顿），又不至于让人等太久
+    MIN_SMOOTH = 5  # 50ms 平均，压低单个子帧的随机起伏
+    MIN_BIAS = 2.0  # 平稳噪声下该最小值约比均值低 6dB，只补偿 3dB（宁可低估，剩下的由上面的跟踪补齐）
+    
+    ZCR_NOISE = 0.35  # 过零率高于此值视为噪声样子帧
+    FLUX_ONSET = 0.25  # 谱通量高于此值视为起始
+    
+    def __init__(
+        self,
+        sample_rate: int,
+        margin_db: float = VAD_MARGIN_DB,
+        min_energy_db: float = VAD_MIN_ENERGY_DB,
+        speech_ratio: float = VAD_SPEECH_RATIO
+    ):
+        super().__init__(sample_rate)
+        self.margin_db = margin_db
+        self.min_energy_db = min_energy_db
+        self.speech_ratio = speech_ratio
+        self.subframe_size = max(2, int(sample_rate * self.SUBFRAME_DURATION))
+        
+        # 子帧窗函数和语音频带掩码只算一次
+        self._window = np.hanning(self.subframe_size).astype(np.float32)
+        freqs = np.fft.rfftfreq(self.subframe_size, 1.0 / sample_rate)
+        self._band = (freqs >= self.SPEECH_BAND[0]) & (freqs <= self.SPEECH_BAND[1])
+        
+        self.reset()
+    
+    def reset(self):
+        self.noise_psd = None  # 每个频点的噪声功率
+        self._prev_spectrum = None
+        self._minima = None  # 最近 MIN_WINDOW 秒每帧的平滑功率逐频点最小值（环形，一帧一行）
+        self._minima_count = 0
+        self._smooth_tail = None  # 上一帧最后 MIN_SMOOTH - 1 个子帧的功率（滑动平均跨帧连续）
+    
+    @property
+    def noise_floor_db(self) -> float:
+        """噪声谱总能量（dB），用于显示和调试"""
+        if self.noise_psd is None:
+            return float('-inf')
+        return float(10.0 * np.log10(self.noise_psd.sum() / self.subframe_size + self.EPS))
+    
+    def is_speech(self, frame: np.ndarray) -> bool:
+        if len(frame) < self.subframe_size:
+            return False
+        power, energy_db, zcr = self._subframe_features(frame)
+        
+        if self.noise_psd is None:
+            self.noise_psd = power.mean(axis=0) + self.EPS
+        
+        flux = self._spectral_flux(power)
+        margin = self.margin_db * (0.5 if flux > self.FLUX_ONSET else 1.0)
+        
+        snr_db = np.mean(10.0 * np.log10(power / self.noise_psd + self.EPS), axis=1)
+        voiced = (
+            (snr_db > margin)
+            & (energy_db > self.min_energy_db)
+            & ((zcr < self.ZCR_NOISE) | (snr_db > 2 * margin))
+        )
+        
+        self._track_noise(power, voiced)
+        return bool(voiced.mean() >= self.speech_ratio)
+    
+    def _subframe_features(self, frame: np.ndarray):
+        """
+        子帧频带功率谱、频带能量（dB）、过零率，一次 reshape + 一次批量 FFT
+        
+        只看 SPEECH_BAND 内的频点：50Hz 嗡嗡声、低频漂移和高频嘶声
+        能量很大但不是人声，不应该把噪声估计或判决拉偏
+        """
+        n = len(frame) // self.subframe_size
+        sub = frame[:n * self.subframe_size].reshape(n, self.subframe_size)
+        
+        power = np.abs(np.fft.rfft(sub * self._window, axis=1)[:, self._band]) ** 2
+        energy_db = 10.0 * np.log10(power.sum(axis=1) / self.subframe_size + self.EPS)
+        
+        signs = np.signbit(sub)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+        return power, energy_db, zcr
+    
+    def _spectral_flux(self, power: np.ndarray) -> float:
+        """相邻两帧归一化频带幅度谱的正向变化量（0~1）"""
+        spectrum = np.sqrt(power).sum(axis=0)
+        total = spectrum.sum()
+        if total < self.EPS:
+            self._prev_spectrum = None
+            return 0.0
+        spectrum /= total
+        
+        prev = self._prev_spectrum
+        self._prev_spectrum = spectrum
+        if prev is None:
+            return 0.0
+        return float(np.maximum(spectrum - prev, 0.0).sum())
+    
+    def _track_noise(self, power: np.ndarray, voiced: np.ndarray):
+        """
+        每帧更新一次噪声谱（逐频点）
+        
+        目标值取非语音子帧的平均功率（整帧都是语音则取各频点最小值，且只做极慢的修正），
+        n 个子帧的指数平滑合并成一步：alpha = 1 - (1 - rate)^n
+        """
+        quiet = power[~voiced]
+        if len(quiet):
+            target = quiet.mean(axis=0)
+            rate = np.where(target < self.noise_psd, self.FLOOR_DOWN, self.FLOOR_UP_NOISE)
+        else:
+            target = power.min(axis=0)
+            rate = self.FLOOR_UP_SPEECH
+        
+        alpha = 1.0 - (1.0 - rate) ** len(power)
+        self.noise_psd += alpha * (target - self.noise_psd)
+        
+        floor = self._minimum_floor(power)
+        if floor is not None:
+            np.maximum(self.noise_psd, floor, out=self.noise_psd)
+        np.maximum(self.noise_psd, self.EPS, out=self.noise_psd)
+    
+    def _minimum_floor(self, power: np.ndarray):
+        """
+        最小值统计的噪声下限（逐频点），窗口还没攒满时返回 None
+        
+        不看语音判决：持续的平稳噪声被误判成语音时，上面的跟踪几乎不动，
+        但它的平滑功率在窗口内的最小值就是噪声本身；真实语音在窗口内总有停顿，最小值落在停顿处
+        """
+        rows = power if self._smooth_tail is None else np.vstack((self._smooth_tail, power))
+        self._smooth_tail = rows[-(self.MIN_SMOOTH - 1):]
+        if len(rows) < self.MIN_SMOOTH:
+            return None
+        cumulative = np.cumsum(rows, axis=0)
+        smoothed = cumulative[self.MIN_SMOOTH - 1:].copy()
+        smoothed[1:] -= cumulative[:-self.MIN_SMOOTH]
+        
+        if self._minima is None:
+            frames = max(1, int(np.ceil(self.MIN_WINDOW / (len(power) * self.SUBFRAME_DURATION))))
+            self._minima = np.empty((frames, power.shape[1]))
+        self._minima[self._minima_count % len(self._minima)] = smoothed.min(axis=0) / self.MIN_SMOOTH
+        self._minima_count += 1
+        if self._minima_count < len(self._minima):
+            return None
+        return self._minima.min(axis=0) * self.MIN_BIAS
+
+
+# 检测器注册表：config.VAD_MODE -> 类
+VAD_DETECTORS = {
+    'peak': PeakVAD,
+    'adaptive': AdaptiveEnergyVAD,
+}
+
+
+def create_vad(sample_rate: int, mode: str = VAD_MODE) -> VoiceActivityDetector:
+    """
+    按名称创建 VAD 检测器
+    
+    Args:
+        sample_rate: 输入帧的采样率
+        mode: 检测器名称（见 VAD_DETECTORS）
+    """
+    if mode not in VAD_DETECTORS:
+        raise ValueError(f"未知的 VAD 模式: {mode}（支持: {', '.join(VAD_DETECTORS)}）")
+    return VAD_DETECTORS[mode](sample_rate)